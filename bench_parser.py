@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark do parser de mensagens (custo por mensagem)
+
+Uso: python bench_parser.py [repeticoes]
+"""
+import re
+import sys
+import timeit
+from src.utils import analisar_mensagem
+
+MENSAGENS = [
+    "mercado 50",
+    "uber 25,50",
+    "R$ 1.234,56 aluguel",
+    "almoço no restaurante 32.90 reais",
+    "cento e vinte reais de farmácia",
+    "dois mil e quinhentos notebook",
+    "gasolina 200",
+    "saldo",
+    "pizza com os amigos 89,90",
+    "netflix 55.90",
+]
+
+def medir(funcao, repeticoes):
+    """Tempo médio por mensagem em microssegundos"""
+    total = timeit.timeit(lambda: [funcao(m) for m in MENSAGENS], number=repeticoes)
+    return total / (repeticoes * len(MENSAGENS)) * 1e6
+
+# Cópia do parser anterior ao analisar_mensagem, mantida só como referência
+NUMEROS_EXTENSO_ANTIGO = {
+    'um': 1, 'dois': 2, 'três': 3, 'quatro': 4, 'cinco': 5,
+    'seis': 6, 'sete': 7, 'oito': 8, 'nove': 9, 'dez': 10,
+    'onze': 11, 'doze': 12, 'treze': 13, 'quatorze': 14, 'quinze': 15,
+    'dezesseis': 16, 'dezessete': 17, 'dezoito': 18, 'dezenove': 19,
+    'vinte': 20, 'trinta': 30, 'quarenta': 40, 'cinquenta': 50,
+    'sessenta': 60, 'setenta': 70, 'oitenta': 80, 'noventa': 90,
+    'cem': 100, 'duzentos': 200, 'trezentos': 300, 'quatrocentos': 400,
+    'quinhentos': 500, 'seiscentos': 600, 'setecentos': 700,
+    'oitocentos': 800, 'novecentos': 900, 'mil': 1000
+}
+
+COMANDOS_ANTIGO = ['saldo', 'hoje', 'exportar', 'deletar', 'apagar', 'ajuda', 'help', 'comandos']
+
+def extrair_valor_antigo(text):
+    """extrair_valor_melhorado da versão anterior"""
+    if not text:
+        return None
+    text_clean = re.sub(r'(r\$|reais?|real)', '', text, flags=re.IGNORECASE)
+    valor_match = re.search(r'\d+(?:[.,]\d{1,2})?', text_clean)
+    if valor_match:
+        try:
+            return float(valor_match.group().replace(',', '.'))
+        except ValueError:
+            pass
+    text_lower = text.lower()
+    for palavra, valor in NUMEROS_EXTENSO_ANTIGO.items():
+        if palavra in text_lower:
+            return float(valor)
+    return None
+
+def limpar_descricao_antigo(text):
+    """limpar_descricao da versão anterior"""
+    if not text:
+        return ""
+    descricao = re.sub(r'\d+(?:[.,]\d{1,2})?|r\$|reais?|real', '', text, flags=re.IGNORECASE)
+    return re.sub(r'\s+', ' ', descricao).strip()
+
+def extrair_comando_antigo(text):
+    """extrair_comando da versão anterior"""
+    if not text:
+        return None
+    text_lower = text.lower().strip()
+    for comando in COMANDOS_ANTIGO:
+        if comando in text_lower:
+            return comando
+    return None
+
+def tres_chamadas(texto):
+    """Uso antigo: uma chamada por informação extraída, com o parser anterior"""
+    return extrair_comando_antigo(texto), extrair_valor_antigo(texto), limpar_descricao_antigo(texto)
+
+def main():
+    repeticoes = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+
+    print(f"⏱️ {len(MENSAGENS)} mensagens x {repeticoes} repetições")
+    print(f"  analisar_mensagem (uma passada): {medir(analisar_mensagem, repeticoes):.2f} µs/mensagem")
+    print(f"  parser anterior (três chamadas): {medir(tres_chamadas, repeticoes):.2f} µs/mensagem")
+
+    print("\n🔎 Resultados:")
+    for mensagem in MENSAGENS:
+        analise = analisar_mensagem(mensagem)
+        print(f"  {mensagem!r:40} -> {analise.valor!r:>8} | {analise.descricao!r} | {analise.comando!r}")
+
+if __name__ == "__main__":
+    main()
@@ -5,10 +5,10 @@ Bot com Abas Separadas por Usuário (Solução Simples)
 import json
 import requests
 import threading
-import re
 from datetime import datetime
 from config_telegram import TelegramConfig
 from sheets_abas_separadas import SheetsAbasSeparadas
+from src.expense_engine import interpretar_mensagem
 
 class BotAbasSeparadas:
     def __init__(self):
@@ -22,15 +22,6 @@ class BotAbasSeparadas:
         
         self.usuarios_file = 'usuarios.json'
         self.carregar_usuarios()
-        
-        self.categorias = {
-            'alimentação': ['mercado', 'supermercado', 'restaurante', 'lanche', 'pizza', 'comida', 'ifood'],
-            'transporte': ['uber', 'taxi', 'gasolina', 'combustível', 'ônibus', '99'],
-            'saúde': ['farmácia', 'médico', 'hospital', 'remédio', 'consulta'],
-            'lazer': ['cinema', 'bar', 'show', 'viagem', 'netflix'],
-            'casa': ['luz', 'água', 'internet', 'aluguel', 'condomínio'],
-            'outros': []
-        }
     
     def carregar_usuarios(self):
         try:
@@ -65,17 +56,6 @@ class BotAbasSeparadas:
             return True
         return False
     
-    def extrair_valor(self, texto):
-        match = re.search(r'(\d+(?:[.,]\d{1,2})?)', re.sub(r'r\$|reais?', '', texto, flags=re.IGNORECASE))
-        return float(match.group().replace(',', '.')) if match else None
-    
-    def categorizar(self, descricao):
-        desc_lower = descricao.lower()
-        for cat, palavras in self.categorias.items():
-            if any(p in desc_lower for p in palavras):
-                return cat
-        return 'outros'
-    
     def enviar_rapido(self, chat_id, texto):
         def enviar():
             try:
@@ -130,10 +110,10 @@ class BotAbasSeparadas:
         
         else:
             # Processar gasto
-            valor = self.extrair_valor(texto)
+            gasto = interpretar_mensagem(texto)
+            valor = gasto.valor
             if valor:
-                descricao = re.sub(r'\d+(?:[.,]\d{1,2})?|r\$|reais?', '', texto, flags=re.IGNORECASE).strip()
-                categoria = self.categorizar(descricao)
+                descricao, categoria = gasto.descricao, gasto.categoria
                 
                 # Resposta imediata
                 self.enviar_rapido(chat_id, f"⏳ Salvando na sua aba...")
@@ -3,8 +3,6 @@
 Bot Telegram Completo - Todas as Funcionalidades
 """
 import requests
-import time
-import re
 import threading
 import gspread
 from google.oauth2.service_account import Credentials
@@ -13,12 +11,27 @@ import calendar
 import json
 import os
 from dotenv import load_dotenv
+from src.sheet_sync import SincronizadorIncremental
+from src.write_queue import FilaEscrita
+from src.journal import JournalGastos
+from src.aggregates import IndiceAgregado
+from src.pipeline import PipelineUpdates, EnviadorMensagens
+from src.expense_engine import interpretar_mensagem
+from src.dedup import RegistroUpdates
+from src.outbound import PRIORIDADE_CONFIRMACAO, PRIORIDADE_NORMAL
+from config_telegram import TelegramConfig
 
 load_dotenv()
 
 TOKEN = os.getenv('TELEGRAM_TOKEN')
 SHEET_ID = os.getenv('SHEET_ID')
 
+# Sessão HTTP com conexões keep-alive (evita um handshake TLS por mensagem)
+session = requests.Session()
+
+# Envio respeitando os limites do Telegram (global e por chat)
+enviador = EnviadorMensagens(f"https://api.telegram.org/bot{TOKEN}", session, timeout=5)
+
 print(f"🚀 Bot Completo iniciando...")
 
 # Conectar Google Sheets
@@ -39,11 +52,30 @@ try:
     
     gc = gspread.authorize(creds)
     sheet = gc.open_by_key(SHEET_ID).sheet1
+    sincronizador = SincronizadorIncremental(sheet)
+    
+    # Totais por mês/categoria atualizados a cada mudança sincronizada
+    indice = IndiceAgregado()
+    sincronizador.adicionar_ouvinte(indice.aplicar_mudancas)
     print("✅ Google Sheets conectado")
 except Exception as e:
     print(f"❌ Erro Google Sheets: {e}")
     exit(1)
 
+def gravar_lote(planilha, linhas):
+    """Grava um lote de gastos e registra as linhas no sincronizador"""
+    with sincronizador.escrita():
+        planilha.append_rows(linhas)
+        for linha in linhas:
+            sincronizador.registrar_append(linha)
+
+# Gravações agrupadas em um único append_rows
+fila_escrita = FilaEscrita(gravar=gravar_lote)
+
+# Journal local: gastos confirmados ao usuário sobrevivem a quedas do bot ou do Sheets
+journal = JournalGastos('gastos_journal.jsonl',
+                        lambda chave, linha, reenvio: fila_escrita.enfileirar(sheet, linha, chave, reenvio))
+
 # Configurações do usuário
 CONFIG_FILE = 'bot_config.json'
 
@@ -58,60 +90,55 @@ def save_user_config(config):
     with open(CONFIG_FILE, 'w') as f:
         json.dump(config, f)
 
-# Categorias
-CATEGORIAS = {
-    'alimentação': ['mercado', 'supermercado', 'restaurante', 'lanche', 'pizza', 'comida', 'ifood'],
-    'transporte': ['uber', 'taxi', 'gasolina', 'combustível', 'ônibus', '99'],
-    'saúde': ['farmácia', 'médico', 'hospital', 'remédio', 'consulta'],
-    'lazer': ['cinema', 'bar', 'show', 'viagem', 'netflix'],
-    'casa': ['luz', 'água', 'internet', 'aluguel', 'condomínio'],
-    'outros': []
-}
-
-def extrair_valor(texto):
-    """Extrai valor do texto"""
-    match = re.search(r'(\d+(?:[.,]\d{1,2})?)', re.sub(r'r\$|reais?', '', texto, flags=re.IGNORECASE))
-    return float(match.group().replace(',', '.')) if match else None
-
-def categorizar(descricao):
-    """Categoriza gasto"""
-    desc_lower = descricao.lower()
-    for cat, palavras in CATEGORIAS.items():
-        if any(p in desc_lower for p in palavras):
-            return cat
-    return 'outros'
-
-def limpar_descricao(texto):
-    """Remove valor da descrição"""
-    return re.sub(r'\d+(?:[.,]\d{1,2})?|r\$|reais?', '', texto, flags=re.IGNORECASE).strip()
-
-def enviar_mensagem(chat_id, texto):
-    """Envia mensagem"""
+def enviar_mensagem(chat_id, texto, prioridade=PRIORIDADE_NORMAL):
+    """Envia mensagem (agendada conforme os limites do Telegram)"""
     try:
-        requests.post(f"https://api.telegram.org/bot{TOKEN}/sendMessage",
-                     json={"chat_id": chat_id, "text": texto, "parse_mode": "Markdown"}, timeout=5)
+        enviador.enviar(chat_id, texto, prioridade, parse_mode="Markdown")
         return True
     except:
         return False
 
-def salvar_gasto_async(descricao, valor, categoria):
-    """Salva gasto em background"""
-    def salvar():
-        try:
-            hoje = datetime.now().strftime("%d/%m/%Y")
-            sheet.append_row([hoje, descricao, f"{valor:.2f}", categoria])
+def salvar_gasto_async(descricao, valor, categoria, update_id):
+    """
+    Grava o gasto no journal local (fsync) e agenda o envio para a planilha.
+    Retorna False se o update já tinha sido registrado.
+    """
+    hoje = datetime.now().strftime("%d/%m/%Y")
+    future = journal.gravar(update_id, [hoje, descricao, f"{valor:.2f}", categoria])
+    if future is None:
+        return False
+    
+    def confirmar(f):
+        if f.exception():
+            # Continua no journal e será reenviado automaticamente
+            print(f"❌ Erro ao salvar (pendente no journal): {f.exception()}")
+        else:
             print(f"💰 SALVO: {descricao} - R$ {valor:.2f}")
-        except Exception as e:
-            print(f"❌ Erro ao salvar: {e}")
     
-    threading.Thread(target=salvar, daemon=True).start()
+    future.add_done_callback(confirmar)
+    return True
 
-def obter_gastos():
-    """Obtém todos os gastos"""
+def sincronizar():
+    """Traz as mudanças da planilha (atualiza também o índice de agregados)"""
     try:
-        return sheet.get_all_records()
-    except:
-        return []
+        sincronizador.sincronizar()
+    except Exception as e:
+        print(f"❌ Erro ao sincronizar: {e}")
+
+def obter_gastos():
+    """Obtém todos os gastos (sincronização incremental)"""
+    sincronizar()
+    return sincronizador.registros()
+
+def resumo_mes(data):
+    """Agregado (soma, contagem, maximo, minimo) do mês da data"""
+    sincronizar()
+    return indice.resumo_mes(data.year, data.month)
+
+def categorias_mes(data):
+    """Totais por categoria do mês da data"""
+    sincronizar()
+    return indice.por_categoria(data.year, data.month)
 
 def obter_gastos_periodo(periodo):
     """Obtém gastos por período"""
@@ -160,8 +187,7 @@ def processar_comando(comando, texto, chat_id, nome):
 Digite qualquer gasto para começar! 💰""")
     
     elif comando == "saldo":
-        gastos_mes = obter_gastos_periodo('mes')
-        total = sum(float(str(g.get('Valor', '0')).replace(',', '.')) for g in gastos_mes)
+        total = resumo_mes(datetime.now())['soma']
         mes = datetime.now().strftime("%m/%Y")
         
         # Verificar meta
@@ -226,9 +252,9 @@ Restante: R$ {restante:.2f}""")
             enviar_mensagem(chat_id, "💎 Nenhum gasto registrado este mês")
     
     elif comando == "media":
-        gastos_mes = obter_gastos_periodo('mes')
-        if gastos_mes:
-            total = sum(float(str(g.get('Valor', '0')).replace(',', '.')) for g in gastos_mes)
+        resumo = resumo_mes(datetime.now())
+        if resumo['contagem']:
+            total = resumo['soma']
             dias_mes = datetime.now().day
             media_dia = total / dias_mes
             enviar_mensagem(chat_id, f"📊 *Média Diária*\n\nTotal do mês: R$ {total:.2f}\nDias decorridos: {dias_mes}\n💰 *Média: R$ {media_dia:.2f}/dia*")
@@ -256,8 +282,7 @@ Restante: R$ {restante:.2f}""")
         config = load_user_config()
         meta = config.get('metas', {}).get(str(chat_id), 0)
         if meta > 0:
-            gastos_mes = obter_gastos_periodo('mes')
-            total = sum(float(str(g.get('Valor', '0')).replace(',', '.')) for g in gastos_mes)
+            total = resumo_mes(datetime.now())['soma']
             restante = meta - total
             dias_restantes = calendar.monthrange(datetime.now().year, datetime.now().month)[1] - datetime.now().day
             
@@ -289,11 +314,15 @@ Meta: R$ {meta:.2f}
     
     elif comando == "deletar":
         try:
-            gastos = obter_gastos()
+            # Sem sincronização ou gravação entre contar as linhas e apagar a última
+            with sincronizador.escrita():
+                gastos = obter_gastos()
+                if gastos:
+                    # Deletar última linha (último gasto)
+                    ultima_linha = len(gastos) + 1  # +1 por causa do cabeçalho
+                    sheet.delete_rows(ultima_linha)
+                    sincronizador.registrar_remocao_ultima()
             if gastos:
-                # Deletar última linha (último gasto)
-                ultima_linha = len(gastos) + 1  # +1 por causa do cabeçalho
-                sheet.delete_rows(ultima_linha)
                 enviar_mensagem(chat_id, "🗑️ Último gasto deletado com sucesso!")
             else:
                 enviar_mensagem(chat_id, "🗑️ Nenhum gasto para deletar")
@@ -312,24 +341,21 @@ Meta: R$ {meta:.2f}
             enviar_mensagem(chat_id, "❌ Erro ao verificar gastos")
     
     elif comando == "relatorio":
-        gastos_mes = obter_gastos_periodo('mes')
-        if gastos_mes:
-            total = sum(float(str(g.get('Valor', '0')).replace(',', '.')) for g in gastos_mes)
+        resumo = resumo_mes(datetime.now())
+        if resumo['contagem']:
+            total = resumo['soma']
+            quantidade = resumo['contagem']
             
             # Gastos por categoria
-            categorias = {}
-            for gasto in gastos_mes:
-                cat = gasto.get('Categoria', 'outros')
-                valor = float(str(gasto.get('Valor', '0')).replace(',', '.'))
-                categorias[cat] = categorias.get(cat, 0) + valor
+            categorias = categorias_mes(datetime.now())
             
             ranking_cat = sorted(categorias.items(), key=lambda x: x[1], reverse=True)[:5]
             
             relatorio = f"""📊 *Relatório do Mês*
 
 💰 Total: R$ {total:.2f}
-📝 Gastos: {len(gastos_mes)}
-📊 Média: R$ {total/len(gastos_mes):.2f}
+📝 Gastos: {quantidade}
+📊 Média: R$ {total/quantidade:.2f}
 
 🏆 *Top Categorias:*
 """
@@ -341,14 +367,8 @@ Meta: R$ {meta:.2f}
             enviar_mensagem(chat_id, "📊 Nenhum gasto este mês para gerar relatório")
     
     elif comando == "ranking":
-        gastos_mes = obter_gastos_periodo('mes')
-        if gastos_mes:
-            categorias = {}
-            for gasto in gastos_mes:
-                cat = gasto.get('Categoria', 'outros')
-                valor = float(str(gasto.get('Valor', '0')).replace(',', '.'))
-                categorias[cat] = categorias.get(cat, 0) + valor
-            
+        categorias = categorias_mes(datetime.now())
+        if categorias:
             ranking = sorted(categorias.items(), key=lambda x: x[1], reverse=True)
             
             texto_ranking = "🏆 *Ranking de Categorias*\n\n"
@@ -363,13 +383,11 @@ Meta: R$ {meta:.2f}
     elif comando == "comparar":
         hoje = datetime.now()
         mes_atual = hoje.strftime("%m/%Y")
-        mes_anterior = (hoje.replace(day=1) - timedelta(days=1)).strftime("%m/%Y")
+        data_anterior = hoje.replace(day=1) - timedelta(days=1)
+        mes_anterior = data_anterior.strftime("%m/%Y")
         
-        gastos_atual = [g for g in obter_gastos() if mes_atual in str(g.get('Data', ''))]
-        gastos_anterior = [g for g in obter_gastos() if mes_anterior in str(g.get('Data', ''))]
-        
-        total_atual = sum(float(str(g.get('Valor', '0')).replace(',', '.')) for g in gastos_atual)
-        total_anterior = sum(float(str(g.get('Valor', '0')).replace(',', '.')) for g in gastos_anterior)
+        total_atual = resumo_mes(hoje)['soma']
+        total_anterior = indice.total_mes(data_anterior.year, data_anterior.month)
         
         if total_anterior > 0:
             diferenca = total_atual - total_anterior
@@ -435,7 +453,7 @@ Meta: R$ {meta:.2f}
 • /backup - Gerar backup
 • /dashboard - Abrir dashboard""")
 
-def processar_mensagem(chat_id, texto, nome):
+def processar_mensagem(chat_id, texto, nome, update_id):
     """Processa mensagem do usuário"""
     print(f"📱 {nome} ({chat_id}): {texto}")
     
@@ -454,16 +472,18 @@ def processar_mensagem(chat_id, texto, nome):
         processar_comando(comando, texto, chat_id, nome)
     else:
         # Processar gasto
-        valor = extrair_valor(texto)
+        gasto = interpretar_mensagem(texto)
+        valor = gasto.valor
         if valor:
-            descricao = limpar_descricao(texto)
-            categoria = categorizar(descricao)
+            descricao, categoria = gasto.descricao, gasto.categoria
             
-            # RESPOSTA IMEDIATA
-            enviar_mensagem(chat_id, f"✅ {descricao} - R$ {valor:.2f}\n📂 {categoria.title()}")
+            # Persistir no journal antes de confirmar; envio à planilha em background
+            if not salvar_gasto_async(descricao, valor, categoria, update_id):
+                return
             
-            # Salvar em background
-            salvar_gasto_async(descricao, valor, categoria)
+            # RESPOSTA IMEDIATA
+            enviar_mensagem(chat_id, f"✅ {descricao} - R$ {valor:.2f}\n📂 {categoria.title()}",
+                            PRIORIDADE_CONFIRMACAO)
             
             # Verificar alertas de meta
             config = load_user_config()
@@ -471,61 +491,46 @@ def processar_mensagem(chat_id, texto, nome):
             alertas_ativo = config.get('alertas', {}).get(str(chat_id), True)
             
             if meta > 0 and alertas_ativo:
-                gastos_mes = obter_gastos_periodo('mes')
-                total_mes = sum(float(str(g.get('Valor', '0')).replace(',', '.')) for g in gastos_mes) + valor
+                total_mes = resumo_mes(datetime.now())['soma'] + valor
                 percentual = (total_mes / meta) * 100
                 
+                # O agendador envia o alerta depois da confirmação (mesmo chat, prioridade menor)
                 if percentual >= 90:
-                    threading.Timer(3.0, lambda: enviar_mensagem(chat_id, f"🚨 *Alerta de Meta!*\n\nVocê já gastou {percentual:.1f}% da sua meta mensal!\nMeta: R$ {meta:.2f}\nGasto: R$ {total_mes:.2f}")).start()
+                    enviar_mensagem(chat_id, f"🚨 *Alerta de Meta!*\n\nVocê já gastou {percentual:.1f}% da sua meta mensal!\nMeta: R$ {meta:.2f}\nGasto: R$ {total_mes:.2f}")
                 elif percentual >= 75:
-                    threading.Timer(3.0, lambda: enviar_mensagem(chat_id, f"⚠️ *Atenção!*\n\nVocê gastou {percentual:.1f}% da sua meta mensal.")).start()
+                    enviar_mensagem(chat_id, f"⚠️ *Atenção!*\n\nVocê gastou {percentual:.1f}% da sua meta mensal.")
         else:
             enviar_mensagem(chat_id, "❌ Valor não identificado\n\n💡 Exemplos: mercado 50, uber 25.50")
 
+def processar_update(update):
+    """Processa um update do Telegram (executado nos workers do pipeline)"""
+    if "message" not in update:
+        return
+    
+    msg = update["message"]
+    chat_id = msg["chat"]["id"]
+    texto = msg.get("text", "").strip()
+    nome = msg["from"].get("first_name", f"User{chat_id}")
+    
+    if texto:
+        processar_mensagem(chat_id, texto, nome, update["update_id"])
+
 def main():
     """Função principal"""
     print("🚀 Bot Completo iniciado!")
     
-    # Limpar mensagens antigas
-    try:
-        r = requests.get(f"https://api.telegram.org/bot{TOKEN}/getUpdates", timeout=10)
-        if r.json().get("result"):
-            last_id = r.json()["result"][-1]["update_id"]
-            requests.get(f"https://api.telegram.org/bot{TOKEN}/getUpdates?offset={last_id + 1}", timeout=10)
-            print(f"🧹 Limpas {len(r.json()['result'])} mensagens antigas")
-    except:
-        pass
+    # Reenviar gastos que ficaram pendentes no journal
+    journal.iniciar_reenvio(intervalo=60)
     
     print("✅ Aguardando mensagens...")
     
-    offset = None
-    while True:
-        try:
-            r = requests.get(f"https://api.telegram.org/bot{TOKEN}/getUpdates", 
-                           params={"timeout": 5, "offset": offset}, timeout=10)
-            data = r.json()
-            
-            if data.get("ok") and data["result"]:
-                for update in data["result"]:
-                    if "message" in update:
-                        msg = update["message"]
-                        chat_id = msg["chat"]["id"]
-                        texto = msg.get("text", "").strip()
-                        nome = msg["from"].get("first_name", f"User{chat_id}")
-                        
-                        if texto:
-                            processar_mensagem(chat_id, texto, nome)
-                    
-                    offset = update["update_id"] + 1
-            
-            time.sleep(0.1)
-            
-        except KeyboardInterrupt:
-            print("\n🛑 Bot parado")
-            break
-        except Exception as e:
-            print(f"❌ Erro: {e}")
-            time.sleep(2)
+    registro = RegistroUpdates(caminho=TelegramConfig.arquivo_updates('bot_completo'))
+    pipeline = PipelineUpdates(processar_update, workers=TelegramConfig.WORKERS,
+                               tamanho_fila=TelegramConfig.TAMANHO_FILA, registro=registro)
+    try:
+        pipeline.executar_long_poll(f"https://api.telegram.org/bot{TOKEN}", session)
+    except KeyboardInterrupt:
+        print("\n🛑 Bot parado")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
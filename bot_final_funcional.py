@@ -5,12 +5,12 @@ Versão Final Funcional - Código Limpo
 """
 import requests
 import time
-import re
 import gspread
 from google.oauth2.service_account import Credentials
 from datetime import datetime
 import os
 from dotenv import load_dotenv
+from src.expense_engine import interpretar_mensagem
 
 # Carregar variáveis
 load_dotenv()
@@ -47,33 +47,6 @@ except Exception as e:
     print(f"❌ Erro Google Sheets: {e}")
     exit(1)
 
-# Categorias
-CATEGORIAS = {
-    'alimentação': ['mercado', 'supermercado', 'restaurante', 'lanche', 'pizza', 'comida', 'ifood'],
-    'transporte': ['uber', 'taxi', 'gasolina', 'combustível', 'ônibus', '99'],
-    'saúde': ['farmácia', 'médico', 'hospital', 'remédio', 'consulta'],
-    'lazer': ['cinema', 'bar', 'show', 'viagem', 'netflix'],
-    'casa': ['luz', 'água', 'internet', 'aluguel', 'condomínio'],
-    'outros': []
-}
-
-def extrair_valor(texto):
-    """Extrai valor do texto"""
-    match = re.search(r'(\d+(?:[.,]\d{1,2})?)', re.sub(r'r\$|reais?', '', texto, flags=re.IGNORECASE))
-    return float(match.group().replace(',', '.')) if match else None
-
-def categorizar(descricao):
-    """Categoriza gasto"""
-    desc_lower = descricao.lower()
-    for cat, palavras in CATEGORIAS.items():
-        if any(p in desc_lower for p in palavras):
-            return cat
-    return 'outros'
-
-def limpar_descricao(texto):
-    """Remove valor da descrição"""
-    return re.sub(r'\d+(?:[.,]\d{1,2})?|r\$|reais?', '', texto, flags=re.IGNORECASE).strip()
-
 def enviar_mensagem(chat_id, texto):
     """Envia mensagem para Telegram"""
     try:
@@ -154,10 +127,10 @@ def processar_mensagem(chat_id, texto, nome_usuario):
     
     else:
         # Processar gasto - RESPOSTA INSTANTÂNEA
-        valor = extrair_valor(texto)
+        gasto = interpretar_mensagem(texto)
+        valor = gasto.valor
         if valor:
-            descricao = limpar_descricao(texto)
-            categoria = categorizar(descricao)
+            descricao, categoria = gasto.descricao, gasto.categoria
             
             # RESPOSTA IMEDIATA
             enviar_mensagem(chat_id, f"✅ {descricao} - R$ {valor:.2f}\n📂 {categoria.title()}")
@@ -4,15 +4,23 @@ Bot Multi-usuário com Controle de Acesso
 """
 import json
 import requests
-import threading
+from datetime import datetime
 from bot_otimizado import BotOtimizado
+from sheets_particionado import SheetsParticionado
+from src.outbound import PRIORIDADE_CONFIRMACAO, PRIORIDADE_RELATORIO
 
 class BotMultiUsuario(BotOtimizado):
+    nome = 'bot_multiusuario'
+    
     def __init__(self):
         super().__init__()
         self.usuarios_file = 'usuarios.json'
         self.carregar_usuarios()
     
+    def conectar_planilha(self):
+        """Gastos de cada usuário na planilha particionada (ver migrar_para_particoes.py)"""
+        return SheetsParticionado()
+    
     def carregar_usuarios(self):
         """Carrega lista de usuários autorizados"""
         try:
@@ -103,28 +111,31 @@ Este bot é privado. Entre em contato com o administrador para solicitar acesso.
             if comando in ["usuarios", "add"] or comando.startswith("add"):
                 self.processar_comando_admin(comando, chat_id, texto)
                 return
+            
+            if comando == "saldo":
+                # Saldo só dos gastos do próprio usuário
+                self.enviar_rapido(chat_id, "💰 Calculando saldo...")
+                total = self.sheets.calcular_saldo_mes(chat_id)
+                mes = datetime.now().strftime("%m/%Y")
+                self.enviar_rapido(chat_id, f"💰 Seu saldo {mes}: R$ {total:.2f}", PRIORIDADE_RELATORIO)
+                return
         
         # Processamento normal
         super().processar_mensagem(chat_id, texto)
     
-    def salvar_async(self, descricao, valor, categoria, chat_id):
-        """Salvamento com identificação do usuário"""
-        def salvar():
-            try:
-                # Adicionar identificação do usuário na descrição
-                usuario = next((u["nome"] for u in self.usuarios_data["usuarios_autorizados"] 
-                              if u["chat_id"] == chat_id), f"ID:{chat_id}")
-                
-                descricao_completa = f"{descricao} ({usuario})"
-                
-                if self.sheets.adicionar_gasto(descricao_completa, valor, categoria):
-                    self.enviar_rapido(chat_id, f"✅ {descricao} - R$ {valor:.2f}\n📂 {categoria.title()}")
-                else:
-                    self.enviar_rapido(chat_id, "❌ Erro ao salvar")
-            except:
-                self.enviar_rapido(chat_id, "❌ Erro ao salvar")
+    def salvar(self, descricao, valor, categoria, chat_id):
+        """Salvamento na partição do usuário (roda no worker do chat)"""
+        usuario = next((u["nome"] for u in self.usuarios_data["usuarios_autorizados"] 
+                      if u["chat_id"] == chat_id), f"ID:{chat_id}")
         
-        threading.Thread(target=salvar, daemon=True).start()
+        try:
+            if self.sheets.adicionar_gasto(chat_id, usuario, descricao, valor, categoria):
+                self.enviar_rapido(chat_id, f"✅ {descricao} - R$ {valor:.2f}\n📂 {categoria.title()}",
+                                   PRIORIDADE_CONFIRMACAO)
+            else:
+                self.enviar_rapido(chat_id, "❌ Erro ao salvar")
+        except:
+            self.enviar_rapido(chat_id, "❌ Erro ao salvar")
 
 if __name__ == "__main__":
     bot = BotMultiUsuario()
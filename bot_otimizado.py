@@ -3,70 +3,49 @@
 Bot Telegram Otimizado - Resposta Rápida
 """
 import requests
-import time
-import re
-import threading
 from datetime import datetime
 from config_telegram import TelegramConfig
 from sheets_telegram import SheetsService
+from src.pipeline import PipelineUpdates, EnviadorMensagens
+from src.dedup import RegistroUpdates
+from src.expense_engine import interpretar_mensagem
+from src.outbound import PRIORIDADE_CONFIRMACAO, PRIORIDADE_NORMAL, PRIORIDADE_RELATORIO
 
 class BotOtimizado:
+    # Nome do registro de updates (cada bot tem o seu)
+    nome = 'bot_otimizado'
+    
     def __init__(self):
         TelegramConfig.validate()
         self.token = TelegramConfig.TOKEN
         self.base_url = f"https://api.telegram.org/bot{self.token}"
-        self.sheets = SheetsService()
+        self.sheets = self.conectar_planilha()
         
         # Cache de sessão HTTP para conexões rápidas
         self.session = requests.Session()
         self.session.timeout = 5
         
-        # Categorias otimizadas
-        self.categorias = {
-            'alimentação': ['mercado', 'supermercado', 'restaurante', 'lanche', 'pizza', 'comida', 'ifood'],
-            'transporte': ['uber', 'taxi', 'gasolina', 'combustível', 'ônibus', '99'],
-            'saúde': ['farmácia', 'médico', 'hospital', 'remédio', 'consulta'],
-            'lazer': ['cinema', 'bar', 'show', 'viagem', 'netflix'],
-            'casa': ['luz', 'água', 'internet', 'aluguel', 'condomínio'],
-            'outros': []
-        }
-    
-    def extrair_valor(self, texto):
-        """Extração otimizada de valor"""
-        match = re.search(r'(\d+(?:[.,]\d{1,2})?)', re.sub(r'r\$|reais?', '', texto, flags=re.IGNORECASE))
-        return float(match.group().replace(',', '.')) if match else None
+        # Envio com limites do Telegram (no lugar de uma thread por mensagem)
+        self.enviador = EnviadorMensagens(self.base_url, self.session, timeout=5)
     
-    def categorizar(self, descricao):
-        """Categorização otimizada"""
-        desc_lower = descricao.lower()
-        for cat, palavras in self.categorias.items():
-            if any(p in desc_lower for p in palavras):
-                return cat
-        return 'outros'
+    def conectar_planilha(self):
+        """Serviço de planilha usado pelo bot"""
+        return SheetsService()
     
-    def enviar_rapido(self, chat_id, texto):
+    def enviar_rapido(self, chat_id, texto, prioridade=PRIORIDADE_NORMAL):
         """Envio otimizado - não bloqueia"""
-        def enviar():
-            try:
-                self.session.post(f"{self.base_url}/sendMessage", 
-                                json={"chat_id": chat_id, "text": texto})
-            except:
-                pass
-        
-        threading.Thread(target=enviar, daemon=True).start()
+        self.enviador.enviar(chat_id, texto, prioridade)
     
-    def salvar_async(self, descricao, valor, categoria, chat_id):
-        """Salvamento assíncrono - não bloqueia resposta"""
-        def salvar():
-            try:
-                if self.sheets.adicionar_gasto(descricao, valor, categoria):
-                    self.enviar_rapido(chat_id, f"✅ {descricao} - R$ {valor:.2f}\n📂 {categoria.title()}")
-                else:
-                    self.enviar_rapido(chat_id, "❌ Erro ao salvar")
-            except:
+    def salvar(self, descricao, valor, categoria, chat_id):
+        """Salva o gasto (roda no worker do chat, a resposta já foi enviada)"""
+        try:
+            if self.sheets.adicionar_gasto(descricao, valor, categoria):
+                self.enviar_rapido(chat_id, f"✅ {descricao} - R$ {valor:.2f}\n📂 {categoria.title()}",
+                                   PRIORIDADE_CONFIRMACAO)
+            else:
                 self.enviar_rapido(chat_id, "❌ Erro ao salvar")
-        
-        threading.Thread(target=salvar, daemon=True).start()
+        except:
+            self.enviar_rapido(chat_id, "❌ Erro ao salvar")
     
     def processar_mensagem(self, chat_id, texto):
         """Processamento otimizado"""
@@ -76,25 +55,23 @@ class BotOtimizado:
             if comando == "start":
                 self.enviar_rapido(chat_id, "🤖 Bot funcionando!\n\nDigite: mercado 50")
             elif comando == "saldo":
-                # Resposta imediata, cálculo em background
+                # Resposta imediata; o cálculo segue no worker do chat
                 self.enviar_rapido(chat_id, "💰 Calculando saldo...")
-                def calcular():
-                    total = self.sheets.calcular_saldo_mes()
-                    mes = datetime.now().strftime("%m/%Y")
-                    self.enviar_rapido(chat_id, f"💰 Saldo {mes}: R$ {total:.2f}")
-                threading.Thread(target=calcular, daemon=True).start()
+                total = self.sheets.calcular_saldo_mes()
+                mes = datetime.now().strftime("%m/%Y")
+                self.enviar_rapido(chat_id, f"💰 Saldo {mes}: R$ {total:.2f}", PRIORIDADE_RELATORIO)
         else:
             # Processar gasto
-            valor = self.extrair_valor(texto)
+            gasto = interpretar_mensagem(texto)
+            valor = gasto.valor
             if valor:
-                descricao = re.sub(r'\d+(?:[.,]\d{1,2})?|r\$|reais?', '', texto, flags=re.IGNORECASE).strip()
-                categoria = self.categorizar(descricao)
+                descricao, categoria = gasto.descricao, gasto.categoria
                 
                 # Resposta IMEDIATA
-                self.enviar_rapido(chat_id, f"⏳ Salvando: {descricao} - R$ {valor:.2f}")
+                self.enviar_rapido(chat_id, f"⏳ Salvando: {descricao} - R$ {valor:.2f}", PRIORIDADE_CONFIRMACAO)
                 
-                # Salvamento em background
-                self.salvar_async(descricao, valor, categoria, chat_id)
+                # Salvamento no worker do chat (outros chats seguem em paralelo)
+                self.salvar(descricao, valor, categoria, chat_id)
             else:
                 self.enviar_rapido(chat_id, "❌ Valor não identificado")
     
@@ -102,41 +79,24 @@ class BotOtimizado:
         """Loop principal otimizado"""
         print("🚀 Bot Otimizado iniciado!")
         
-        # Limpar mensagens antigas
+        registro = RegistroUpdates(caminho=TelegramConfig.arquivo_updates(self.nome))
+        pipeline = PipelineUpdates(self.processar_update, workers=TelegramConfig.WORKERS,
+                                   tamanho_fila=TelegramConfig.TAMANHO_FILA, registro=registro)
         try:
-            r = self.session.get(f"{self.base_url}/getUpdates")
-            if r.json().get("result"):
-                last_id = r.json()["result"][-1]["update_id"]
-                self.session.get(f"{self.base_url}/getUpdates?offset={last_id + 1}")
-        except:
+            pipeline.executar_long_poll(self.base_url, self.session)
+        except KeyboardInterrupt:
             pass
-        
-        offset = None
-        while True:
-            try:
-                r = self.session.get(f"{self.base_url}/getUpdates", 
-                                   params={"timeout": 3, "offset": offset})
-                data = r.json()
-                
-                if data.get("ok") and data["result"]:
-                    for update in data["result"]:
-                        if "message" in update:
-                            msg = update["message"]
-                            chat_id = msg["chat"]["id"]
-                            texto = msg.get("text", "").strip()
-                            
-                            if texto:
-                                print(f"📱 {chat_id}: {texto}")
-                                self.processar_mensagem(chat_id, texto)
-                        
-                        offset = update["update_id"] + 1
-                
-                time.sleep(0.5)  # Polling mais rápido
-                
-            except KeyboardInterrupt:
-                break
-            except:
-                time.sleep(2)
+    
+    def processar_update(self, update):
+        """Processa um update (executado nos workers do pipeline)"""
+        if "message" in update:
+            msg = update["message"]
+            chat_id = msg["chat"]["id"]
+            texto = msg.get("text", "").strip()
+            
+            if texto:
+                print(f"📱 {chat_id}: {texto}")
+                self.processar_mensagem(chat_id, texto)
 
 if __name__ == "__main__":
     bot = BotOtimizado()
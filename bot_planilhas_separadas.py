@@ -1,21 +1,22 @@
 #!/usr/bin/env python3
 """
-Bot com Planilhas Separadas por Usuário
+Bot com Gastos Separados por Usuário (planilha única particionada)
 """
 import json
 import requests
 import threading
-import re
 from datetime import datetime
 from config_telegram import TelegramConfig
-from sheets_multiusuario import SheetsMultiUsuario
+from sheets_particionado import SheetsParticionado
+from src.expense_engine import interpretar_mensagem
 
 class BotPlanilhasSeparadas:
     def __init__(self):
         TelegramConfig.validate()
         self.token = TelegramConfig.TOKEN
         self.base_url = f"https://api.telegram.org/bot{self.token}"
-        self.sheets = SheetsMultiUsuario()
+        # Gastos migrados das planilhas pessoais com migrar_para_particoes.py
+        self.sheets = SheetsParticionado()
         
         # Cache de sessão HTTP
         self.session = requests.Session()
@@ -24,16 +25,6 @@ class BotPlanilhasSeparadas:
         # Usuários e configurações
         self.usuarios_file = 'usuarios.json'
         self.carregar_usuarios()
-        
-        # Categorias
-        self.categorias = {
-            'alimentação': ['mercado', 'supermercado', 'restaurante', 'lanche', 'pizza', 'comida', 'ifood'],
-            'transporte': ['uber', 'taxi', 'gasolina', 'combustível', 'ônibus', '99'],
-            'saúde': ['farmácia', 'médico', 'hospital', 'remédio', 'consulta'],
-            'lazer': ['cinema', 'bar', 'show', 'viagem', 'netflix'],
-            'casa': ['luz', 'água', 'internet', 'aluguel', 'condomínio'],
-            'outros': []
-        }
     
     def carregar_usuarios(self):
         """Carrega usuários"""
@@ -72,19 +63,6 @@ class BotPlanilhasSeparadas:
             return True
         return False
     
-    def extrair_valor(self, texto):
-        """Extrai valor do texto"""
-        match = re.search(r'(\d+(?:[.,]\d{1,2})?)', re.sub(r'r\$|reais?', '', texto, flags=re.IGNORECASE))
-        return float(match.group().replace(',', '.')) if match else None
-    
-    def categorizar(self, descricao):
-        """Categoriza gasto"""
-        desc_lower = descricao.lower()
-        for cat, palavras in self.categorias.items():
-            if any(p in desc_lower for p in palavras):
-                return cat
-        return 'outros'
-    
     def enviar_rapido(self, chat_id, texto):
         """Envio rápido"""
         def enviar():
@@ -102,7 +80,7 @@ class BotPlanilhasSeparadas:
         if not usuario and self.usuarios_data["configuracoes"]["permitir_novos_usuarios"]:
             self.adicionar_usuario_automatico(chat_id, nome_usuario)
             usuario = self.get_usuario(chat_id)
-            self.enviar_rapido(chat_id, f"🎉 Bem-vindo {nome_usuario}!\n\nSua planilha pessoal foi criada.")
+            self.enviar_rapido(chat_id, f"🎉 Bem-vindo {nome_usuario}!\n\nJá pode registrar seus gastos.")
         
         if not usuario or not usuario["ativo"]:
             self.enviar_rapido(chat_id, "❌ Usuário não autorizado")
@@ -116,7 +94,7 @@ class BotPlanilhasSeparadas:
                 sheet_id = self.sheets.get_user_sheet_id(chat_id, usuario["nome"])
                 msg = f"""🤖 *Olá {usuario["nome"]}!*
 
-✅ Sua planilha pessoal está pronta!
+✅ Seus gastos ficam separados dos outros usuários!
 
 *Como usar:*
 • mercado 50
@@ -125,7 +103,6 @@ class BotPlanilhasSeparadas:
 
 *Comandos:*
 /saldo - Seu saldo
-/planilha - Link da sua planilha
 /dashboard - Seu dashboard pessoal"""
                 
                 self.enviar_rapido(chat_id, msg)
@@ -138,20 +115,23 @@ class BotPlanilhasSeparadas:
                 threading.Thread(target=calcular, daemon=True).start()
             
             elif comando == "planilha":
+                # A planilha é compartilhada por todos: o link fica só para admins
                 sheet_id = self.sheets.get_user_sheet_id(chat_id, usuario["nome"])
-                if sheet_id:
+                if not usuario.get("admin"):
+                    self.enviar_rapido(chat_id, f"📊 Veja seus gastos em: http://localhost:8001/user/{chat_id}")
+                elif sheet_id:
                     link = f"https://docs.google.com/spreadsheets/d/{sheet_id}/edit"
-                    self.enviar_rapido(chat_id, f"📊 *Sua Planilha Pessoal*\n\n{link}")
+                    self.enviar_rapido(chat_id, f"📊 *Planilha*\n\n{link}")
             
             elif comando == "dashboard":
                 self.enviar_rapido(chat_id, f"📊 *Seu Dashboard Pessoal*\n\nhttp://localhost:8001/user/{chat_id}")
         
         else:
             # Processar gasto na planilha do usuário
-            valor = self.extrair_valor(texto)
+            gasto = interpretar_mensagem(texto)
+            valor = gasto.valor
             if valor:
-                descricao = re.sub(r'\d+(?:[.,]\d{1,2})?|r\$|reais?', '', texto, flags=re.IGNORECASE).strip()
-                categoria = self.categorizar(descricao)
+                descricao, categoria = gasto.descricao, gasto.categoria
                 
                 # Resposta imediata
                 self.enviar_rapido(chat_id, f"⏳ Salvando na sua planilha...")
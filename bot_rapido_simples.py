@@ -4,13 +4,13 @@ Bot Rápido e Simples - Baseado no que funcionava
 """
 import requests
 import time
-import re
 import threading
 import gspread
 from google.oauth2.service_account import Credentials
 from datetime import datetime
 import os
 from dotenv import load_dotenv
+from src.expense_engine import interpretar_mensagem
 
 load_dotenv()
 
@@ -64,20 +64,9 @@ def processar_mensagem(chat_id, texto, nome):
             enviar_mensagem(chat_id, "💰 Calculando saldo...")
     else:
         # Processar gasto
-        match = re.search(r'(\d+(?:[.,]\d{1,2})?)', texto)
-        if match:
-            valor = float(match.group().replace(',', '.'))
-            descricao = re.sub(r'\d+(?:[.,]\d{1,2})?|r\$|reais?', '', texto, flags=re.IGNORECASE).strip()
-            
-            # Categorizar
-            categoria = 'outros'
-            desc_lower = descricao.lower()
-            if any(x in desc_lower for x in ['mercado', 'supermercado', 'comida', 'lanche']):
-                categoria = 'alimentação'
-            elif any(x in desc_lower for x in ['uber', 'taxi', 'gasolina', 'combustível']):
-                categoria = 'transporte'
-            elif any(x in desc_lower for x in ['farmácia', 'médico', 'remédio']):
-                categoria = 'saúde'
+        gasto = interpretar_mensagem(texto)
+        if gasto.valor:
+            valor, descricao, categoria = gasto.valor, gasto.descricao, gasto.categoria
             
             # RESPOSTA IMEDIATA
             enviar_mensagem(chat_id, f"✅ {descricao} - R$ {valor:.2f}\n📂 {categoria.title()}")
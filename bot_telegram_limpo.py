@@ -19,8 +19,7 @@ sys.path.append('src')
 
 try:
     from src.sheets_service import SheetsService
-    from src.categories import categorizar_gasto
-    from src.utils import extrair_valor_melhorado, limpar_descricao
+    from src.expense_engine import interpretar_mensagem
 except ImportError as e:
     print(f"Erro ao importar módulos: {e}")
     sys.exit(1)
@@ -49,7 +48,7 @@ if not SHEET_ID:
 
 # Inicializar serviços
 try:
-    sheets_service = SheetsService()
+    sheets_service = SheetsService(journal_arquivo='gastos_journal_bot_limpo.jsonl')
     print(f"📊 Google Sheets: {'✅ Conectado' if sheets_service.is_connected() else '❌ Desconectado'}")
 except Exception as e:
     print(f"❌ Erro ao conectar Google Sheets: {e}")
@@ -85,10 +84,10 @@ def processar_mensagem(chat_id, texto):
             return
     
     # Processar gasto
-    valor = extrair_valor_melhorado(texto)
+    gasto = interpretar_mensagem(texto)
+    valor = gasto.valor
     if valor:
-        descricao = limpar_descricao(texto)
-        categoria = categorizar_gasto(descricao)
+        descricao, categoria = gasto.descricao, gasto.categoria
         
         print(f"  Valor: {valor}")
         print(f"  Descrição: '{descricao}'")
@@ -3,19 +3,25 @@
 Bot Ultra Rápido - Resposta em milissegundos
 """
 import requests
-import time
-import re
-import threading
 from datetime import datetime
 import gspread
 from google.oauth2.service_account import Credentials
 import os
 from dotenv import load_dotenv
+from src.write_queue import FilaEscrita
+from src.journal import JournalGastos
+from src.pipeline import PipelineUpdates
+from src.telegram_async import TelegramServiceAsync
+from src.expense_engine import interpretar_mensagem
+from src.dedup import RegistroUpdates
+from src.outbound import PRIORIDADE_CONFIRMACAO, PRIORIDADE_NORMAL
+from config_telegram import TelegramConfig
 
 load_dotenv()
 
 TOKEN = os.getenv('TELEGRAM_TOKEN')
 SHEET_ID = os.getenv('SHEET_ID')
+BASE_URL = f"https://api.telegram.org/bot{TOKEN}"
 
 # Sessão HTTP persistente para velocidade máxima
 session = requests.Session()
@@ -27,30 +33,40 @@ creds = Credentials.from_service_account_file('config/credentials.json',
 gc = gspread.authorize(creds)
 sheet = gc.open_by_key(SHEET_ID).sheet1
 
+# Gravações agrupadas em um único append_rows
+fila_escrita = FilaEscrita()
+
+# Journal local: a resposta instantânea só sai depois do gasto persistido em disco
+journal = JournalGastos('gastos_journal_ultra_rapido.jsonl',
+                        lambda chave, linha, reenvio: fila_escrita.enfileirar(sheet, linha, chave, reenvio))
+
+# Envio assíncrono (httpx, conexões keep-alive) com os limites e prioridades do agendador
+enviador = TelegramServiceAsync(TOKEN)
+
 print("🚀 Bot Ultra Rápido iniciado!")
 
-def enviar_instantaneo(chat_id, texto):
+def enviar_instantaneo(chat_id, texto, prioridade=PRIORIDADE_NORMAL):
     """Envio instantâneo sem esperar resposta"""
-    def enviar():
-        try:
-            session.post(f"https://api.telegram.org/bot{TOKEN}/sendMessage",
-                        json={"chat_id": chat_id, "text": texto})
-        except:
-            pass
-    threading.Thread(target=enviar, daemon=True).start()
+    enviador.enviar(chat_id, texto, prioridade)
 
-def salvar_background(descricao, valor, categoria):
-    """Salva em background sem bloquear"""
-    def salvar():
-        try:
-            hoje = datetime.now().strftime("%d/%m/%Y")
-            sheet.append_row([hoje, descricao, f"{valor:.2f}", categoria])
+def salvar_background(descricao, valor, categoria, update_id):
+    """Grava no journal (fsync) e salva em background na fila de gravação em lote"""
+    hoje = datetime.now().strftime("%d/%m/%Y")
+    future = journal.gravar(update_id, [hoje, descricao, f"{valor:.2f}", categoria])
+    if future is None:
+        # Update repetido: gasto já registrado
+        return
+    
+    def confirmar(f):
+        if f.exception():
+            # Continua no journal e será reenviado automaticamente
+            print(f"❌ Erro ao salvar (pendente no journal): {f.exception()}")
+        else:
             print(f"💾 Salvo: {descricao} - R$ {valor:.2f}")
-        except Exception as e:
-            print(f"❌ Erro ao salvar: {e}")
-    threading.Thread(target=salvar, daemon=True).start()
+    
+    future.add_done_callback(confirmar)
 
-def processar_rapido(chat_id, texto, nome):
+def processar_rapido(chat_id, texto, nome, update_id):
     """Processamento ultra rápido"""
     print(f"⚡ {nome}: {texto}")
     
@@ -60,65 +76,38 @@ def processar_rapido(chat_id, texto, nome):
         elif texto == "/saldo":
             enviar_instantaneo(chat_id, "💰 Calculando...")
     else:
-        # Extrair valor instantaneamente
-        match = re.search(r'(\d+(?:[.,]\d{1,2})?)', texto)
-        if match:
-            valor = float(match.group().replace(',', '.'))
-            descricao = re.sub(r'\d+(?:[.,]\d{1,2})?|r\$|reais?', '', texto, flags=re.IGNORECASE).strip()
+        # Valor, descrição e categoria em uma única passada (motor compartilhado)
+        gasto = interpretar_mensagem(texto)
+        if gasto.valor:
+            valor, descricao, categoria = gasto.valor, gasto.descricao, gasto.categoria
             
-            # Categorização rápida
-            categoria = 'outros'
-            if any(x in descricao.lower() for x in ['mercado', 'supermercado', 'comida']):
-                categoria = 'alimentação'
-            elif any(x in descricao.lower() for x in ['uber', 'taxi', 'gasolina']):
-                categoria = 'transporte'
-            elif any(x in descricao.lower() for x in ['farmácia', 'médico']):
-                categoria = 'saúde'
+            # Persistir no journal e salvar em background
+            salvar_background(descricao, valor, categoria, update_id)
             
             # RESPOSTA INSTANTÂNEA
-            enviar_instantaneo(chat_id, f"✅ {descricao} - R$ {valor:.2f}")
-            
-            # Salvar em background
-            salvar_background(descricao, valor, categoria)
+            enviar_instantaneo(chat_id, f"✅ {descricao} - R$ {valor:.2f}", PRIORIDADE_CONFIRMACAO)
         else:
             enviar_instantaneo(chat_id, "❌ Valor não identificado")
 
-# Limpar cache
-try:
-    r = session.get(f"https://api.telegram.org/bot{TOKEN}/getUpdates")
-    if r.json().get("result"):
-        last_id = r.json()["result"][-1]["update_id"]
-        session.get(f"https://api.telegram.org/bot{TOKEN}/getUpdates?offset={last_id + 1}")
-        print("🧹 Cache limpo")
-except:
-    pass
-
 print("⚡ Modo ultra rápido ativo!")
 
-offset = None
-while True:
-    try:
-        # Polling ultra rápido
-        r = session.get(f"https://api.telegram.org/bot{TOKEN}/getUpdates", 
-                       params={"timeout": 1, "offset": offset})
-        data = r.json()
-        
-        if data.get("ok") and data["result"]:
-            for update in data["result"]:
-                if "message" in update:
-                    msg = update["message"]
-                    chat_id = msg["chat"]["id"]
-                    texto = msg.get("text", "").strip()
-                    nome = msg["from"].get("first_name", "User")
-                    
-                    if texto:
-                        processar_rapido(chat_id, texto, nome)
-                
-                offset = update["update_id"] + 1
-        
-        # Sem delay - máxima velocidade
+def processar_update(update):
+    """Processa um update (executado nos workers do pipeline)"""
+    if "message" in update:
+        msg = update["message"]
+        chat_id = msg["chat"]["id"]
+        texto = msg.get("text", "").strip()
+        nome = msg["from"].get("first_name", "User")
         
-    except KeyboardInterrupt:
-        break
-    except:
-        time.sleep(1)
\ No newline at end of file
+        if texto:
+            processar_rapido(chat_id, texto, nome, update["update_id"])
+
+registro = RegistroUpdates(caminho=TelegramConfig.arquivo_updates('bot_ultra_rapido'))
+pipeline = PipelineUpdates(processar_update, workers=TelegramConfig.WORKERS,
+                           tamanho_fila=TelegramConfig.TAMANHO_FILA, registro=registro)
+# Reenviar gastos que ficaram pendentes no journal
+journal.iniciar_reenvio(intervalo=60)
+try:
+    pipeline.executar_long_poll(BASE_URL, session)
+except KeyboardInterrupt:
+    pass
@@ -22,6 +22,27 @@ class TelegramConfig:
         "https://www.googleapis.com/auth/drive"
     ]
     
+    # Pipeline de updates
+    WORKERS = int(os.getenv('BOT_WORKERS', '4'))
+    TAMANHO_FILA = int(os.getenv('BOT_TAMANHO_FILA', '1000'))
+    UPDATES_DIR = os.getenv('UPDATES_DIR', '.')
+    
+    # Pool de planilhas por usuário
+    POOL_PLANILHAS_TAMANHO = int(os.getenv('POOL_PLANILHAS_TAMANHO', '500'))
+    POOL_PLANILHAS_TTL = int(os.getenv('POOL_PLANILHAS_TTL', '3600'))
+    
+    # Planilha única multiusuário: quantidade de abas de partição
+    PARTICOES_PLANILHA = int(os.getenv('PARTICOES_PLANILHA', '16'))
+    
+    # Dashboard por usuário: snapshots materializados em background
+    PAINEL_INTERVALO_ATUALIZACAO = int(os.getenv('PAINEL_INTERVALO_ATUALIZACAO', '30'))
+    PAINEL_GZIP = os.getenv('PAINEL_GZIP', 'true').lower() == 'true'
+    
+    @classmethod
+    def arquivo_updates(cls, bot):
+        """Registro de updates processados do bot (um arquivo por bot)"""
+        return os.path.join(cls.UPDATES_DIR, f'updates_{bot}.bin')
+    
     @classmethod
     def validate(cls):
         """Valida configurações"""
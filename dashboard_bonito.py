@@ -2,16 +2,24 @@
 """
 Dashboard Bonito com Gráficos e Rankings
 """
-from flask import Flask, jsonify
+from flask import Flask, jsonify, request
 import gspread
 from google.oauth2.service_account import Credentials
 from datetime import datetime, timedelta
 import os
 from dotenv import load_dotenv
+from src.sheet_sync import SincronizadorIncremental
+from src.response_cache import CacheRespostas
+from src.event_bus import BarramentoEventos
+from src.change_log import DiarioMudancas
 
 load_dotenv()
 
 app = Flask(__name__)
+cache_respostas = CacheRespostas()
+barramento = BarramentoEventos()
+diario = DiarioMudancas()
+EVENTOS_INTERVALO = int(os.getenv('EVENTOS_INTERVALO', 10))
 
 # Conectar Google Sheets
 SHEET_ID = os.getenv('SHEET_ID')
@@ -20,10 +28,17 @@ try:
         scopes=["https://spreadsheets.google.com/feeds", "https://www.googleapis.com/auth/drive"])
     gc = gspread.authorize(creds)
     sheet = gc.open_by_key(SHEET_ID).sheet1
+    sincronizador = SincronizadorIncremental(sheet)
+    sincronizador.adicionar_ouvinte(cache_respostas.ao_mudar)
+    sincronizador.adicionar_ouvinte(diario.ao_mudar)
+    # Enquanto houver dashboards abertos, uma verificação da planilha serve a todos
+    sincronizador.adicionar_ouvinte(barramento.ao_mudar())
+    barramento.vigiar(sincronizador.sincronizar, EVENTOS_INTERVALO)
     print("✅ Dashboard conectado")
 except Exception as e:
     print(f"❌ Erro: {e}")
     sheet = None
+    sincronizador = None
 
 @app.route("/")
 def dashboard():
@@ -273,13 +288,24 @@ def dashboard():
         </div>
         
         <script>
+            let dados = {};
+            
             async function loadData() {
                 try {
                     document.getElementById('loading').style.display = 'block';
                     document.getElementById('dashboard').style.display = 'none';
                     
-                    const response = await fetch('/api/dashboard-data');
-                    const data = await response.json();
+                    // Com o cursor da última resposta, o servidor envia só o que mudou
+                    let url = '/api/dashboard-data';
+                    if (dados.cursor) url += `?since=${encodeURIComponent(dados.cursor)}`;
+                    const response = await fetch(url);
+                    const resposta = await response.json();
+                    if (resposta.completo === false) {
+                        Object.assign(dados, resposta.alterados, {cursor: resposta.cursor});
+                    } else {
+                        dados = resposta;
+                    }
+                    const data = dados;
                     
                     // Atualizar estatísticas
                     document.getElementById('gastoMes').textContent = `R$ ${data.gastoMes.toFixed(2)}`;
@@ -290,6 +316,7 @@ def dashboard():
                     
                     // Gráfico de categorias
                     const ctx1 = document.getElementById('categoryChart').getContext('2d');
+                    Chart.getChart(ctx1)?.destroy();  // recria o gráfico a cada atualização ao vivo
                     new Chart(ctx1, {
                         type: 'doughnut',
                         data: {
@@ -321,6 +348,7 @@ def dashboard():
                     
                     // Gráfico semanal
                     const ctx2 = document.getElementById('weekChart').getContext('2d');
+                    Chart.getChart(ctx2)?.destroy();
                     new Chart(ctx2, {
                         type: 'line',
                         data: {
@@ -405,8 +433,14 @@ def dashboard():
             // Carregar dados ao iniciar
             loadData();
             
-            // Atualizar automaticamente a cada 30 segundos
-            setInterval(loadData, 30000);
+            // Atualização ao vivo: o servidor avisa quando há gastos novos
+            if (window.EventSource) {
+                const eventos = new EventSource('/api/eventos');
+                eventos.addEventListener('gastos', loadData);
+                eventos.addEventListener('recarregar', loadData);
+            } else {
+                setInterval(loadData, 30000);
+            }
         </script>
     </body>
     </html>
@@ -419,80 +453,96 @@ def dashboard_data():
         return jsonify({"error": "Planilha não conectada"}), 500
     
     try:
-        gastos = sheet.get_all_records()
-        
-        # Estatísticas básicas
-        total_geral = sum(float(str(g.get('Valor', '0')).replace(',', '.')) for g in gastos if g.get('Valor'))
-        
-        # Saldo do mês atual
-        mes_atual = datetime.now().strftime("%m/%Y")
-        gastos_mes = [g for g in gastos if mes_atual in str(g.get('Data', ''))]
-        total_mes = sum(float(str(g.get('Valor', '0')).replace(',', '.')) for g in gastos_mes)
+        # Baixa apenas as linhas novas ou alteradas; se houver mudança o cache é invalidado
+        sincronizador.sincronizar()
         
-        # Média por gasto
-        media_gasto = total_geral / len(gastos) if gastos else 0
-        
-        # Gastos por categoria
-        categorias = {}
-        for gasto in gastos:
-            cat = gasto.get('Categoria', 'outros').title()
-            valor_str = str(gasto.get('Valor', '0')).replace(',', '.')
-            try:
-                valor = float(valor_str)
-                categorias[cat] = categorias.get(cat, 0) + valor
-            except:
-                continue
-        
-        # Últimos 7 dias
-        hoje = datetime.now()
-        ultimos_dias = {(hoje - timedelta(days=i)).strftime('%d/%m'): 0 for i in range(6, -1, -1)}
-        
-        for gasto in gastos:
-            data_str = gasto.get('Data', '')
-            if '/' in data_str:
-                try:
-                    data_gasto = datetime.strptime(data_str, '%d/%m/%Y')
-                    if (hoje - data_gasto).days <= 7:
-                        dia_key = data_gasto.strftime('%d/%m')
-                        if dia_key in ultimos_dias:
-                            valor = float(str(gasto.get('Valor', '0')).replace(',', '.'))
-                            ultimos_dias[dia_key] += valor
-                except:
-                    continue
-        
-        # Maiores gastos individuais
-        maiores_gastos = []
-        for gasto in gastos:
+        # ?since=<cursor>: só os gastos e os campos alterados desde a resposta anterior
+        desde = request.args.get('since')
+        if desde:
+            return jsonify(diario.delta(('dashboard-data',), desde, calcular_dados_dashboard))
+        return cache_respostas.responder(('dashboard-data', None, None),
+                                         lambda: diario.completo(('dashboard-data',), calcular_dados_dashboard))
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route("/api/eventos")
+def eventos():
+    """Stream SSE com os gastos adicionados ou removidos"""
+    return barramento.responder()
+
+def calcular_dados_dashboard():
+    """Calcula os dados do dashboard a partir da cópia local da planilha"""
+    gastos = sincronizador.registros()
+    
+    # Estatísticas básicas
+    total_geral = sum(float(str(g.get('Valor', '0')).replace(',', '.')) for g in gastos if g.get('Valor'))
+    
+    # Saldo do mês atual
+    mes_atual = datetime.now().strftime("%m/%Y")
+    gastos_mes = [g for g in gastos if mes_atual in str(g.get('Data', ''))]
+    total_mes = sum(float(str(g.get('Valor', '0')).replace(',', '.')) for g in gastos_mes)
+    
+    # Média por gasto
+    media_gasto = total_geral / len(gastos) if gastos else 0
+    
+    # Gastos por categoria
+    categorias = {}
+    for gasto in gastos:
+        cat = gasto.get('Categoria', 'outros').title()
+        valor_str = str(gasto.get('Valor', '0')).replace(',', '.')
+        try:
+            valor = float(valor_str)
+            categorias[cat] = categorias.get(cat, 0) + valor
+        except:
+            continue
+    
+    # Últimos 7 dias
+    hoje = datetime.now()
+    ultimos_dias = {(hoje - timedelta(days=i)).strftime('%d/%m'): 0 for i in range(6, -1, -1)}
+    
+    for gasto in gastos:
+        data_str = gasto.get('Data', '')
+        if '/' in data_str:
             try:
-                valor = float(str(gasto.get('Valor', '0')).replace(',', '.'))
-                maiores_gastos.append({
-                    'descricao': gasto.get('Descrição', 'N/A'),
-                    'valor': gasto.get('Valor', '0'),
-                    'data': gasto.get('Data', 'N/A'),
-                    'valor_num': valor
-                })
+                data_gasto = datetime.strptime(data_str, '%d/%m/%Y')
+                if (hoje - data_gasto).days <= 7:
+                    dia_key = data_gasto.strftime('%d/%m')
+                    if dia_key in ultimos_dias:
+                        valor = float(str(gasto.get('Valor', '0')).replace(',', '.'))
+                        ultimos_dias[dia_key] += valor
             except:
                 continue
-        
-        maiores_gastos.sort(key=lambda x: x['valor_num'], reverse=True)
-        maiores_gastos = maiores_gastos[:5]
-        
-        return jsonify({
-            'gastoMes': total_mes,
-            'totalGeral': total_geral,
-            'totalGastos': len(gastos),
-            'mediaGasto': media_gasto,
-            'categorias': categorias,
-            'planilhaLink': f"https://docs.google.com/spreadsheets/d/{SHEET_ID}/edit",
-            'ultimosDias': {
-                'labels': list(ultimos_dias.keys()),
-                'values': list(ultimos_dias.values())
-            },
-            'maioresGastos': maiores_gastos
-        })
-        
-    except Exception as e:
-        return jsonify({'error': str(e)}), 500
+    
+    # Maiores gastos individuais
+    maiores_gastos = []
+    for gasto in gastos:
+        try:
+            valor = float(str(gasto.get('Valor', '0')).replace(',', '.'))
+            maiores_gastos.append({
+                'descricao': gasto.get('Descrição', 'N/A'),
+                'valor': gasto.get('Valor', '0'),
+                'data': gasto.get('Data', 'N/A'),
+                'valor_num': valor
+            })
+        except:
+            continue
+    
+    maiores_gastos.sort(key=lambda x: x['valor_num'], reverse=True)
+    maiores_gastos = maiores_gastos[:5]
+    
+    return {
+        'gastoMes': total_mes,
+        'totalGeral': total_geral,
+        'totalGastos': len(gastos),
+        'mediaGasto': media_gasto,
+        'categorias': categorias,
+        'planilhaLink': f"https://docs.google.com/spreadsheets/d/{SHEET_ID}/edit",
+        'ultimosDias': {
+            'labels': list(ultimos_dias.keys()),
+            'values': list(ultimos_dias.values())
+        },
+        'maioresGastos': maiores_gastos
+    }
 
 if __name__ == "__main__":
     app.run(host='0.0.0.0', port=8000, debug=True)
\ No newline at end of file
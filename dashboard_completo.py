@@ -5,11 +5,18 @@ Dashboard Completo - Controle Financeiro Avançado
 from flask import Flask, jsonify, request
 import gspread
 from google.oauth2.service_account import Credentials
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, date
 import calendar
 import json
 import os
 from dotenv import load_dotenv
+from src.sheet_sync import SincronizadorIncremental
+from src.models import chave_mes
+from src.columnar import ColunasGastos
+from src.analytics import AnalisePeriodo
+from src.response_cache import CacheRespostas
+from src.event_bus import BarramentoEventos
+from src.change_log import DiarioMudancas
 
 load_dotenv()
 
@@ -18,6 +25,7 @@ app = Flask(__name__)
 # Conectar Google Sheets - FORÇAR LEITURA DAS VARIÁVEIS
 SHEET_ID = os.environ.get('SHEET_ID')  # Usar environ em vez de getenv
 PORT = int(os.environ.get('PORT', 8000))
+EVENTOS_INTERVALO = int(os.environ.get('EVENTOS_INTERVALO', 10))
 GOOGLE_CREDENTIALS = os.environ.get('GOOGLE_CREDENTIALS')
 
 # Debug das variáveis
@@ -46,9 +54,11 @@ try:
     gc = gspread.authorize(creds)
     print(f"🔍 Tentando abrir planilha: {SHEET_ID}")
     sheet = gc.open_by_key(SHEET_ID).sheet1
+    sincronizador = SincronizadorIncremental(sheet)
     
-    # Testar conexão
-    test_records = sheet.get_all_records()
+    # Testar conexão (carga inicial completa)
+    sincronizador.sincronizar()
+    test_records = sincronizador.registros()
     print(f"✅ Dashboard conectado! {len(test_records)} registros encontrados")
     
 except Exception as e:
@@ -56,6 +66,47 @@ except Exception as e:
     print(f"❌ Variáveis: SHEET_ID={bool(SHEET_ID)}, CREDENTIALS={bool(GOOGLE_CREDENTIALS)}")
     print("❌ DEPLOY ATIVO - VERIFICANDO VARIÁVEIS")
     sheet = None
+    sincronizador = None
+
+_colunas = None
+cache_respostas = CacheRespostas()
+barramento = BarramentoEventos()
+diario = DiarioMudancas()
+
+def _invalidar_colunas(removidos, adicionados):
+    """Descarta o armazenamento colunar quando a planilha muda"""
+    global _colunas
+    _colunas = None
+
+if sincronizador:
+    sincronizador.adicionar_ouvinte(_invalidar_colunas)
+    sincronizador.adicionar_ouvinte(cache_respostas.ao_mudar)
+    sincronizador.adicionar_ouvinte(diario.ao_mudar)
+    # Enquanto houver dashboards abertos, uma verificação da planilha serve a todos
+    sincronizador.adicionar_ouvinte(barramento.ao_mudar())
+    barramento.vigiar(sincronizador.sincronizar, EVENTOS_INTERVALO)
+
+def obter_gastos():
+    """
+    Obtém os gastos baixando apenas as linhas novas ou alteradas.
+    Cada linha é convertida em Gasto uma única vez, na sincronização.
+    """
+    if not sincronizador:
+        return []
+    sincronizador.sincronizar()
+    return sincronizador.gastos()
+
+def obter_colunas():
+    """
+    Gastos em formato colunar para as análises por período.
+    Só é reconstruído quando a sincronização traz alguma mudança.
+    """
+    global _colunas
+    colunas = _colunas
+    if colunas is None:
+        colunas = ColunasGastos(sincronizador.gastos() if sincronizador else [])
+        _colunas = colunas
+    return colunas
 
 # Configurações (simulando banco de dados)
 CONFIG_FILE = 'dashboard_config.json'
@@ -423,6 +474,7 @@ def dashboard():
         
         <script>
             let currentData = {};
+            let currentPeriodo = null;
             
             async function loadData() {
                 try {
@@ -430,8 +482,19 @@ def dashboard():
                     document.getElementById('dashboard').style.display = 'none';
                     
                     const periodo = document.getElementById('periodoSelect').value;
-                    const response = await fetch(`/api/complete-data?periodo=${periodo}`);
-                    currentData = await response.json();
+                    // Mesmo período: envia o cursor e recebe só o que mudou
+                    let url = `/api/complete-data?periodo=${periodo}`;
+                    if (currentData.cursor && currentPeriodo === periodo) {
+                        url += `&since=${encodeURIComponent(currentData.cursor)}`;
+                    }
+                    const response = await fetch(url);
+                    const resposta = await response.json();
+                    if (resposta.completo === false) {
+                        Object.assign(currentData, resposta.alterados, {cursor: resposta.cursor});
+                    } else {
+                        currentData = resposta;
+                    }
+                    currentPeriodo = periodo;
                     
                     updateStats();
                     updateProgress();
@@ -496,6 +559,7 @@ def dashboard():
             function updateCharts() {
                 // Gráfico de categorias
                 const ctx1 = document.getElementById('categoryChart').getContext('2d');
+                Chart.getChart(ctx1)?.destroy();  // recria o gráfico a cada atualização ao vivo
                 new Chart(ctx1, {
                     type: 'doughnut',
                     data: {
@@ -510,6 +574,7 @@ def dashboard():
                 
                 // Gráfico semanal
                 const ctx2 = document.getElementById('weeklyChart').getContext('2d');
+                Chart.getChart(ctx2)?.destroy();
                 new Chart(ctx2, {
                     type: 'bar',
                     data: {
@@ -525,6 +590,7 @@ def dashboard():
                 
                 // Gráfico por dia da semana
                 const ctx3 = document.getElementById('weekdayChart').getContext('2d');
+                Chart.getChart(ctx3)?.destroy();
                 new Chart(ctx3, {
                     type: 'bar',
                     data: {
@@ -540,6 +606,7 @@ def dashboard():
                 
                 // Gráfico Top 5 Gastos
                 const ctx4 = document.getElementById('topGastosChart').getContext('2d');
+                Chart.getChart(ctx4)?.destroy();
                 new Chart(ctx4, {
                     type: 'bar',
                     data: {
@@ -599,8 +666,14 @@ def dashboard():
             // Carregar dados ao iniciar
             loadData();
             
-            // Atualizar automaticamente
-            setInterval(loadData, 60000);
+            // Atualização ao vivo: o servidor avisa quando há gastos novos
+            if (window.EventSource) {
+                const eventos = new EventSource('/api/eventos');
+                eventos.addEventListener('gastos', loadData);
+                eventos.addEventListener('recarregar', loadData);
+            } else {
+                setInterval(loadData, 60000);
+            }
         </script>
     </body>
     </html>
@@ -616,190 +689,117 @@ def complete_data():
     
     try:
         periodo = request.args.get('periodo', 'atual')
-        gastos = sheet.get_all_records()
-        print(f"📋 Total de gastos: {len(gastos)}")
-        config = load_config()
-        
-        # Análises por período
-        hoje = datetime.now()
-        
-        if periodo == 'atual':
-            mes_atual = hoje.strftime("%m/%Y")
-            gastos_periodo = [g for g in gastos if mes_atual in str(g.get('Data', ''))]
-        elif periodo == 'anterior':
-            mes_anterior = (hoje.replace(day=1) - timedelta(days=1)).strftime("%m/%Y")
-            gastos_periodo = [g for g in gastos if mes_anterior in str(g.get('Data', ''))]
-        else:  # ano
-            ano_atual = hoje.strftime("%Y")
-            gastos_periodo = [g for g in gastos if ano_atual in str(g.get('Data', ''))]
-        
-        # Cálculos básicos
-        gasto_atual = sum(float(str(g.get('Valor', '0')).replace(',', '.')) for g in gastos_periodo)
-        
-        # Meta mensal
-        meta_mensal = config.get('meta_mensal', 2000)
-        restante_meta = max(0, meta_mensal - gasto_atual)
-        
-        # Gastos últimos 7 dias
-        ultimos_7_dias = calcular_ultimos_7_dias(gastos)
-        
-        # Maior gasto individual do mês
-        maior_gasto = max([float(str(g.get('Valor', '0')).replace(',', '.')) for g in gastos_periodo], default=0)
-        
-        # Categorias
-        categorias = {}
-        for gasto in gastos_periodo:
-            cat = gasto.get('Categoria', 'outros').title()
-            valor = float(str(gasto.get('Valor', '0')).replace(',', '.'))
-            categorias[cat] = categorias.get(cat, 0) + valor
-        
-        # Evolução mensal (últimos 12 meses)
-        evolucao_mensal = calcular_evolucao_mensal(gastos, 12)
-        
-        # Gastos por dia da semana
-        gastos_por_dia = calcular_gastos_por_dia_semana(gastos_periodo)
-        
-        # Gastos por semana do mês
-        gastos_por_semana = calcular_gastos_por_semana_mes(gastos_periodo)
-        
-        # Top 5 maiores gastos
-        top_gastos = calcular_top_gastos(gastos_periodo, 5)
-        
-        # Insights
-        insights = gerar_insights(gastos, gastos_periodo, categorias)
-        
-        # Mudanças percentuais (comparação com mês anterior)
-        changes = calcular_mudancas_novas(gastos, gasto_atual, restante_meta, ultimos_7_dias, maior_gasto)
-        
-        return jsonify({
-            'gastoAtual': gasto_atual,
-            'restanteMeta': restante_meta,
-            'ultimos7Dias': ultimos_7_dias,
-            'maiorGasto': maior_gasto,
-            'categorias': categorias,
-            'gastosPorDia': gastos_por_dia,
-            'gastosPorSemana': gastos_por_semana,
-            'topGastos': top_gastos,
-            'insights': insights,
-            'planilhaLink': f"https://docs.google.com/spreadsheets/d/{SHEET_ID}/edit",
-            'changeAtual': changes['atual'],
-            'changeRestante': changes['restante'],
-            'change7Dias': changes['dias7'],
-            'changeMaior': changes['maior']
-        })
-        
+        # A sincronização invalida o cache se a planilha mudou
+        obter_gastos()
+        
+        # ?since=<cursor>: só os gastos e os campos alterados desde a resposta anterior
+        chave = ('complete-data', periodo)
+        desde = request.args.get('since')
+        if desde:
+            return jsonify(diario.delta(chave, desde, lambda: calcular_dados_completos(periodo)))
+        return cache_respostas.responder(('complete-data', periodo, None),
+                                         lambda: diario.completo(chave, lambda: calcular_dados_completos(periodo)))
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-def calcular_media_movel(gastos, meses):
-    """Calcula média móvel dos últimos N meses"""
+@app.route("/api/eventos")
+def eventos():
+    """Stream SSE com os gastos adicionados ou removidos"""
+    return barramento.responder()
+
+def calcular_dados_completos(periodo):
+    """Calcula todas as análises do dashboard para o período"""
+    gastos = sincronizador.gastos() if sincronizador else []
+    colunas = obter_colunas()
+    print(f"📋 Total de gastos: {len(gastos)}")
+    config = load_config()
+    
+    # Análises por período
     hoje = datetime.now()
-    total = 0
-    count = 0
     
-    for i in range(meses):
-        mes = (hoje.replace(day=1) - timedelta(days=i*30)).strftime("%m/%Y")
-        gastos_mes = [g for g in gastos if mes in str(g.get('Data', ''))]
-        total += sum(float(str(g.get('Valor', '0')).replace(',', '.')) for g in gastos_mes)
-        count += 1
+    if periodo == 'atual':
+        mes_inicio = mes_fim = chave_mes(hoje.year, hoje.month)
+    elif periodo == 'anterior':
+        mes_inicio = mes_fim = _mes_anterior(hoje)
+    else:  # ano
+        mes_inicio, mes_fim = chave_mes(hoje.year, 1), chave_mes(hoje.year, 12)
     
-    return total / count if count > 0 else 0
-
-def calcular_evolucao_mensal(gastos, meses):
-    """Calcula evolução dos últimos N meses"""
-    hoje = datetime.now()
-    labels = []
-    values = []
+    # Todas as métricas do período em uma única passada pelos gastos
+    analise = AnalisePeriodo(mes_inicio, mes_fim, _mes_anterior(hoje), limite_top=5).processar(gastos)
     
-    for i in range(meses-1, -1, -1):
-        mes_data = hoje.replace(day=1) - timedelta(days=i*30)
-        mes_str = mes_data.strftime("%m/%Y")
-        mes_label = mes_data.strftime("%b/%y")
-        
-        gastos_mes = [g for g in gastos if mes_str in str(g.get('Data', ''))]
-        total_mes = sum(float(str(g.get('Valor', '0')).replace(',', '.')) for g in gastos_mes)
-        
-        labels.append(mes_label)
-        values.append(total_mes)
+    # Cálculos básicos
+    gasto_atual = analise.total / 100
     
-    return {'labels': labels, 'values': values}
-
-def calcular_gastos_por_dia_semana(gastos_periodo):
-    """Calcula gastos por dia da semana"""
-    gastos_dia = [0] * 7  # Dom=0, Seg=1, ..., Sáb=6
+    # Meta mensal
+    meta_mensal = config.get('meta_mensal', 2000)
+    restante_meta = max(0, meta_mensal - gasto_atual)
     
-    for gasto in gastos_periodo:
-        try:
-            data_str = gasto.get('Data', '')
-            if '/' in data_str:
-                data = datetime.strptime(data_str, '%d/%m/%Y')
-                dia_semana = data.weekday()
-                dia_semana = (dia_semana + 1) % 7  # Ajustar para Dom=0
-                valor = float(str(gasto.get('Valor', '0')).replace(',', '.'))
-                gastos_dia[dia_semana] += valor
-        except:
-            continue
+    # Gastos últimos 7 dias
+    ultimos_7_dias = calcular_ultimos_7_dias(colunas)
     
-    return gastos_dia
-
-def calcular_tendencia(gastos):
-    """Calcula tendência dos últimos 30 dias"""
-    hoje = datetime.now()
-    labels = []
-    gastos_values = []
-    media_values = []
+    # Maior gasto individual do mês
+    maior_gasto = analise.maior / 100
     
-    for i in range(29, -1, -1):
-        data = hoje - timedelta(days=i)
-        data_str = data.strftime('%d/%m/%Y')
-        
-        gastos_dia = [g for g in gastos if data_str in str(g.get('Data', ''))]
-        total_dia = sum(float(str(g.get('Valor', '0')).replace(',', '.')) for g in gastos_dia)
-        
-        labels.append(data.strftime('%d/%m'))
-        gastos_values.append(total_dia)
-        
-        # Média móvel de 7 dias
-        if len(gastos_values) >= 7:
-            media_7_dias = sum(gastos_values[-7:]) / 7
-            media_values.append(media_7_dias)
-        else:
-            media_values.append(total_dia)
+    # Categorias
+    categorias = {cat: total / 100 for cat, total in analise.categorias.items()}
     
-    return {'labels': labels, 'gastos': gastos_values, 'media': media_values}
+    # Gastos por dia da semana
+    gastos_por_dia = calcular_gastos_por_dia_semana(analise)
+    
+    # Gastos por semana do mês
+    gastos_por_semana = calcular_gastos_por_semana_mes(analise)
+    
+    # Top 5 maiores gastos
+    top_gastos = calcular_top_gastos(analise)
+    
+    # Insights
+    insights = gerar_insights(analise, categorias)
+    
+    # Mudanças percentuais (comparação com mês anterior)
+    changes = calcular_mudancas_novas(analise, gasto_atual, restante_meta, ultimos_7_dias, maior_gasto)
+    
+    return {
+        'gastoAtual': gasto_atual,
+        'restanteMeta': restante_meta,
+        'ultimos7Dias': ultimos_7_dias,
+        'maiorGasto': maior_gasto,
+        'categorias': categorias,
+        'gastosPorDia': gastos_por_dia,
+        'gastosPorSemana': gastos_por_semana,
+        'topGastos': top_gastos,
+        'insights': insights,
+        'planilhaLink': f"https://docs.google.com/spreadsheets/d/{SHEET_ID}/edit",
+        'changeAtual': changes['atual'],
+        'changeRestante': changes['restante'],
+        'change7Dias': changes['dias7'],
+        'changeMaior': changes['maior']
+    }
+
+def _mes_anterior(hoje):
+    """Chave do mês anterior ao da data"""
+    data = hoje.replace(day=1) - timedelta(days=1)
+    return chave_mes(data.year, data.month)
 
-def gerar_insights(gastos, gastos_periodo, categorias):
+def calcular_gastos_por_dia_semana(analise):
+    """Calcula gastos por dia da semana (Dom=0, Seg=1, ..., Sáb=6)"""
+    return [total / 100 for total in analise.por_dia_semana]
+
+def gerar_insights(analise, categorias):
     """Gera insights inteligentes com dados reais"""
     
     # Dia mais caro (dados reais)
-    gastos_por_data = {}
-    for gasto in gastos_periodo:
-        data = gasto.get('Data', '')
-        if data:
-            valor = float(str(gasto.get('Valor', '0')).replace(',', '.'))
-            gastos_por_data[data] = gastos_por_data.get(data, 0) + valor
+    mais_caro = analise.dia_mais_caro()
     
-    if gastos_por_data:
-        dia_mais_caro = max(gastos_por_data.items(), key=lambda x: x[1])
-        try:
-            data_obj = datetime.strptime(dia_mais_caro[0], '%d/%m/%Y')
-            dia_semana = ['Segunda', 'Terça', 'Quarta', 'Quinta', 'Sexta', 'Sábado', 'Domingo'][data_obj.weekday()]
-            dia_caro = f"{dia_semana}, {dia_mais_caro[0]} - R$ {dia_mais_caro[1]:.2f}"
-        except:
-            dia_caro = f"{dia_mais_caro[0]} - R$ {dia_mais_caro[1]:.2f}"
+    if mais_caro:
+        dia_mais_caro, centavos = mais_caro
+        data_obj = date.fromordinal(dia_mais_caro)
+        dia_semana = ['Segunda', 'Terça', 'Quarta', 'Quinta', 'Sexta', 'Sábado', 'Domingo'][data_obj.weekday()]
+        dia_caro = f"{dia_semana}, {data_obj.strftime('%d/%m/%Y')} - R$ {centavos / 100:.2f}"
     else:
         dia_caro = "Nenhum gasto registrado ainda"
     
     # Categoria que mais cresceu (comparação com mês anterior)
-    hoje = datetime.now()
-    mes_anterior = (hoje.replace(day=1) - timedelta(days=1)).strftime("%m/%Y")
-    gastos_mes_anterior = [g for g in gastos if mes_anterior in str(g.get('Data', ''))]
-    
-    categorias_anterior = {}
-    for gasto in gastos_mes_anterior:
-        cat = gasto.get('Categoria', 'outros').title()
-        valor = float(str(gasto.get('Valor', '0')).replace(',', '.'))
-        categorias_anterior[cat] = categorias_anterior.get(cat, 0) + valor
+    categorias_anterior = {cat: total / 100 for cat, total in analise.categorias_anterior.items()}
     
     maior_crescimento = ""
     for cat, valor_atual in categorias.items():
@@ -826,7 +826,7 @@ def gerar_insights(gastos, gastos_periodo, categorias):
         dica_economia = "Registre mais gastos para receber dicas personalizadas"
     
     # Padrão de gastos (baseado nos dias da semana)
-    gastos_semana = calcular_gastos_por_dia_semana(gastos_periodo)
+    gastos_semana = calcular_gastos_por_dia_semana(analise)
     if sum(gastos_semana) > 0:
         dias = ['Domingo', 'Segunda', 'Terça', 'Quarta', 'Quinta', 'Sexta', 'Sábado']
         dia_maior_gasto = dias[gastos_semana.index(max(gastos_semana))]
@@ -841,90 +841,34 @@ def gerar_insights(gastos, gastos_periodo, categorias):
         'padraoGastos': padrao_gastos
     }
 
-def calcular_ultimos_7_dias(gastos):
+def calcular_ultimos_7_dias(colunas):
     """Calcula gastos dos últimos 7 dias"""
-    hoje = datetime.now()
-    total_7_dias = 0
-    
-    for i in range(7):
-        data = hoje - timedelta(days=i)
-        data_str = data.strftime('%d/%m/%Y')
-        gastos_dia = [g for g in gastos if data_str in str(g.get('Data', ''))]
-        total_7_dias += sum(float(str(g.get('Valor', '0')).replace(',', '.')) for g in gastos_dia)
-    
-    return total_7_dias
+    hoje = datetime.now().toordinal()
+    return int(colunas.somar_por_dia(hoje - 6, hoje).sum()) / 100
 
-def calcular_gastos_por_semana_mes(gastos_periodo):
+def calcular_gastos_por_semana_mes(analise):
     """Calcula gastos por semana do mês atual"""
-    hoje = datetime.now()
-    primeiro_dia = hoje.replace(day=1)
-    
     # Dividir o mês em 4 semanas
-    semanas = {
-        'Semana 1 (1-7)': 0,
-        'Semana 2 (8-14)': 0,
-        'Semana 3 (15-21)': 0,
-        'Semana 4 (22+)': 0
-    }
-    
-    for gasto in gastos_periodo:
-        try:
-            data_str = gasto.get('Data', '')
-            if '/' in data_str:
-                data = datetime.strptime(data_str, '%d/%m/%Y')
-                dia = data.day
-                valor = float(str(gasto.get('Valor', '0')).replace(',', '.'))
-                
-                if 1 <= dia <= 7:
-                    semanas['Semana 1 (1-7)'] += valor
-                elif 8 <= dia <= 14:
-                    semanas['Semana 2 (8-14)'] += valor
-                elif 15 <= dia <= 21:
-                    semanas['Semana 3 (15-21)'] += valor
-                else:
-                    semanas['Semana 4 (22+)'] += valor
-        except:
-            continue
+    labels = ['Semana 1 (1-7)', 'Semana 2 (8-14)', 'Semana 3 (15-21)', 'Semana 4 (22+)']
     
     return {
-        'labels': list(semanas.keys()),
-        'values': list(semanas.values())
+        'labels': labels,
+        'values': [total / 100 for total in analise.por_semana_mes]
     }
 
-def calcular_top_gastos(gastos_periodo, limite=5):
+def calcular_top_gastos(analise):
     """Calcula os maiores gastos individuais"""
-    gastos_ordenados = []
-    
-    for gasto in gastos_periodo:
-        try:
-            descricao = gasto.get('Descrição', 'N/A')[:20]
-            valor = float(str(gasto.get('Valor', '0')).replace(',', '.'))
-            data = gasto.get('Data', '')
-            
-            gastos_ordenados.append({
-                'descricao': f"{descricao} ({data})",
-                'valor': valor
-            })
-        except:
-            continue
-    
-    # Ordenar por valor e pegar os top N
-    gastos_ordenados.sort(key=lambda x: x['valor'], reverse=True)
-    top_gastos = gastos_ordenados[:limite]
+    top_gastos = analise.top()
     
     return {
-        'labels': [g['descricao'] for g in top_gastos],
-        'values': [g['valor'] for g in top_gastos]
+        'labels': [f"{g.descricao[:20]} ({g.data_str})" for g in top_gastos],
+        'values': [g.valor for g in top_gastos]
     }
 
-def calcular_mudancas_novas(gastos, gasto_atual, restante_meta, ultimos_7_dias, maior_gasto):
+def calcular_mudancas_novas(analise, gasto_atual, restante_meta, ultimos_7_dias, maior_gasto):
     """Calcula mudanças percentuais com as novas métricas"""
-    hoje = datetime.now()
-    mes_anterior = (hoje.replace(day=1) - timedelta(days=1)).strftime("%m/%Y")
-    
     # Gasto do mês anterior
-    gastos_mes_anterior = [g for g in gastos if mes_anterior in str(g.get('Data', ''))]
-    gasto_anterior = sum(float(str(g.get('Valor', '0')).replace(',', '.')) for g in gastos_mes_anterior)
+    gasto_anterior = analise.total_anterior / 100
     
     # Calcular mudanças
     change_atual = ((gasto_atual - gasto_anterior) / gasto_anterior * 100) if gasto_anterior > 0 else 0
@@ -937,7 +881,7 @@ def calcular_mudancas_novas(gastos, gasto_atual, restante_meta, ultimos_7_dias,
     change_7_dias = ((ultimos_7_dias - media_semanal_anterior) / media_semanal_anterior * 100) if media_semanal_anterior > 0 else 0
     
     # Para maior gasto (comparar com maior do mês anterior)
-    maior_anterior = max([float(str(g.get('Valor', '0')).replace(',', '.')) for g in gastos_mes_anterior], default=0)
+    maior_anterior = analise.maior_anterior / 100
     change_maior = ((maior_gasto - maior_anterior) / maior_anterior * 100) if maior_anterior > 0 else 0
     
     return {
@@ -954,6 +898,8 @@ def update_meta():
     config = load_config()
     config['meta_mensal'] = data['meta']
     save_config(config)
+    cache_respostas.invalidar()
+    diario.invalidar()
     return jsonify({'success': True})
 
 @app.route("/api/export-pdf")
@@ -966,11 +912,11 @@ def export_pdf():
         from reportlab.lib.pagesizes import letter
         
         # Obter dados
-        gastos = sheet.get_all_records() if sheet else []
+        gastos = obter_gastos()
         hoje = datetime.now()
-        mes_atual = hoje.strftime("%m/%Y")
-        gastos_mes = [g for g in gastos if mes_atual in str(g.get('Data', ''))]
-        total_mes = sum(float(str(g.get('Valor', '0')).replace(',', '.')) for g in gastos_mes)
+        mes_atual = chave_mes(hoje.year, hoje.month)
+        gastos_mes = [g for g in gastos if g.mes == mes_atual]
+        total_mes = sum(g.centavos for g in gastos_mes) / 100
         
         # Criar PDF
         buffer = io.BytesIO()
@@ -990,10 +936,8 @@ def export_pdf():
         p.drawString(50, 620, "Gastos do mês:")
         y = 600
         for gasto in gastos_mes[-20:]:  # Últimos 20 gastos
-            desc = gasto.get('Descrição', 'N/A')[:30]
-            valor = gasto.get('Valor', '0')
-            data = gasto.get('Data', 'N/A')
-            p.drawString(50, y, f"{data} - {desc} - R$ {valor}")
+            desc = gasto.descricao[:30]
+            p.drawString(50, y, f"{gasto.data_str} - {desc} - R$ {gasto.valor:.2f}")
             y -= 20
             if y < 100:
                 break
@@ -1021,8 +965,9 @@ def backup():
         import json
         import io
         
-        # Obter todos os dados
-        gastos = sheet.get_all_records() if sheet else []
+        # Obter todos os dados (registros originais da planilha)
+        obter_gastos()
+        gastos = sincronizador.registros() if sincronizador else []
         
         # Criar backup JSON
         backup_data = {
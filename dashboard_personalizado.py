@@ -5,10 +5,14 @@ Dashboard Personalizado por Usuário
 from flask import Flask, jsonify, request
 import json
 from datetime import datetime, timedelta
-from sheets_multiusuario import SheetsMultiUsuario
+from sheets_particionado import SheetsParticionado
+from config_telegram import TelegramConfig
+from src.dashboard_snapshots import MaterializadorPainel
+from src.event_bus import BarramentoEventos
 
 app = Flask(__name__)
-sheets_service = SheetsMultiUsuario()
+sheets_service = SheetsParticionado()
+barramento = BarramentoEventos()
 
 def carregar_usuarios():
     """Carrega dados dos usuários"""
@@ -18,19 +22,29 @@ def carregar_usuarios():
     except:
         return {"usuarios_autorizados": []}
 
+def buscar_usuario(chat_id):
+    """Usuário autorizado pelo chat_id (ou None)"""
+    usuarios_data = carregar_usuarios()
+    return next((u for u in usuarios_data["usuarios_autorizados"] if u["chat_id"] == chat_id), None)
+
 @app.route("/")
 def home():
     """Página inicial com lista de usuários"""
     usuarios_data = carregar_usuarios()
-    usuarios = usuarios_data.get("usuarios_autorizados", [])
+    usuarios = [u for u in usuarios_data.get("usuarios_autorizados", []) if u["ativo"]]
+    
+    # Dados de todos os usuários de uma vez
+    registros = sheets_service.obter_varios([u['chat_id'] for u in usuarios])
     
     usuarios_html = ""
     for user in usuarios:
-        if user["ativo"]:
-            usuarios_html += f"""
+        total_mes = sheets_service.calcular_saldo_mes(user['chat_id'], user['nome'],
+                                                      registros=registros.get(user['chat_id'], []))
+        usuarios_html += f"""
             <div style="background: white; padding: 20px; border-radius: 10px; margin: 10px 0; box-shadow: 0 2px 10px rgba(0,0,0,0.1);">
                 <h3>{user['nome']}</h3>
                 <p>ID: {user['chat_id']}</p>
+                <p>💸 Este mês: R$ {total_mes:.2f}</p>
                 <a href="/user/{user['chat_id']}" style="background: #3498db; color: white; padding: 10px 20px; text-decoration: none; border-radius: 5px;">Ver Dashboard</a>
             </div>
             """
@@ -60,8 +74,7 @@ def home():
 @app.route("/user/<int:chat_id>")
 def dashboard_usuario(chat_id):
     """Dashboard personalizado do usuário"""
-    usuarios_data = carregar_usuarios()
-    usuario = next((u for u in usuarios_data["usuarios_autorizados"] if u["chat_id"] == chat_id), None)
+    usuario = buscar_usuario(chat_id)
     
     if not usuario:
         return "❌ Usuário não encontrado", 404
@@ -163,69 +176,83 @@ def dashboard_usuario(chat_id):
                         return;
                     }}
                     
-                    // Atualizar cards
-                    document.getElementById('gastoMes').textContent = `R$ ${{data.gastoMes.toFixed(2)}}`;
-                    document.getElementById('totalGeral').textContent = `R$ ${{data.totalGeral.toFixed(2)}}`;
-                    document.getElementById('totalGastos').textContent = data.totalGastos;
-                    
-                    // Link da planilha
-                    if (data.sheetId) {{
-                        document.getElementById('planilhaLink').href = `https://docs.google.com/spreadsheets/d/${{data.sheetId}}/edit`;
-                    }}
-                    
-                    // Gráfico de categorias
-                    const ctx1 = document.getElementById('categoryChart').getContext('2d');
-                    new Chart(ctx1, {{
-                        type: 'doughnut',
-                        data: {{
-                            labels: Object.keys(data.categorias),
-                            datasets: [{{
-                                data: Object.values(data.categorias),
-                                backgroundColor: ['#e74c3c', '#3498db', '#2ecc71', '#f39c12', '#9b59b6', '#1abc9c', '#34495e']
-                            }}]
-                        }},
-                        options: {{ responsive: true, plugins: {{ legend: {{ position: 'bottom' }} }} }}
-                    }});
-                    
-                    // Gráfico semanal
-                    const ctx2 = document.getElementById('weekChart').getContext('2d');
-                    new Chart(ctx2, {{
-                        type: 'line',
-                        data: {{
-                            labels: data.ultimosDias.labels,
-                            datasets: [{{
-                                label: 'Seus Gastos',
-                                data: data.ultimosDias.values,
-                                borderColor: '#3498db',
-                                backgroundColor: 'rgba(52, 152, 219, 0.1)',
-                                tension: 0.4
-                            }}]
-                        }},
-                        options: {{ responsive: true, scales: {{ y: {{ beginAtZero: true }} }} }}
-                    }});
-                    
-                    // Últimos gastos
-                    const recentDiv = document.getElementById('recentExpenses');
-                    recentDiv.innerHTML = data.ultimosGastos.map(gasto => `
-                        <div class="expense-item">
-                            <div>
-                                <div class="expense-desc">${{gasto.descricao}}</div>
-                                <div class="expense-date">${{gasto.data}} • ${{gasto.categoria}}</div>
-                            </div>
-                            <div class="expense-value">R$ ${{gasto.valor}}</div>
-                        </div>
-                    `).join('');
-                    
-                    document.getElementById('loading').style.display = 'none';
-                    document.getElementById('dashboard').style.display = 'block';
+                    renderUserData(data);
                     
                 }} catch (error) {{
                     document.getElementById('loading').textContent = '❌ Erro ao carregar dados';
                 }}
             }}
             
+            function renderUserData(data) {{
+                // Atualizar cards
+                document.getElementById('gastoMes').textContent = `R$ ${{data.gastoMes.toFixed(2)}}`;
+                document.getElementById('totalGeral').textContent = `R$ ${{data.totalGeral.toFixed(2)}}`;
+                document.getElementById('totalGastos').textContent = data.totalGastos;
+                
+                // Link da planilha
+                if (data.sheetId) {{
+                    document.getElementById('planilhaLink').href = `https://docs.google.com/spreadsheets/d/${{data.sheetId}}/edit`;
+                }}
+                
+                // Gráfico de categorias
+                const ctx1 = document.getElementById('categoryChart').getContext('2d');
+                Chart.getChart(ctx1)?.destroy();  // recria o gráfico a cada atualização ao vivo
+                new Chart(ctx1, {{
+                    type: 'doughnut',
+                    data: {{
+                        labels: Object.keys(data.categorias),
+                        datasets: [{{
+                            data: Object.values(data.categorias),
+                            backgroundColor: ['#e74c3c', '#3498db', '#2ecc71', '#f39c12', '#9b59b6', '#1abc9c', '#34495e']
+                        }}]
+                    }},
+                    options: {{ responsive: true, plugins: {{ legend: {{ position: 'bottom' }} }} }}
+                }});
+                
+                // Gráfico semanal
+                const ctx2 = document.getElementById('weekChart').getContext('2d');
+                Chart.getChart(ctx2)?.destroy();
+                new Chart(ctx2, {{
+                    type: 'line',
+                    data: {{
+                        labels: data.ultimosDias.labels,
+                        datasets: [{{
+                            label: 'Seus Gastos',
+                            data: data.ultimosDias.values,
+                            borderColor: '#3498db',
+                            backgroundColor: 'rgba(52, 152, 219, 0.1)',
+                            tension: 0.4
+                        }}]
+                    }},
+                    options: {{ responsive: true, scales: {{ y: {{ beginAtZero: true }} }} }}
+                }});
+                
+                // Últimos gastos
+                const recentDiv = document.getElementById('recentExpenses');
+                recentDiv.innerHTML = data.ultimosGastos.map(gasto => `
+                    <div class="expense-item">
+                        <div>
+                            <div class="expense-desc">${{gasto.descricao}}</div>
+                            <div class="expense-date">${{gasto.data}} • ${{gasto.categoria}}</div>
+                        </div>
+                        <div class="expense-value">R$ ${{gasto.valor}}</div>
+                    </div>
+                `).join('');
+                
+                document.getElementById('loading').style.display = 'none';
+                document.getElementById('dashboard').style.display = 'block';
+            }}
+            
             loadUserData();
-            setInterval(loadUserData, 30000); // Atualiza a cada 30 segundos
+            
+            // Atualização ao vivo: o servidor envia o dashboard recalculado quando há mudanças
+            if (window.EventSource) {{
+                const eventos = new EventSource('/api/user/{chat_id}/eventos');
+                eventos.addEventListener('painel', e => renderUserData(JSON.parse(e.data)));
+                eventos.addEventListener('recarregar', loadUserData);
+            }} else {{
+                setInterval(loadUserData, 30000); // Atualiza a cada 30 segundos
+            }}
         </script>
     </body>
     </html>
@@ -235,73 +262,99 @@ def dashboard_usuario(chat_id):
 def api_user_data(chat_id):
     """API de dados do usuário específico"""
     try:
-        usuarios_data = carregar_usuarios()
-        usuario = next((u for u in usuarios_data["usuarios_autorizados"] if u["chat_id"] == chat_id), None)
-        
-        if not usuario:
+        if not buscar_usuario(chat_id):
             return jsonify({"error": "Usuário não encontrado"}), 404
         
-        # Obter dados da planilha do usuário
-        gastos = sheets_service.get_user_data(chat_id, usuario["nome"])
-        sheet_id = sheets_service.get_user_sheet_id(chat_id, usuario["nome"])
+        # Snapshot pronto em memória, recalculado em background quando a planilha muda
+        return materializador.responder(chat_id)
         
-        # Calcular estatísticas
-        total_geral = sum(float(str(g.get('Valor', '0')).replace(',', '.')) for g in gastos if g.get('Valor'))
-        total_mes = sheets_service.calcular_saldo_mes(chat_id, usuario["nome"])
-        
-        # Gastos por categoria
-        categorias = {}
-        for gasto in gastos:
-            cat = gasto.get('Categoria', 'outros').title()
-            valor_str = str(gasto.get('Valor', '0')).replace(',', '.')
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route("/api/user/<int:chat_id>/eventos")
+def eventos_usuario(chat_id):
+    """Stream SSE com o dashboard do usuário sempre que ele muda"""
+    if not buscar_usuario(chat_id):
+        return jsonify({"error": "Usuário não encontrado"}), 404
+    
+    # Garante o usuário entre os ativos do materializador
+    materializador.obter(chat_id)
+    return barramento.responder(chat_id)
+
+def calcular_dados_usuario(chat_id, usuario, gastos):
+    """Calcula as estatísticas do dashboard do usuário a partir dos gastos já baixados"""
+    sheet_id = sheets_service.get_user_sheet_id(chat_id, usuario["nome"])
+    
+    # Calcular estatísticas
+    total_geral = sum(float(str(g.get('Valor', '0')).replace(',', '.')) for g in gastos if g.get('Valor'))
+    total_mes = sheets_service.calcular_saldo_mes(chat_id, usuario["nome"], registros=gastos)
+    
+    # Gastos por categoria
+    categorias = {}
+    for gasto in gastos:
+        cat = gasto.get('Categoria', 'outros').title()
+        valor_str = str(gasto.get('Valor', '0')).replace(',', '.')
+        try:
+            valor = float(valor_str)
+            categorias[cat] = categorias.get(cat, 0) + valor
+        except ValueError:
+            continue
+    
+    # Últimos 7 dias
+    hoje = datetime.now()
+    ultimos_dias = {(hoje - timedelta(days=i)).strftime('%d/%m'): 0 for i in range(6, -1, -1)}
+    
+    for gasto in gastos:
+        data_str = gasto.get('Data', '')
+        if '/' in data_str:
             try:
-                valor = float(valor_str)
-                categorias[cat] = categorias.get(cat, 0) + valor
+                data_gasto = datetime.strptime(data_str, '%d/%m/%Y')
+                if (hoje - data_gasto).days <= 7:
+                    dia_key = data_gasto.strftime('%d/%m')
+                    if dia_key in ultimos_dias:
+                        valor = float(str(gasto.get('Valor', '0')).replace(',', '.'))
+                        ultimos_dias[dia_key] += valor
             except ValueError:
                 continue
-        
-        # Últimos 7 dias
-        hoje = datetime.now()
-        ultimos_dias = {{(hoje - timedelta(days=i)).strftime('%d/%m'): 0 for i in range(6, -1, -1)}}
-        
-        for gasto in gastos:
-            data_str = gasto.get('Data', '')
-            if '/' in data_str:
-                try:
-                    data_gasto = datetime.strptime(data_str, '%d/%m/%Y')
-                    if (hoje - data_gasto).days <= 7:
-                        dia_key = data_gasto.strftime('%d/%m')
-                        if dia_key in ultimos_dias:
-                            valor = float(str(gasto.get('Valor', '0')).replace(',', '.'))
-                            ultimos_dias[dia_key] += valor
-                except ValueError:
-                    continue
-        
-        # Últimos gastos
-        ultimos_gastos = []
-        for gasto in gastos[-10:]:
-            ultimos_gastos.append({{
-                'descricao': gasto.get('Descrição', 'N/A'),
-                'valor': gasto.get('Valor', '0'),
-                'data': gasto.get('Data', 'N/A'),
-                'categoria': gasto.get('Categoria', 'outros').title()
-            }})
-        
-        return jsonify({{
-            'gastoMes': total_mes,
-            'totalGeral': total_geral,
-            'totalGastos': len(gastos),
-            'categorias': categorias,
-            'sheetId': sheet_id,
-            'ultimosDias': {{
-                'labels': list(ultimos_dias.keys()),
-                'values': list(ultimos_dias.values())
-            }},
-            'ultimosGastos': list(reversed(ultimos_gastos))
-        }})
-        
-    except Exception as e:
-        return jsonify({{'error': str(e)}}), 500
+    
+    # Últimos gastos
+    ultimos_gastos = []
+    for gasto in gastos[-10:]:
+        ultimos_gastos.append({
+            'descricao': gasto.get('Descrição', 'N/A'),
+            'valor': gasto.get('Valor', '0'),
+            'data': gasto.get('Data', 'N/A'),
+            'categoria': gasto.get('Categoria', 'outros').title()
+        })
+    
+    return {
+        'gastoMes': total_mes,
+        'totalGeral': total_geral,
+        'totalGastos': len(gastos),
+        'categorias': categorias,
+        'sheetId': sheet_id,
+        'ultimosDias': {
+            'labels': list(ultimos_dias.keys()),
+            'values': list(ultimos_dias.values())
+        },
+        'ultimosGastos': list(reversed(ultimos_gastos))
+    }
+
+materializador = MaterializadorPainel(
+    lambda chat_id, gastos: calcular_dados_usuario(chat_id, buscar_usuario(chat_id), gastos),
+    # Cada rodada lê os gastos dos usuários pendentes em um único values_batch_get
+    carregar=lambda chat_ids: sheets_service.obter_varios(chat_ids, propagar_erros=True),
+    # A cada intervalo, só o fim das abas é lido; quem tem gastos novos é marcado pelo ouvinte
+    verificar=sheets_service.sincronizar,
+    intervalo=TelegramConfig.PAINEL_INTERVALO_ATUALIZACAO,
+    comprimir=TelegramConfig.PAINEL_GZIP,
+    # Conexões SSE abertas mantêm o usuário ativo e recebem cada novo snapshot
+    em_uso=lambda chat_id: barramento.assinantes(chat_id) > 0,
+    ao_atualizar=lambda chat_id, snapshot: barramento.publicar('painel', snapshot.corpo, canal=chat_id)
+)
+# Gravações e leituras que encontram gastos novos ou movidos marcam o usuário na hora
+sheets_service.adicionar_ouvinte(lambda chat_id: materializador.marcar(int(chat_id)))
+materializador.iniciar()
 
 if __name__ == "__main__":
     app.run(host='0.0.0.0', port=8002, debug=True)
\ No newline at end of file
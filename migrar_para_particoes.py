@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Migra os gastos dos bots multiusuário para a planilha particionada
+
+Uso: python migrar_para_particoes.py
+
+Para cada usuário de usuarios.json, junta:
+- a planilha pessoal "Gastos_<nome>_<chat_id>" (bot_planilhas_separadas)
+- as linhas da aba principal cuja descrição termina com " (<nome>)"
+  (bot_multiusuario)
+
+Usuários que já têm gastos na partição são pulados, então o script pode
+ser executado de novo sem duplicar linhas.
+"""
+import json
+import gspread
+from datetime import datetime
+from sheets_particionado import SheetsParticionado
+
+def carregar_usuarios():
+    """Usuários autorizados de usuarios.json"""
+    try:
+        with open('usuarios.json', 'r') as f:
+            return json.load(f).get("usuarios_autorizados", [])
+    except FileNotFoundError:
+        return []
+
+def linhas_planilha_pessoal(client, usuario):
+    """Gastos da planilha própria do usuário (vazio se ela não existir)"""
+    try:
+        planilha = client.open(f"Gastos_{usuario['nome']}_{usuario['chat_id']}")
+    except gspread.SpreadsheetNotFound:
+        return []
+    return [linha for linha in planilha.sheet1.get_all_values()[1:] if any(linha)]
+
+def linhas_aba_compartilhada(valores, usuario):
+    """Gastos do usuário na aba principal, sem o sufixo " (<nome>)" na descrição"""
+    sufixos = (f" ({usuario['nome']})", f" (ID:{usuario['chat_id']})")
+    linhas = []
+    for linha in valores[1:]:
+        linha = list(linha) + [''] * (4 - len(linha))
+        for sufixo in sufixos:
+            if linha[1].endswith(sufixo):
+                linhas.append([linha[0], linha[1][:-len(sufixo)], linha[2], linha[3]])
+                break
+    return linhas
+
+def _data(linha):
+    try:
+        return datetime.strptime(linha[0], '%d/%m/%Y')
+    except ValueError:
+        return datetime.min
+
+def main():
+    sheets = SheetsParticionado()
+    if not sheets.particoes:
+        print("❌ Google Sheets não conectado")
+        return
+
+    aba_principal = sheets.spreadsheet.sheet1.get_all_values()
+
+    for usuario in carregar_usuarios():
+        linhas = (linhas_planilha_pessoal(sheets.client, usuario) +
+                  linhas_aba_compartilhada(aba_principal, usuario))
+        # Ordem cronológica (sort estável mantém a ordem dentro do mesmo dia)
+        linhas.sort(key=_data)
+        importadas = sheets.importar_usuario(usuario['chat_id'], linhas)
+        print(f"👤 {usuario['nome']} ({usuario['chat_id']}): {importadas} de {len(linhas)} gastos importados")
+
+if __name__ == "__main__":
+    main()
@@ -6,6 +6,8 @@ from google.oauth2.service_account import Credentials
 from datetime import datetime
 import logging
 from config_telegram import TelegramConfig
+from src.handle_pool import PoolPlanilhas
+from src.batch_fetch import ler_intervalos
 
 logger = logging.getLogger(__name__)
 
@@ -15,7 +17,10 @@ class SheetsAbasSeparadas:
     def __init__(self):
         self.client = None
         self.spreadsheet = None
-        self.user_sheets = {}
+        # Abas por usuário: LRU limitado, renovado após o TTL e com carga única
+        self.user_sheets = PoolPlanilhas(self._carregar_aba,
+                                         capacidade=TelegramConfig.POOL_PLANILHAS_TAMANHO,
+                                         ttl=TelegramConfig.POOL_PLANILHAS_TTL)
         self._connect()
     
     def _connect(self):
@@ -33,9 +38,10 @@ class SheetsAbasSeparadas:
     
     def get_user_sheet(self, chat_id, nome_usuario):
         """Obtém aba específica do usuário"""
-        if chat_id in self.user_sheets:
-            return self.user_sheets[chat_id]
-        
+        return self.user_sheets.obter(chat_id, nome_usuario)
+    
+    def _carregar_aba(self, chat_id, anterior, nome_usuario):
+        """Abre (ou cria) a aba do usuário; chamado pelo pool uma vez por carga"""
         try:
             sheet_name = f"{nome_usuario}_{chat_id}"
             
@@ -48,9 +54,6 @@ class SheetsAbasSeparadas:
                 # Configurar cabeçalho
                 sheet.append_row(["Data", "Descrição", "Valor", "Categoria"])
             
-            # Cache da aba
-            self.user_sheets[chat_id] = sheet
-            
             logger.info(f"✅ Aba do usuário {nome_usuario} configurada")
             return sheet
             
@@ -73,14 +76,10 @@ class SheetsAbasSeparadas:
             logger.error(f"❌ Erro ao adicionar gasto: {e}")
             return False
     
-    def calcular_saldo_mes(self, chat_id, nome_usuario):
-        """Calcula total do mês do usuário"""
-        sheet = self.get_user_sheet(chat_id, nome_usuario)
-        if not sheet:
-            return 0
-        
+    def calcular_saldo_mes(self, chat_id, nome_usuario, registros=None):
+        """Calcula total do mês do usuário (registros já baixados evitam nova leitura)"""
         try:
-            records = sheet.get_all_records()
+            records = registros if registros is not None else self.get_user_data(chat_id, nome_usuario)
             mes_atual = datetime.now().strftime("%m/%Y")
             total = 0
             
@@ -100,12 +99,35 @@ class SheetsAbasSeparadas:
     
     def get_user_data(self, chat_id, nome_usuario):
         """Retorna todos os dados do usuário"""
-        sheet = self.get_user_sheet(chat_id, nome_usuario)
-        if not sheet:
-            return []
+        return self.obter_varios([(chat_id, nome_usuario)]).get(chat_id, [])
+    
+    def obter_varios(self, usuarios):
+        """
+        Dados de vários usuários com um único values_batch_get (todas as abas
+        estão na mesma planilha)
         
+        Args:
+            usuarios (list): Pares (chat_id, nome_usuario)
+            
+        Returns:
+            dict: {chat_id: lista de registros no formato de get_all_records}
+        """
+        abas = []
+        for chat_id, nome_usuario in usuarios:
+            sheet = self.get_user_sheet(chat_id, nome_usuario)
+            if sheet:
+                abas.append((chat_id, sheet.title))
+        
+        resultado = {chat_id: [] for chat_id, _ in usuarios}
         try:
-            return sheet.get_all_records()
+            valores = ler_intervalos(self.spreadsheet, [f"'{titulo}'!A:D" for _, titulo in abas])
         except Exception as e:
             logger.error(f"❌ Erro ao obter dados: {e}")
-            return []
\ No newline at end of file
+            return resultado
+        
+        for (chat_id, _), linhas in zip(abas, valores):
+            if linhas:
+                cabecalho = linhas[0]
+                resultado[chat_id] = [dict(zip(cabecalho, linha + [''] * (len(cabecalho) - len(linha))))
+                                      for linha in linhas[1:]]
+        return resultado
\ No newline at end of file
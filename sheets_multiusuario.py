@@ -6,6 +6,8 @@ from google.oauth2.service_account import Credentials
 from datetime import datetime
 import logging
 from config_telegram import TelegramConfig
+from src.sheet_sync import SincronizadorIncremental
+from src.handle_pool import PoolPlanilhas
 
 logger = logging.getLogger(__name__)
 
@@ -14,7 +16,10 @@ class SheetsMultiUsuario:
     
     def __init__(self):
         self.client = None
-        self.user_sheets = {}  # Cache de planilhas por usuário
+        # Planilhas por usuário: LRU limitado, renovado após o TTL e com carga única
+        self.user_sheets = PoolPlanilhas(self._carregar_planilha,
+                                         capacidade=TelegramConfig.POOL_PLANILHAS_TAMANHO,
+                                         ttl=TelegramConfig.POOL_PLANILHAS_TTL)
         self._connect()
     
     def _connect(self):
@@ -31,8 +36,17 @@ class SheetsMultiUsuario:
     
     def get_user_sheet(self, chat_id, nome_usuario):
         """Obtém planilha específica do usuário"""
-        if chat_id in self.user_sheets:
-            return self.user_sheets[chat_id]
+        return self.user_sheets.obter(chat_id, nome_usuario)
+    
+    def _carregar_planilha(self, chat_id, anterior, nome_usuario):
+        """Abre (ou cria) a planilha do usuário; chamado pelo pool uma vez por carga"""
+        if anterior:
+            # Renovação: confere se a planilha ainda existe, sem nova busca no Drive
+            try:
+                self.client.open_by_key(anterior['sheet_id'])
+                return anterior
+            except gspread.SpreadsheetNotFound:
+                logger.warning(f"⚠️ Planilha do usuário {nome_usuario} não existe mais")
         
         try:
             # Nome da planilha: "Gastos_NomeUsuario_ID"
@@ -55,16 +69,14 @@ class SheetsMultiUsuario:
                 sheet.clear()
                 sheet.append_row(["Data", "Descrição", "Valor", "Categoria"])
             
-            # Cache da planilha
-            self.user_sheets[chat_id] = {
+            logger.info(f"✅ Planilha do usuário {nome_usuario} configurada")
+            return {
                 'sheet': sheet,
                 'spreadsheet': spreadsheet,
-                'sheet_id': spreadsheet.id
+                'sheet_id': spreadsheet.id,
+                'sincronizador': SincronizadorIncremental(sheet)
             }
             
-            logger.info(f"✅ Planilha do usuário {nome_usuario} configurada")
-            return self.user_sheets[chat_id]
-            
         except Exception as e:
             logger.error(f"❌ Erro ao configurar planilha do usuário: {e}")
             return None
@@ -77,21 +89,22 @@ class SheetsMultiUsuario:
         
         try:
             hoje = datetime.now().strftime("%d/%m/%Y")
-            user_sheet_data['sheet'].append_row([hoje, descricao, f"{valor:.2f}", categoria])
+            linha = [hoje, descricao, f"{valor:.2f}", categoria]
+            sincronizador = user_sheet_data['sincronizador']
+            with sincronizador.escrita():
+                user_sheet_data['sheet'].append_row(linha)
+                if sincronizador.cabecalho is not None:
+                    sincronizador.registrar_append(linha)
             logger.info(f"💰 Gasto de {nome_usuario}: {descricao} - R$ {valor:.2f}")
             return True
         except Exception as e:
             logger.error(f"❌ Erro ao adicionar gasto: {e}")
             return False
     
-    def calcular_saldo_mes(self, chat_id, nome_usuario):
-        """Calcula total do mês do usuário"""
-        user_sheet_data = self.get_user_sheet(chat_id, nome_usuario)
-        if not user_sheet_data:
-            return 0
-        
+    def calcular_saldo_mes(self, chat_id, nome_usuario, registros=None):
+        """Calcula total do mês do usuário (registros já baixados evitam nova leitura)"""
         try:
-            records = user_sheet_data['sheet'].get_all_records()
+            records = registros if registros is not None else self.get_user_data(chat_id, nome_usuario)
             mes_atual = datetime.now().strftime("%m/%Y")
             total = 0
             
@@ -121,7 +134,30 @@ class SheetsMultiUsuario:
             return []
         
         try:
-            return user_sheet_data['sheet'].get_all_records()
+            return self._registros(user_sheet_data)
         except Exception as e:
             logger.error(f"❌ Erro ao obter dados: {e}")
-            return []
\ No newline at end of file
+            return []
+    
+    def sincronizar_usuario(self, chat_id, nome_usuario):
+        """
+        Sincroniza a cópia local da planilha do usuário
+        
+        Returns:
+            bool: True se a planilha mudou desde a última sincronização
+        """
+        user_sheet_data = self.get_user_sheet(chat_id, nome_usuario)
+        if not user_sheet_data:
+            return False
+        
+        try:
+            return user_sheet_data['sincronizador'].sincronizar()
+        except Exception as e:
+            logger.error(f"❌ Erro ao sincronizar planilha do usuário: {e}")
+            return False
+    
+    def _registros(self, user_sheet_data):
+        """Registros da planilha baixando só as linhas novas ou alteradas"""
+        sincronizador = user_sheet_data['sincronizador']
+        sincronizador.sincronizar()
+        return sincronizador.registros()
\ No newline at end of file
@@ -0,0 +1,372 @@
+"""
+Google Sheets multiusuário em uma única planilha, particionada em abas
+"""
+import bisect
+import re
+import threading
+import time
+import zlib
+import gspread
+from google.oauth2.service_account import Credentials
+from datetime import datetime
+import logging
+from config_telegram import TelegramConfig
+from src.batch_fetch import ler_intervalos
+
+logger = logging.getLogger(__name__)
+
+CABECALHO_PARTICAO = ["ChatID", "Data", "Descrição", "Valor", "Categoria"]
+
+_LINHA_ATUALIZADA = re.compile(r'![A-Z]+(\d+)')
+
+class _Particao:
+    """Uma aba de partição e o índice local chat_id -> intervalos de linhas"""
+
+    def __init__(self, sheet):
+        self.sheet = sheet
+        self.intervalos = {}     # chat_id (str) -> [[linha_inicio, linha_fim], ...] em ordem
+        self.linhas = 1          # última linha já lida (as seguintes podem ser de outros processos)
+        self.indexada_em = None  # time.monotonic() da última leitura da coluna ChatID
+        self.lock = threading.Lock()
+
+    def indexar(self):
+        """
+        Reconstrói o índice lendo só a coluna ChatID (chamado com a trava)
+
+        Returns:
+            set: chat_ids cujos intervalos mudaram (vazio na primeira leitura)
+        """
+        valores = self.sheet.col_values(1)
+        intervalos = {}
+        for linha, chat_id in enumerate(valores[1:], start=2):
+            if chat_id:
+                self.registrar(chat_id, linha, intervalos)
+
+        mudaram = set()
+        if self.indexada_em is not None or self.intervalos:
+            mudaram = {chat_id for chat_id in self.intervalos.keys() | intervalos.keys()
+                       if self.intervalos.get(chat_id) != intervalos.get(chat_id)}
+        self.intervalos = intervalos
+        self.linhas = max(len(valores), 1)
+        self.indexada_em = time.monotonic()
+        return mudaram
+
+    def incorporar(self, inicio, valores):
+        """
+        Inclui no índice as linhas lidas a partir de inicio (chamado com a trava)
+
+        Returns:
+            set: chat_ids das linhas que ainda não estavam no índice
+        """
+        novos = set()
+        for linha, valores_linha in enumerate(valores, start=inicio):
+            if valores_linha and valores_linha[0] and self.registrar(valores_linha[0], linha):
+                novos.add(valores_linha[0])
+        self.linhas = max(self.linhas, inicio + len(valores) - 1)
+        return novos
+
+    def registrar(self, chat_id, linha, intervalos=None):
+        """Inclui uma linha no índice, emendando intervalos contíguos; False se já estava"""
+        intervalos = self.intervalos if intervalos is None else intervalos
+        lista = intervalos.setdefault(str(chat_id), [])
+        posicao = bisect.bisect_right(lista, [linha, float('inf')])
+        anterior = lista[posicao - 1] if posicao else None
+        seguinte = lista[posicao] if posicao < len(lista) else None
+
+        if anterior and anterior[1] >= linha:
+            return False
+        if anterior and anterior[1] == linha - 1:
+            anterior[1] = linha
+            if seguinte and seguinte[0] == linha + 1:
+                anterior[1] = seguinte[1]
+                del lista[posicao]
+        elif seguinte and seguinte[0] == linha + 1:
+            seguinte[0] = linha
+        else:
+            lista.insert(posicao, [linha, linha])
+        return True
+
+class SheetsParticionado:
+    """
+    Todos os usuários em uma só planilha (TelegramConfig.SHEET_ID), com os
+    gastos distribuídos em PARTICOES_PLANILHA abas fixas ("Gastos_00", ...)
+    pelo chat_id. Cada linha guarda o ChatID na primeira coluna.
+
+    Não cria uma planilha por usuário (sem busca no Drive nem limite de
+    planilhas) nem uma aba por usuário (sem limite de abas). Um índice local
+    guarda os intervalos de linhas de cada usuário, então a leitura de um ou
+    de vários usuários baixa só as linhas deles, em uma única chamada.
+
+    A mesma chamada lê também o fim de cada aba envolvida (linhas depois da
+    última já indexada), então gastos gravados por outros processos aparecem
+    na leitura seguinte. Linhas removidas ou editadas direto na planilha só
+    entram no índice quando a leitura encontra uma linha fora do lugar ou
+    depois de intervalo_indice.
+
+    Funções registradas com adicionar_ouvinte recebem o chat_id (str) de
+    cada usuário com gastos novos ou movidos, seja por uma gravação deste
+    processo ou por uma leitura que os encontrou (ver sincronizar).
+
+    Para trazer os gastos de bot_planilhas_separadas e bot_multiusuario,
+    ver importar_usuario e migrar_para_particoes.py.
+    """
+
+    def __init__(self, particoes=None, intervalo_indice=300):
+        """
+        Args:
+            particoes (int): Quantidade de abas (padrão: TelegramConfig.PARTICOES_PLANILHA)
+            intervalo_indice (int): Segundos até reler a coluna ChatID de uma aba
+                (captura remoções e edições feitas direto na planilha)
+        """
+        self.client = None
+        self.spreadsheet = None
+        self.quantidade = particoes or TelegramConfig.PARTICOES_PLANILHA
+        self.intervalo_indice = intervalo_indice
+        self.particoes = []
+        self._ouvintes = []
+        self._connect()
+
+    def _connect(self):
+        """Conecta com Google Sheets e prepara as abas de partição"""
+        try:
+            creds = Credentials.from_service_account_file(
+                TelegramConfig.CREDENTIALS_FILE,
+                scopes=TelegramConfig.SCOPES
+            )
+            self.client = gspread.authorize(creds)
+            self.spreadsheet = self.client.open_by_key(TelegramConfig.SHEET_ID)
+
+            existentes = {sheet.title: sheet for sheet in self.spreadsheet.worksheets()}
+            for numero in range(self.quantidade):
+                titulo = f"Gastos_{numero:02d}"
+                sheet = existentes.get(titulo)
+                if sheet is None:
+                    sheet = self.spreadsheet.add_worksheet(title=titulo, rows=1000,
+                                                           cols=len(CABECALHO_PARTICAO))
+                    sheet.append_row(CABECALHO_PARTICAO)
+                self.particoes.append(_Particao(sheet))
+
+            logger.info(f"✅ Google Sheets conectado ({self.quantidade} partições)")
+        except Exception as e:
+            logger.error(f"❌ Erro Google Sheets: {e}")
+
+    def _numero_particao(self, chat_id):
+        """Número da partição de um usuário (estável entre reinícios)"""
+        return zlib.crc32(str(chat_id).encode()) % len(self.particoes)
+
+    def _particao(self, chat_id):
+        """Partição de um usuário"""
+        return self.particoes[self._numero_particao(chat_id)]
+
+    def _indexar_se_necessario(self, particao):
+        """Relê a coluna ChatID se o índice nunca foi lido ou expirou (chamado com a trava)"""
+        if (particao.indexada_em is None or
+                time.monotonic() - particao.indexada_em > self.intervalo_indice):
+            return particao.indexar()
+        return set()
+
+    def adicionar_ouvinte(self, ouvinte):
+        """
+        Registra uma função chamada quando os gastos de um usuário mudam
+
+        Args:
+            ouvinte (callable): Função (chat_id)
+        """
+        self._ouvintes.append(ouvinte)
+
+    def _avisar(self, chat_ids):
+        """Repassa aos ouvintes os usuários que mudaram (chamado sem travas)"""
+        for chat_id in chat_ids:
+            for ouvinte in self._ouvintes:
+                try:
+                    ouvinte(str(chat_id))
+                except Exception as e:
+                    logger.error(f"Erro em ouvinte das partições: {e}")
+
+    def adicionar_gasto(self, chat_id, nome_usuario, descricao, valor, categoria):
+        """Adiciona gasto na partição do usuário"""
+        if not self.particoes:
+            return False
+
+        particao = self._particao(chat_id)
+        try:
+            hoje = datetime.now().strftime("%d/%m/%Y")
+            linha = [str(chat_id), hoje, descricao, f"{valor:.2f}", categoria]
+            with particao.lock:
+                resposta = particao.sheet.append_row(linha, table_range="A1")
+                intervalo = resposta.get('updates', {}).get('updatedRange', '')
+                numero = _LINHA_ATUALIZADA.search(intervalo)
+                if numero and particao.indexada_em is not None:
+                    particao.registrar(chat_id, int(numero.group(1)))
+                else:
+                    # Linha gravada desconhecida: relê o índice na próxima leitura
+                    particao.indexada_em = None
+            logger.info(f"💰 Gasto de {nome_usuario}: {descricao} - R$ {valor:.2f}")
+            self._avisar([chat_id])
+            return True
+        except Exception as e:
+            logger.error(f"❌ Erro ao adicionar gasto: {e}")
+            return False
+
+    def get_user_data(self, chat_id, nome_usuario=None):
+        """Retorna todos os gastos do usuário, no formato de get_all_records"""
+        return self.obter_varios([chat_id]).get(chat_id, [])
+
+    def obter_varios(self, chat_ids, propagar_erros=False):
+        """
+        Gastos de vários usuários, baixando só as linhas deles (e o fim de cada
+        aba envolvida) em um único values_batch_get
+
+        Args:
+            chat_ids (list): IDs dos usuários
+            propagar_erros (bool): Repassa a falha de leitura em vez de devolver
+                listas vazias (ex: para não publicar um dashboard zerado)
+
+        Returns:
+            dict: {chat_id: lista de registros}
+        """
+        resultado = {chat_id: [] for chat_id in chat_ids}
+        if not self.particoes:
+            return resultado
+
+        por_particao = {}
+        for chat_id in chat_ids:
+            por_particao.setdefault(self._numero_particao(chat_id), []).append(chat_id)
+
+        pedidos = []  # (chat_id, particao, inicio, fim)
+        caudas = []   # (particao, primeira linha ainda não lida)
+        mudaram = set()
+        for numero, usuarios in por_particao.items():
+            particao = self.particoes[numero]
+            with particao.lock:
+                mudaram |= self._indexar_se_necessario(particao)
+                limite = particao.linhas
+                for chat_id in usuarios:
+                    # Linhas depois do limite vêm da leitura do fim da aba
+                    pedidos.extend((chat_id, particao, inicio, min(fim, limite))
+                                   for inicio, fim in particao.intervalos.get(str(chat_id), [])
+                                   if inicio <= limite)
+            caudas.append((particao, limite + 1))
+
+        intervalos = ([f"'{particao.sheet.title}'!A{inicio}:E" for particao, inicio in caudas] +
+                      [f"'{particao.sheet.title}'!A{inicio}:E{fim}" for _, particao, inicio, fim in pedidos])
+        try:
+            valores = ler_intervalos(self.spreadsheet, intervalos)
+        except Exception as e:
+            if propagar_erros:
+                raise
+            logger.error(f"❌ Erro ao obter dados: {e}")
+            return resultado
+
+        desatualizadas = set()
+        for (chat_id, particao, _, _), linhas in zip(pedidos, valores[len(caudas):]):
+            for linha in linhas:
+                if linha and linha[0] == str(chat_id):
+                    resultado[chat_id].append(_como_registro(linha))
+                else:
+                    # Linhas mudaram de lugar (ex: remoção manual): relê o índice
+                    desatualizadas.add(particao)
+
+        solicitados = {str(chat_id): chat_id for chat_id in chat_ids}
+        for (particao, inicio), linhas in zip(caudas, valores):
+            for linha in linhas:
+                chat_id = solicitados.get(linha[0]) if linha else None
+                if chat_id is not None:
+                    resultado[chat_id].append(_como_registro(linha))
+            with particao.lock:
+                mudaram |= particao.incorporar(inicio, linhas)
+
+        for particao in desatualizadas:
+            with particao.lock:
+                particao.indexada_em = None
+        self._avisar(mudaram)
+        return resultado
+
+    def sincronizar(self, chat_ids):
+        """
+        Procura gastos novos nas abas dos usuários sem baixar os gastos deles
+
+        Lê só o fim de cada aba envolvida (linhas gravadas por outros
+        processos) em um único values_batch_get, relendo antes a coluna
+        ChatID das abas com índice expirado. Os ouvintes são avisados dos
+        usuários com linhas novas ou movidas.
+
+        Args:
+            chat_ids (list): IDs dos usuários
+
+        Returns:
+            set: chat_ids (str) dos usuários que mudaram
+        """
+        if not self.particoes:
+            return set()
+
+        caudas = []
+        mudaram = set()
+        for numero in {self._numero_particao(chat_id) for chat_id in chat_ids}:
+            particao = self.particoes[numero]
+            with particao.lock:
+                mudaram |= self._indexar_se_necessario(particao)
+                caudas.append((particao, particao.linhas + 1))
+
+        valores = ler_intervalos(self.spreadsheet,
+                                 [f"'{particao.sheet.title}'!A{inicio}:E" for particao, inicio in caudas])
+        for (particao, inicio), linhas in zip(caudas, valores):
+            with particao.lock:
+                mudaram |= particao.incorporar(inicio, linhas)
+
+        self._avisar(mudaram)
+        return mudaram
+
+    def importar_usuario(self, chat_id, linhas):
+        """
+        Copia para a partição os gastos que o usuário já tinha em outro formato
+
+        Só importa se o usuário ainda não tem gastos na partição, então a
+        migração pode ser repetida sem duplicar linhas.
+
+        Args:
+            chat_id: ID do usuário
+            linhas (list): Linhas [Data, Descrição, Valor, Categoria]
+
+        Returns:
+            int: Quantidade de linhas importadas
+        """
+        if not self.particoes or not linhas:
+            return 0
+
+        particao = self._particao(chat_id)
+        with particao.lock:
+            particao.indexar()
+            if particao.intervalos.get(str(chat_id)):
+                logger.info(f"⏭️ Usuário {chat_id} já tem gastos na partição")
+                return 0
+            particao.sheet.append_rows([[str(chat_id)] + list(linha[:4]) for linha in linhas],
+                                       table_range="A1")
+            particao.indexada_em = None
+        self._avisar([chat_id])
+        return len(linhas)
+
+    def calcular_saldo_mes(self, chat_id, nome_usuario=None, registros=None):
+        """Calcula total do mês do usuário (registros já baixados evitam nova leitura)"""
+        if registros is None:
+            registros = self.get_user_data(chat_id)
+        mes_atual = datetime.now().strftime("%m/%Y")
+        total = 0
+
+        for record in registros:
+            if mes_atual in str(record.get('Data', '')):
+                try:
+                    total += float(str(record.get('Valor', '0')).replace(',', '.'))
+                except ValueError:
+                    continue
+
+        return total
+
+    def get_user_sheet_id(self, chat_id, nome_usuario=None):
+        """Retorna ID da planilha (compartilhada por todos os usuários)"""
+        return self.spreadsheet.id if self.spreadsheet else None
+
+def _como_registro(linha):
+    """Linha [ChatID, Data, Descrição, Valor, Categoria] como dicionário da planilha"""
+    linha = list(linha) + [''] * (len(CABECALHO_PARTICAO) - len(linha))
+    return dict(zip(CABECALHO_PARTICAO[1:], linha[1:]))
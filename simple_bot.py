@@ -6,9 +6,9 @@ import requests
 import time
 import os
 import threading
-import re
 from flask import Flask
 from dotenv import load_dotenv
+from src.expense_engine import interpretar_mensagem
 
 load_dotenv()
 
@@ -27,22 +27,6 @@ def home():
 def health():
     return {"status": "ok", "bot": "running"}
 
-def extrair_valor(texto):
-    """Extrai valor do texto"""
-    match = re.search(r'(\d+(?:[.,]\d{1,2})?)', texto)
-    return float(match.group().replace(',', '.')) if match else None
-
-def categorizar(descricao):
-    """Categoriza gasto"""
-    desc = descricao.lower()
-    if any(p in desc for p in ['mercado', 'supermercado']):
-        return 'alimentação'
-    elif any(p in desc for p in ['uber', 'taxi']):
-        return 'transporte'
-    elif any(p in desc for p in ['farmácia', 'médico']):
-        return 'saúde'
-    return 'outros'
-
 def enviar_mensagem(chat_id, texto):
     """Envia mensagem"""
     try:
@@ -76,9 +60,10 @@ mercado 50
 uber 25.50""")
     else:
         # Processar gasto
-        valor = extrair_valor(texto)
+        gasto = interpretar_mensagem(texto)
+        valor = gasto.valor
         if valor:
-            categoria = categorizar(texto)
+            categoria = gasto.categoria
             enviar_mensagem(chat_id, f"✅ Gasto registrado!\n💰 R$ {valor:.2f}\n📂 {categoria.title()}")
             print(f"💰 GASTO: R$ {valor:.2f} - {categoria}")
         else:
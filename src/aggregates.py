@@ -0,0 +1,132 @@
+"""
+Índice de agregados de gastos por usuário, mês e categoria
+"""
+import threading
+from collections import Counter
+from .models import chave_mes
+
+class Agregado:
+    """Soma, quantidade, máximo e mínimo (em centavos) de um grupo de gastos"""
+
+    __slots__ = ('soma', 'contagem', 'maximo', 'minimo', '_valores')
+
+    def __init__(self):
+        self.soma = 0
+        self.contagem = 0
+        self.maximo = None
+        self.minimo = None
+        self._valores = Counter()
+
+    def adicionar(self, valor):
+        self.soma += valor
+        self.contagem += 1
+        self._valores[valor] += 1
+        if self.maximo is None or valor > self.maximo:
+            self.maximo = valor
+        if self.minimo is None or valor < self.minimo:
+            self.minimo = valor
+
+    def remover(self, valor):
+        if not self._valores[valor]:
+            return
+        self.soma -= valor
+        self.contagem -= 1
+        self._valores[valor] -= 1
+        if not self._valores[valor]:
+            del self._valores[valor]
+            # Só recalcula extremos quando o valor removido era um deles
+            if valor == self.maximo:
+                self.maximo = max(self._valores) if self._valores else None
+            if valor == self.minimo:
+                self.minimo = min(self._valores) if self._valores else None
+
+    def como_dict(self):
+        """Valores convertidos para reais"""
+        return {
+            'soma': self.soma / 100,
+            'contagem': self.contagem,
+            'maximo': (self.maximo or 0) / 100,
+            'minimo': (self.minimo or 0) / 100
+        }
+
+class IndiceAgregado:
+    """
+    Agregados mantidos incrementalmente a cada inclusão ou remoção de gasto,
+    indexados por (usuário, ano-mês, categoria), com totais por mês e por
+    categoria já consolidados para consultas em O(1).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._limpar()
+
+    def _limpar(self):
+        self._por_mes_categoria = {}  # (usuario, mes) -> {categoria: Agregado}
+        self._por_mes = {}            # (usuario, mes) -> Agregado
+        self._por_categoria = {}      # usuario -> {categoria: Agregado}
+
+    def reconstruir(self, gastos, usuario=None):
+        """Recalcula o índice a partir de uma lista completa de Gasto"""
+        with self._lock:
+            self._limpar()
+            for gasto in gastos:
+                self._aplicar(gasto, usuario, 1)
+
+    def adicionar(self, gasto, usuario=None):
+        with self._lock:
+            self._aplicar(gasto, usuario, 1)
+
+    def remover(self, gasto, usuario=None):
+        with self._lock:
+            self._aplicar(gasto, usuario, -1)
+
+    def aplicar_mudancas(self, removidos, adicionados, usuario=None):
+        """Aplica um lote de mudanças (formato dos ouvintes do SincronizadorIncremental)"""
+        with self._lock:
+            for gasto in removidos:
+                self._aplicar(gasto, usuario, -1)
+            for gasto in adicionados:
+                self._aplicar(gasto, usuario, 1)
+
+    def _aplicar(self, gasto, usuario, sinal):
+        mes, valor, categoria = gasto.mes, gasto.centavos, gasto.categoria
+        agregados = [self._por_categoria.setdefault(usuario, {}).setdefault(categoria, Agregado())]
+        if gasto.dia:
+            agregados.append(self._por_mes_categoria.setdefault((usuario, mes), {})
+                             .setdefault(categoria, Agregado()))
+            agregados.append(self._por_mes.setdefault((usuario, mes), Agregado()))
+
+        for agregado in agregados:
+            if sinal > 0:
+                agregado.adicionar(valor)
+            else:
+                agregado.remover(valor)
+
+    def resumo_mes(self, ano, mes, usuario=None):
+        """
+        Agregado do mês inteiro
+
+        Returns:
+            dict: soma, contagem, maximo e minimo
+        """
+        with self._lock:
+            agregado = self._por_mes.get((usuario, chave_mes(ano, mes)))
+            return agregado.como_dict() if agregado else Agregado().como_dict()
+
+    def total_mes(self, ano, mes, usuario=None):
+        """Total gasto no mês"""
+        return self.resumo_mes(ano, mes, usuario)['soma']
+
+    def por_categoria(self, ano=None, mes=None, usuario=None):
+        """
+        Totais por categoria de um mês (ou de todo o período se mes=None)
+
+        Returns:
+            dict: categoria -> total
+        """
+        with self._lock:
+            if mes is None:
+                grupos = self._por_categoria.get(usuario, {})
+            else:
+                grupos = self._por_mes_categoria.get((usuario, chave_mes(ano, mes)), {})
+            return {cat: ag.soma / 100 for cat, ag in grupos.items() if ag.contagem}
@@ -0,0 +1,120 @@
+"""
+Agregação em passada única dos gastos para o dashboard
+"""
+import heapq
+from datetime import date
+
+class AnalisePeriodo:
+    """
+    Calcula todas as métricas por período do dashboard percorrendo os gastos
+    uma única vez: totais, maior gasto, categorias, dias da semana, semanas do
+    mês, dia mais caro, comparação com o mês anterior e os N maiores gastos
+    (mantidos em um heap limitado).
+    """
+
+    def __init__(self, mes_inicio, mes_fim, mes_anterior, limite_top=5):
+        """
+        Args:
+            mes_inicio (int): Primeiro mês do período (chave_mes)
+            mes_fim (int): Último mês do período (chave_mes)
+            mes_anterior (int): Mês usado na comparação (chave_mes)
+            limite_top (int): Quantidade de maiores gastos mantidos
+        """
+        self.mes_inicio = mes_inicio
+        self.mes_fim = mes_fim
+        self.mes_anterior = mes_anterior
+        self.limite_top = limite_top
+
+        # Período selecionado (valores em centavos)
+        self.total = 0
+        self.contagem = 0
+        self.maior = 0
+        self.categorias = {}
+        self.por_dia_semana = [0] * 7  # Dom=0, Seg=1, ..., Sáb=6
+        self.por_semana_mes = [0] * 4
+        self.por_dia = {}
+
+        # Mês anterior
+        self.total_anterior = 0
+        self.maior_anterior = 0
+        self.categorias_anterior = {}
+
+        self._top = []
+        self._posicao = 0
+        self._nomes = {}
+
+    def processar(self, gastos):
+        """
+        Acumula uma sequência de Gasto
+
+        Returns:
+            AnalisePeriodo: A própria instância
+        """
+        for gasto in gastos:
+            self.adicionar(gasto)
+        return self
+
+    def adicionar(self, gasto):
+        """Acumula um único Gasto"""
+        if not gasto.dia:
+            return
+
+        mes, centavos = gasto.mes, gasto.centavos
+        if self.mes_inicio <= mes <= self.mes_fim:
+            self._adicionar_periodo(gasto, centavos)
+        if mes == self.mes_anterior:
+            self.total_anterior += centavos
+            if centavos > self.maior_anterior:
+                self.maior_anterior = centavos
+            cat = self._nome_categoria(gasto.categoria)
+            self.categorias_anterior[cat] = self.categorias_anterior.get(cat, 0) + centavos
+
+    def _adicionar_periodo(self, gasto, centavos):
+        dia = gasto.dia
+        self.total += centavos
+        self.contagem += 1
+        if centavos > self.maior:
+            self.maior = centavos
+
+        cat = self._nome_categoria(gasto.categoria)
+        self.categorias[cat] = self.categorias.get(cat, 0) + centavos
+        self.por_dia[dia] = self.por_dia.get(dia, 0) + centavos
+
+        # date.fromordinal(1) é segunda-feira, então ordinal % 7 == 0 é domingo
+        self.por_dia_semana[dia % 7] += centavos
+        self.por_semana_mes[min((date.fromordinal(dia).day - 1) // 7, 3)] += centavos
+
+        # Heap mínimo com os maiores gastos; em empate fica o registrado primeiro
+        self._posicao += 1
+        item = (centavos, -self._posicao, gasto)
+        if len(self._top) < self.limite_top:
+            heapq.heappush(self._top, item)
+        elif item[:2] > self._top[0][:2]:
+            heapq.heapreplace(self._top, item)
+
+    def _nome_categoria(self, categoria):
+        """Nome capitalizado da categoria (calculado uma vez por categoria)"""
+        nome = self._nomes.get(categoria)
+        if nome is None:
+            nome = self._nomes[categoria] = categoria.title()
+        return nome
+
+    def top(self):
+        """
+        Maiores gastos do período
+
+        Returns:
+            list: Gasto em ordem decrescente de valor
+        """
+        return [item[2] for item in sorted(self._top, key=lambda i: i[:2], reverse=True)]
+
+    def dia_mais_caro(self):
+        """
+        Dia com maior total no período
+
+        Returns:
+            tuple: (ordinal, centavos) ou None se não houver gastos
+        """
+        if not self.por_dia:
+            return None
+        return max(self.por_dia.items(), key=lambda x: x[1])
@@ -2,16 +2,21 @@
 Bot Telegram - Controle de Gastos
 Aplicação principal Flask para Telegram
 """
-from flask import Flask, request, render_template
+from flask import Flask, request, render_template, jsonify
 import logging
 from datetime import datetime
 
 # Imports locais
 from .config import Config
 from .sheets_service import SheetsService
-from .telegram_service import TelegramService
-from .categories import categorizar_gasto
-from .utils import extrair_valor_melhorado, limpar_descricao, extrair_comando
+from .telegram_service import TelegramService, RespostaWebhook
+from .outbound import PRIORIDADE_CONFIRMACAO
+from .pipeline import PipelineUpdates
+from .dedup import RegistroUpdates
+from .update_inbox import CaixaEntradaUpdates
+from .categories import obter_categorias
+from .category_memory import MemoriaCategorias, normalizar_descricao
+from .expense_engine import interpretar_mensagem
 
 # Configurar logging
 logging.basicConfig(
@@ -26,8 +31,22 @@ app = Flask(__name__,
            static_folder='../static')
 
 # Inicializar serviços
-sheets_service = SheetsService()
+sheets_service = SheetsService(journal_arquivo=Config.JOURNAL_ARQUIVO)
 telegram_service = TelegramService()
+memoria_categorias = MemoriaCategorias(caminho=Config.CATEGORIAS_APRENDIDAS_ARQUIVO)
+
+# Updates do webhook: deduplicados por update_id (registro persistido) e processados em background
+updates_recebidos = RegistroUpdates(caminho=Config.UPDATES_ARQUIVO,
+                                    margem_inicial=Config.WEBHOOK_MARGEM_UPDATES)
+pipeline = None
+caixa_entrada = None
+if Config.WEBHOOK_FAST_ACK:
+    # O payload vai para o disco antes do 200; o que não foi concluído volta na inicialização
+    caixa_entrada = CaixaEntradaUpdates(Config.WEBHOOK_CAIXA_ARQUIVO)
+    pipeline = PipelineUpdates(lambda update, resposta: _processar_update_da_caixa(update, resposta),
+                               workers=Config.WEBHOOK_WORKERS,
+                               tamanho_fila=Config.WEBHOOK_TAMANHO_FILA,
+                               registro=updates_recebidos)
 
 @app.route("/")
 def home():
@@ -64,42 +83,102 @@ def dashboard():
 def webhook():
     """Endpoint do webhook do Telegram"""
     try:
-        data = request.get_json()
+        data = request.get_json(silent=True)
         
-        if not data or "message" not in data:
+        if not data or "update_id" not in data:
             return "ok", 200
         
-        message = data["message"]
-        chat_id = message["chat"]["id"]
-        text = message.get("text", "").strip()
-        
-        if not text:
+        # Telegram reenvia updates sem resposta a tempo: processa cada um só uma vez
+        update_id = data["update_id"]
+        if not updates_recebidos.registrar(update_id):
             return "ok", 200
         
-        logger.info(f"📱 Mensagem de {chat_id}: '{text}'")
+        resposta = _nova_resposta_webhook(data)
         
-        # Processar comando ou gasto
-        _processar_comando_ou_gasto(text, chat_id)
+        if pipeline is None:
+            try:
+                _processar_update(data, resposta)
+            finally:
+                updates_recebidos.concluir(update_id)
+            return _responder_webhook(resposta, timeout=0)
         
-        return "ok", 200
+        try:
+            caixa_entrada.gravar(data)
+        except Exception as e:
+            # Sem o payload em disco não há 200: o Telegram reenvia o update
+            updates_recebidos.remover(update_id)
+            logger.error(f"❌ Erro ao gravar update {update_id}: {e}")
+            return "error", 500
+        
+        if not pipeline.tentar_enviar(data, resposta):
+            # Workers sobrecarregados: o Telegram tenta de novo mais tarde
+            caixa_entrada.concluir(update_id)
+            updates_recebidos.remover(update_id)
+            logger.warning(f"⚠️ Fila cheia, update {update_id} recusado")
+            return "busy", 503
+        
+        return _responder_webhook(resposta, timeout=Config.WEBHOOK_ESPERA_RESPOSTA_MS / 1000)
         
     except Exception as e:
         logger.error(f"❌ Erro ao processar mensagem: {e}")
         return "ok", 200
 
-def _processar_comando_ou_gasto(text, chat_id):
+def _nova_resposta_webhook(data):
+    """RespostaWebhook do update, se o modo de resposta no corpo estiver ativo"""
+    if not Config.WEBHOOK_RESPOSTA_NO_CORPO or "message" not in data:
+        return None
+    return RespostaWebhook(data["message"]["chat"]["id"])
+
+def _responder_webhook(resposta, timeout):
+    """Resposta HTTP do webhook, com a primeira mensagem no corpo se ficou pronta a tempo"""
+    dados = resposta.aguardar(timeout) if resposta else None
+    if dados:
+        return jsonify(dados)
+    return "ok", 200
+
+def _processar_update_da_caixa(data, resposta=None):
+    """Processa um update aceito pelo webhook e o retira da caixa de entrada"""
+    try:
+        _processar_update(data, resposta)
+    finally:
+        caixa_entrada.concluir(data["update_id"])
+
+def _processar_update(data, resposta=None):
+    """Processa um update do Telegram"""
+    if "message" not in data:
+        return
+    
+    message = data["message"]
+    chat_id = message["chat"]["id"]
+    text = message.get("text", "").strip()
+    
+    if not text:
+        return
+    
+    logger.info(f"📱 Mensagem de {chat_id}: '{text}'")
+    
+    # Processar comando ou gasto
+    # update_id é a chave de idempotência do gasto na planilha
+    update_id = data.get("update_id")
+    if resposta is None:
+        _processar_comando_ou_gasto(text, chat_id, update_id)
+    else:
+        with telegram_service.capturar_resposta(resposta):
+            _processar_comando_ou_gasto(text, chat_id, update_id)
+
+def _processar_comando_ou_gasto(text, chat_id, update_id=None):
     """Processa comando ou registra gasto"""
     # Comandos com /
     if text.startswith('/'):
         comando = text[1:].lower()
         _processar_comando(comando, text, chat_id)
     else:
-        # Verificar comandos sem /
-        comando = extrair_comando(text)
-        if comando:
-            _processar_comando(comando, text, chat_id)
+        # Verificar comandos sem / (valor, descrição, categoria e comando em uma única análise)
+        gasto = interpretar_mensagem(text, chat_id, memoria_categorias)
+        if gasto.comando:
+            _processar_comando(gasto.comando, text, chat_id)
         else:
-            _processar_gasto(text, chat_id)
+            _processar_gasto(gasto, chat_id, update_id)
 
 def _processar_comando(comando, text, chat_id):
     """Processa comandos específicos"""
@@ -128,23 +207,44 @@ def _processar_comando(comando, text, chat_id):
         else:
             telegram_service.enviar_mensagem(chat_id, "❌ Erro ao deletar gasto")
     
+    elif comando.startswith("corrigir"):
+        _corrigir_categoria(comando[len("corrigir"):], chat_id)
+    
     elif comando in ["ajuda", "help", "comandos", "start"]:
         telegram_service.enviar_ajuda(chat_id)
 
-def _processar_gasto(text, chat_id):
-    """Processa registro de gasto"""
-    valor = extrair_valor_melhorado(text)
+def _corrigir_categoria(argumento, chat_id):
+    """Muda a categoria do último gasto e aprende a categoria da descrição"""
+    categorias = {normalizar_descricao(c): c for c in obter_categorias()}
+    categoria = categorias.get(normalizar_descricao(argumento))
+    
+    if categoria is None:
+        telegram_service.enviar_mensagem(
+            chat_id, f"❓ Use /corrigir <categoria>. Categorias: {', '.join(categorias.values())}")
+        return
+    
+    gasto = sheets_service.corrigir_categoria_ultimo(categoria)
+    if gasto:
+        memoria_categorias.corrigir(chat_id, gasto.descricao, categoria)
+        telegram_service.enviar_mensagem(
+            chat_id, f"✅ {gasto.descricao} agora é {categoria.title()}. Vou lembrar da próxima vez!")
+    else:
+        telegram_service.enviar_mensagem(chat_id, "❌ Nenhum gasto para corrigir")
+
+def _processar_gasto(gasto, chat_id, update_id=None):
+    """Processa registro de gasto a partir da mensagem já interpretada"""
+    valor = gasto.valor
     
     if valor:
-        descricao = limpar_descricao(text)
-        categoria = categorizar_gasto(descricao)
+        descricao, categoria = gasto.descricao, gasto.categoria
         
-        if sheets_service.adicionar_gasto(descricao, valor, categoria):
+        if sheets_service.adicionar_gasto(descricao, valor, categoria, chave=update_id):
             telegram_service.enviar_mensagem_formatada(
                 chat_id,
                 "✅ Gasto Registrado",
                 f"{descricao} - R$ {valor:.2f}",
-                f"📂 Categoria: {categoria.title()}"
+                f"📂 Categoria: {categoria.title()}",
+                prioridade=PRIORIDADE_CONFIRMACAO
             )
             
             logger.info(f"💰 GASTO REGISTRADO: {descricao} - R$ {valor:.2f} ({categoria})")
@@ -153,6 +253,18 @@ def _processar_gasto(text, chat_id):
     else:
         telegram_service.enviar_erro_valor(chat_id)
 
+def _retomar_caixa_entrada():
+    """Reenfileira os updates aceitos antes de uma queda e ainda não concluídos"""
+    if caixa_entrada is None:
+        return
+    for update in caixa_entrada.pendentes():
+        if updates_recebidos.registrar(update["update_id"]):
+            pipeline.enviar(update, None)
+        else:
+            caixa_entrada.concluir(update["update_id"])
+
+_retomar_caixa_entrada()
+
 def main():
     """Função principal"""
     logger.info("🚀 Iniciando Bot Telegram - Controle de Gastos")
@@ -0,0 +1,141 @@
+"""
+Autômato de Aho-Corasick para encontrar várias palavras-chave em uma única passada
+"""
+import threading
+import unicodedata
+from collections import deque
+
+def normalizar_texto(texto):
+    """
+    Minúsculas e sem acentos ("Farmácia" -> "farmacia")
+
+    Cada caractere do texto original vira exatamente um caractere, então as
+    posições encontradas no texto normalizado valem para o original.
+    """
+    decomposto = unicodedata.normalize('NFD', texto.lower())
+    return ''.join(c for c in decomposto if not unicodedata.combining(c))
+
+class AutomatoPalavras:
+    """
+    Encontra todas as ocorrências de um conjunto de palavras-chave percorrendo
+    o texto uma única vez, independente de quantas palavras existam.
+
+    As palavras são comparadas sem acentos e sem diferenciar maiúsculas. Só
+    contam ocorrências de palavras inteiras (com plural simples: "remédio"
+    também encontra "remédios"), então "bar" não casa com "barato".
+
+    Novas palavras estendem a trie existente; os links de falha são
+    recalculados na próxima busca.
+    """
+
+    def __init__(self, palavras=()):
+        """
+        Args:
+            palavras (iterable): Palavras-chave iniciais
+        """
+        self._transicoes = [{}]   # nó -> {caractere: nó}
+        self._falha = [0]
+        self._saidas = [()]       # nó -> palavras (normalizadas) que terminam nele
+        self._palavras = {}       # palavra normalizada -> nó final
+        self._sujo = False
+        self._lock = threading.Lock()
+
+        for palavra in palavras:
+            self.adicionar(palavra)
+
+    def __contains__(self, palavra):
+        return normalizar_texto(palavra.strip()) in self._palavras
+
+    def __len__(self):
+        return len(self._palavras)
+
+    def adicionar(self, palavra):
+        """
+        Inclui uma palavra-chave
+
+        Returns:
+            str: A palavra normalizada (chave usada nos resultados de buscar)
+        """
+        chave = normalizar_texto(palavra.strip())
+        if not chave:
+            return None
+
+        with self._lock:
+            if chave in self._palavras:
+                return chave
+            no = 0
+            for caractere in chave:
+                proximo = self._transicoes[no].get(caractere)
+                if proximo is None:
+                    proximo = len(self._transicoes)
+                    self._transicoes.append({})
+                    self._falha.append(0)
+                    self._saidas.append(())
+                    self._transicoes[no][caractere] = proximo
+                no = proximo
+            self._palavras[chave] = no
+            self._sujo = True
+        return chave
+
+    def buscar(self, texto):
+        """
+        Palavras-chave presentes no texto
+
+        Args:
+            texto (str): Texto onde procurar
+
+        Returns:
+            list: Tuplas (inicio, fim, palavra normalizada), na ordem em que terminam
+        """
+        texto = normalizar_texto(texto)
+        encontradas = []
+
+        with self._lock:
+            if self._sujo:
+                self._calcular_falhas()
+
+            transicoes, falha, saidas = self._transicoes, self._falha, self._saidas
+            no = 0
+            for fim, caractere in enumerate(texto, 1):
+                while no and caractere not in transicoes[no]:
+                    no = falha[no]
+                no = transicoes[no].get(caractere, 0)
+                for palavra in saidas[no]:
+                    inicio = fim - len(palavra)
+                    if _palavra_inteira(texto, inicio, fim):
+                        encontradas.append((inicio, fim, palavra))
+
+        return encontradas
+
+    def _calcular_falhas(self):
+        """Recalcula links de falha e saídas por busca em largura (chamado com a trava)"""
+        finais = {no: palavra for palavra, no in self._palavras.items()}
+        fila = deque()
+        for no in self._transicoes[0].values():
+            self._falha[no] = 0
+            self._saidas[no] = (finais[no],) if no in finais else ()
+            fila.append(no)
+
+        while fila:
+            atual = fila.popleft()
+            for caractere, proximo in self._transicoes[atual].items():
+                destino = self._falha[atual]
+                while destino and caractere not in self._transicoes[destino]:
+                    destino = self._falha[destino]
+                destino = self._transicoes[destino].get(caractere, 0)
+                self._falha[proximo] = destino if destino != proximo else 0
+
+                propria = (finais[proximo],) if proximo in finais else ()
+                self._saidas[proximo] = propria + self._saidas[self._falha[proximo]]
+                fila.append(proximo)
+
+        self._sujo = False
+
+def _palavra_inteira(texto, inicio, fim):
+    """Verifica se texto[inicio:fim] é uma palavra inteira (aceitando plural com 's')"""
+    if inicio > 0 and texto[inicio - 1].isalnum():
+        return False
+    if fim < len(texto) and texto[fim].isalnum():
+        # Plural simples: "remédios", "livros"
+        return texto[fim] == 's' and (fim + 1 == len(texto) or not texto[fim + 1].isalnum())
+    return True
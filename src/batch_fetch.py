@@ -0,0 +1,25 @@
+"""
+Leitura de vários intervalos da planilha em uma chamada
+"""
+
+# Intervalos por chamada de values_batch_get (limita o tamanho da URL)
+RANGES_POR_LOTE = 100
+
+def ler_intervalos(spreadsheet, intervalos):
+    """
+    Baixa vários intervalos de uma planilha com values_batch_get
+
+    Args:
+        spreadsheet (gspread.Spreadsheet): Planilha
+        intervalos (list): Intervalos em notação A1 (ex: "'Gastos_01'!A2:E9")
+
+    Returns:
+        list: Linhas (lista de listas) de cada intervalo, na mesma ordem
+    """
+    resultado = []
+    for inicio in range(0, len(intervalos), RANGES_POR_LOTE):
+        parte = intervalos[inicio:inicio + RANGES_POR_LOTE]
+        resposta = spreadsheet.values_batch_get(parte)
+        # Intervalos vazios vêm sem a chave 'values'
+        resultado.extend(valor.get('values', []) for valor in resposta.get('valueRanges', []))
+    return resultado
@@ -1,6 +1,8 @@
 """
 Sistema de categorização automática de gastos
 """
+import threading
+from .automato import AutomatoPalavras, normalizar_texto
 
 # Definição das categorias e palavras-chave
 CATEGORIAS = {
@@ -41,6 +43,63 @@ CATEGORIAS = {
     'outros': []
 }
 
+# Peso de palavras-chave pouco específicas (padrão: 1.0 por palavra, então
+# "plano de saúde" pesa mais que "plano"). O peso ainda é dividido entre as
+# categorias que usam a palavra ('bar' conta meio ponto para alimentação e
+# meio para lazer).
+PESOS_PALAVRAS = {
+    'plano': 0.5, 'seguro': 0.5, 'material': 0.5, 'loja': 0.5,
+    'saúde': 0.5, 'segurança': 0.5
+}
+
+_automato = AutomatoPalavras()
+_categorias_palavra = {}   # palavra normalizada -> categorias que a usam
+_pesos = {normalizar_texto(palavra): peso for palavra, peso in PESOS_PALAVRAS.items()}
+_lock = threading.Lock()
+
+def _registrar_palavra(categoria, palavra):
+    """Inclui a palavra no autômato e no índice de categorias"""
+    chave = _automato.adicionar(palavra)
+    if chave is None:
+        return
+    with _lock:
+        categorias = _categorias_palavra.setdefault(chave, [])
+        if categoria not in categorias:
+            categorias.append(categoria)
+
+def _peso(palavra):
+    """Peso de uma ocorrência da palavra e as categorias que recebem esse peso"""
+    with _lock:
+        categorias = tuple(_categorias_palavra[palavra])
+    return _pesos.get(palavra, len(palavra.split())) / len(categorias), categorias
+
+for _categoria, _palavras in CATEGORIAS.items():
+    for _palavra in _palavras:
+        _registrar_palavra(_categoria, _palavra)
+
+def pontuar_categorias(descricao):
+    """
+    Pontuação de cada categoria para uma descrição
+
+    Todas as palavras-chave são procuradas em uma única passada; cada
+    ocorrência soma o peso da palavra às categorias que a usam.
+
+    Args:
+        descricao (str): Descrição do gasto
+
+    Returns:
+        dict: {categoria: pontos} só com as categorias encontradas
+    """
+    pontos = {}
+    if not descricao:
+        return pontos
+
+    for _, _, palavra in _automato.buscar(descricao):
+        peso, categorias = _peso(palavra)
+        for categoria in categorias:
+            pontos[categoria] = pontos.get(categoria, 0) + peso
+    return pontos
+
 def categorizar_gasto(descricao):
     """
     Categoriza um gasto baseado na descrição
@@ -49,19 +108,15 @@ def categorizar_gasto(descricao):
         descricao (str): Descrição do gasto
         
     Returns:
-        str: Categoria identificada
+        str: Categoria com maior pontuação ('outros' se nenhuma palavra-chave aparecer)
     """
-    if not descricao:
+    pontos = pontuar_categorias(descricao)
+    if not pontos:
         return 'outros'
     
-    descricao_lower = descricao.lower().strip()
-    
-    # Procura por palavras-chave em cada categoria
-    for categoria, palavras in CATEGORIAS.items():
-        if any(palavra in descricao_lower for palavra in palavras):
-            return categoria
-    
-    return 'outros'
+    # Empate: vale a ordem de CATEGORIAS
+    ordem = list(CATEGORIAS)
+    return max(pontos, key=lambda categoria: (pontos[categoria], -ordem.index(categoria)))
 
 def obter_categorias():
     """
@@ -83,5 +138,6 @@ def adicionar_palavra_categoria(categoria, palavra):
     if categoria in CATEGORIAS:
         if palavra.lower() not in CATEGORIAS[categoria]:
             CATEGORIAS[categoria].append(palavra.lower())
+            _registrar_palavra(categoria, palavra)
             return True
     return False
\ No newline at end of file
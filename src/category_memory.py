@@ -0,0 +1,140 @@
+"""
+Memória de categorias por usuário: descrições já vistas e correções aprendidas
+"""
+import json
+import os
+import threading
+import logging
+from collections import OrderedDict
+from .automato import normalizar_texto
+from .categories import categorizar_gasto
+
+logger = logging.getLogger(__name__)
+
+def normalizar_descricao(descricao):
+    """Chave de uma descrição: sem acentos, minúsculas e espaços simples"""
+    return ' '.join(normalizar_texto(descricao or '').split())
+
+class MemoriaCategorias:
+    """
+    Lembra a categoria de cada descrição por usuário.
+
+    - Um LRU limitado guarda as categorias calculadas recentemente, então
+      descrições repetidas ("mercado", "uber") não passam pelo categorizador.
+    - Correções feitas pelo usuário ficam em um arquivo append-only (uma
+      entrada JSON por linha) e têm prioridade sobre o categorizador, valendo
+      imediatamente e após reinícios.
+    """
+
+    def __init__(self, caminho=None, capacidade=10000):
+        """
+        Args:
+            caminho (str): Arquivo das correções (None mantém só em memória)
+            capacidade (int): Entradas mantidas no LRU
+        """
+        self.caminho = caminho
+        self.capacidade = capacidade
+
+        self._recentes = OrderedDict()  # (usuario, chave) -> categoria
+        self._aprendidas = {}           # (usuario, chave) -> categoria corrigida
+        self._linhas_arquivo = 0
+        self._arquivo = None
+        self._lock = threading.Lock()
+
+        if caminho:
+            self._carregar()
+            self._arquivo = open(caminho, 'a', encoding='utf-8')
+
+    def categorizar(self, usuario, descricao):
+        """
+        Categoria de uma descrição para o usuário
+
+        Args:
+            usuario: ID do usuário (chat_id)
+            descricao (str): Descrição do gasto
+
+        Returns:
+            str: Categoria aprendida, em cache ou calculada por categorizar_gasto
+        """
+        chave = (str(usuario), normalizar_descricao(descricao))
+        with self._lock:
+            categoria = self._recentes.get(chave)
+            if categoria is not None:
+                self._recentes.move_to_end(chave)
+                return categoria
+            categoria = self._aprendidas.get(chave)
+
+        if categoria is None:
+            categoria = categorizar_gasto(descricao)
+
+        with self._lock:
+            self._lembrar(chave, categoria)
+        return categoria
+
+    def corrigir(self, usuario, descricao, categoria):
+        """
+        Registra a categoria correta de uma descrição para o usuário
+
+        Args:
+            usuario: ID do usuário (chat_id)
+            descricao (str): Descrição do gasto
+            categoria (str): Categoria informada pelo usuário
+        """
+        chave = (str(usuario), normalizar_descricao(descricao))
+        with self._lock:
+            if self._aprendidas.get(chave) != categoria:
+                self._aprendidas[chave] = categoria
+                self._escrever({'usuario': chave[0], 'descricao': chave[1], 'categoria': categoria})
+            self._lembrar(chave, categoria)
+
+    def _lembrar(self, chave, categoria):
+        """Guarda no LRU (chamado com a trava)"""
+        self._recentes[chave] = categoria
+        self._recentes.move_to_end(chave)
+        while len(self._recentes) > self.capacidade:
+            self._recentes.popitem(last=False)
+
+    def _escrever(self, entrada):
+        """Acrescenta uma correção ao arquivo (chamado com a trava)"""
+        if not self._arquivo:
+            return
+        self._arquivo.write(json.dumps(entrada, ensure_ascii=False) + '\n')
+        self._arquivo.flush()
+        os.fsync(self._arquivo.fileno())
+        self._linhas_arquivo += 1
+        self._compactar_se_necessario()
+
+    def _carregar(self):
+        """Lê as correções salvas (a última de cada descrição vale)"""
+        if not os.path.exists(self.caminho):
+            return
+
+        with open(self.caminho, 'r', encoding='utf-8') as f:
+            for texto in f:
+                try:
+                    entrada = json.loads(texto)
+                except ValueError:
+                    # Última linha incompleta (queda durante a escrita)
+                    continue
+                self._linhas_arquivo += 1
+                self._aprendidas[(entrada['usuario'], entrada['descricao'])] = entrada['categoria']
+
+        logger.info(f"{len(self._aprendidas)} categorias aprendidas carregadas")
+
+    def _compactar_se_necessario(self):
+        """Reescreve o arquivo sem correções substituídas quando ele cresce demais"""
+        if self._linhas_arquivo < 2 * len(self._aprendidas) + 1000:
+            return
+
+        temporario = f"{self.caminho}.tmp"
+        with open(temporario, 'w', encoding='utf-8') as f:
+            for (usuario, descricao), categoria in self._aprendidas.items():
+                f.write(json.dumps({'usuario': usuario, 'descricao': descricao,
+                                    'categoria': categoria}, ensure_ascii=False) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+
+        self._arquivo.close()
+        os.replace(temporario, self.caminho)
+        self._arquivo = open(self.caminho, 'a', encoding='utf-8')
+        self._linhas_arquivo = len(self._aprendidas)
@@ -0,0 +1,155 @@
+"""
+Diário de mudanças da planilha: sequência crescente para consultas incrementais
+"""
+import threading
+import time
+from collections import OrderedDict, deque
+from datetime import date
+
+_AUSENTE = object()
+
+class DiarioMudancas:
+    """
+    Numera cada mudança recebida do SincronizadorIncremental com uma
+    sequência crescente e guarda as mudanças recentes.
+
+    O cursor entregue aos clientes ("época.sequência.revisão") identifica a
+    versão dos dados de uma resposta. Com ele, delta devolve só os gastos
+    adicionados/removidos depois do cursor e os campos da resposta que
+    mudaram. A revisão muda quando a resposta muda sem mudança nos gastos
+    (virada do dia, configuração alterada); a época invalida os cursores de
+    antes de um reinício.
+    """
+
+    def __init__(self, limite_linhas=5000, respostas=50):
+        """
+        Args:
+            limite_linhas (int): Gastos guardados nas mudanças recentes; cursores
+                mais antigos recebem a resposta completa
+            respostas (int): Versões de resposta guardadas por endpoint
+        """
+        self.limite_linhas = limite_linhas
+        self.respostas = respostas
+        self.epoca = str(int(time.time()))
+
+        self._sequencia = 0
+        self._revisao = 0
+        self._dia = date.today()
+        self._mudancas = deque()  # (sequencia, removidos, adicionados)
+        self._linhas = 0
+        self._versoes = {}        # chave -> OrderedDict((sequencia, revisao) -> dados)
+        self._lock = threading.Lock()
+
+    def ao_mudar(self, removidos, adicionados):
+        """Ouvinte para o SincronizadorIncremental: registra a mudança com a próxima sequência"""
+        with self._lock:
+            self._sequencia += 1
+            self._mudancas.append((self._sequencia, removidos, adicionados))
+            self._linhas += len(removidos) + len(adicionados)
+            while self._linhas > self.limite_linhas and self._mudancas:
+                _, antigos_removidos, antigos_adicionados = self._mudancas.popleft()
+                self._linhas -= len(antigos_removidos) + len(antigos_adicionados)
+
+    def invalidar(self):
+        """Marca as respostas como desatualizadas sem mudança nos gastos (ex: meta alterada)"""
+        with self._lock:
+            self._revisao += 1
+
+    def completo(self, chave, gerar):
+        """
+        Resposta completa com o cursor da versão
+
+        Args:
+            chave (tuple): Endpoint e parâmetros (ex: ('complete-data', periodo))
+            gerar (callable): Função sem argumentos que retorna os dados (dict)
+
+        Returns:
+            dict: Dados e 'cursor'
+        """
+        versao, dados = self._calcular(chave, gerar)
+        return dict(dados, cursor=self._formatar(versao))
+
+    def delta(self, chave, desde, gerar):
+        """
+        Mudanças desde um cursor
+
+        Args:
+            chave (tuple): Endpoint e parâmetros
+            desde (str): Cursor recebido em uma resposta anterior
+            gerar (callable): Função sem argumentos que retorna os dados (dict)
+
+        Returns:
+            dict: {'cursor', 'completo': False, 'adicionados', 'removidos', 'alterados'}
+                ou, se o cursor é desconhecido ou antigo demais, os dados
+                completos com 'cursor' e 'completo': True
+        """
+        versao, dados = self._calcular(chave, gerar)
+        base_versao = self._ler_cursor(desde)
+
+        with self._lock:
+            base = self._versoes[chave].get(base_versao) if base_versao else None
+            mudancas = self._mudancas_entre(base_versao[0], versao[0]) if base is not None else None
+
+        if mudancas is None:
+            return dict(dados, cursor=self._formatar(versao), completo=True)
+
+        removidos, adicionados = mudancas
+        return {
+            'cursor': self._formatar(versao),
+            'completo': False,
+            'adicionados': [gasto.como_registro() for gasto in adicionados],
+            'removidos': [gasto.como_registro() for gasto in removidos],
+            'alterados': {campo: valor for campo, valor in dados.items()
+                          if base.get(campo, _AUSENTE) != valor}
+        }
+
+    def _calcular(self, chave, gerar):
+        """Dados da versão atual, calculados uma vez por versão"""
+        while True:
+            with self._lock:
+                versao = self._versao()
+                versoes = self._versoes.setdefault(chave, OrderedDict())
+                if versao in versoes:
+                    return versao, versoes[versao]
+
+            dados = gerar()
+
+            with self._lock:
+                # Se houve mudança durante o cálculo, os dados podem não ser da versão lida
+                if self._versao() == versao:
+                    versoes[versao] = dados
+                    while len(versoes) > self.respostas:
+                        versoes.popitem(last=False)
+                    return versao, dados
+
+    def _versao(self):
+        """(sequência, revisão) atual; a virada do dia gera nova revisão (chamado com a trava)"""
+        hoje = date.today()
+        if hoje != self._dia:
+            self._dia = hoje
+            self._revisao += 1
+        return self._sequencia, self._revisao
+
+    def _mudancas_entre(self, inicio, fim):
+        """Gastos removidos e adicionados nas sequências (inicio, fim], ou None se já descartadas"""
+        if inicio == fim:
+            return [], []
+        if not self._mudancas or self._mudancas[0][0] > inicio + 1:
+            return None
+
+        removidos, adicionados = [], []
+        for sequencia, mudanca_removidos, mudanca_adicionados in self._mudancas:
+            if inicio < sequencia <= fim:
+                removidos.extend(mudanca_removidos)
+                adicionados.extend(mudanca_adicionados)
+        return removidos, adicionados
+
+    def _formatar(self, versao):
+        return f"{self.epoca}.{versao[0]}.{versao[1]}"
+
+    def _ler_cursor(self, cursor):
+        """(sequência, revisão) do cursor, ou None se inválido ou de outra época"""
+        partes = str(cursor or '').split('.')
+        if len(partes) != 3 or partes[0] != self.epoca or not (partes[1].isdigit() and partes[2].isdigit()):
+            return None
+        return int(partes[1]), int(partes[2])
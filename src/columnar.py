@@ -0,0 +1,47 @@
+"""
+Armazenamento colunar (NumPy) dos gastos para análises
+"""
+import numpy as np
+
+class ColunasGastos:
+    """
+    Gastos em arrays paralelos: dia (ordinal), centavos e código da
+    categoria. Agrupamentos são feitos com np.bincount, em uma única
+    passada pelos dados, independente do número de dias.
+    """
+
+    def __init__(self, gastos):
+        """
+        Args:
+            gastos (list): Lista de Gasto
+        """
+        self.categorias = []
+        codigos = {}
+        codigos_gastos = []
+        for gasto in gastos:
+            codigo = codigos.get(gasto.categoria)
+            if codigo is None:
+                codigo = codigos[gasto.categoria] = len(self.categorias)
+                self.categorias.append(gasto.categoria)
+            codigos_gastos.append(codigo)
+
+        self.dias = np.fromiter((g.dia for g in gastos), dtype=np.int32, count=len(gastos))
+        self.centavos = np.fromiter((g.centavos for g in gastos), dtype=np.int64, count=len(gastos))
+        self.codigos = np.asarray(codigos_gastos, dtype=np.int32)
+
+    def __len__(self):
+        return len(self.centavos)
+
+    def somar_por_dia(self, inicio, fim):
+        """
+        Total por dia no intervalo de ordinais [inicio, fim]
+
+        Returns:
+            numpy.ndarray: Centavos por dia (fim - inicio + 1 posições)
+        """
+        tamanho = fim - inicio + 1
+        if tamanho <= 0:
+            return np.zeros(0, dtype=np.int64)
+        mascara = (self.dias >= inicio) & (self.dias <= fim)
+        totais = np.bincount(self.dias[mascara] - inicio, weights=self.centavos[mascara], minlength=tamanho)
+        return totais.astype(np.int64)
@@ -18,6 +18,39 @@ class Config:
     CREDENTIALS_FILE = 'config/credentials.json'
     GOOGLE_CREDENTIALS = os.getenv('GOOGLE_CREDENTIALS')  # JSON como string
     
+    # Cache local dos gastos (segundos)
+    LEDGER_SYNC_INTERVAL = int(os.getenv('LEDGER_SYNC_INTERVAL', 300))
+    LEDGER_VERSION_CHECK_INTERVAL = int(os.getenv('LEDGER_VERSION_CHECK_INTERVAL', 30))
+    
+    # Fila de gravação em lote
+    WRITE_BATCH_INTERVAL_MS = int(os.getenv('WRITE_BATCH_INTERVAL_MS', 500))
+    WRITE_BATCH_MAX_ROWS = int(os.getenv('WRITE_BATCH_MAX_ROWS', 50))
+    
+    # Conexões HTTP com a API do Telegram
+    TELEGRAM_POOL_SIZE = int(os.getenv('TELEGRAM_POOL_SIZE', 20))
+    TELEGRAM_TIMEOUT = int(os.getenv('TELEGRAM_TIMEOUT', 10))
+    TELEGRAM_SEND_WAIT = int(os.getenv('TELEGRAM_SEND_WAIT', 30))  # espera máxima na fila de envio
+    
+    # Registro de updates já processados (deduplicação e offset entre reinícios)
+    UPDATES_ARQUIVO = os.getenv('UPDATES_ARQUIVO', 'updates_webhook.bin')
+    
+    # Categorias corrigidas pelos usuários (aprendidas por descrição)
+    CATEGORIAS_APRENDIDAS_ARQUIVO = os.getenv('CATEGORIAS_APRENDIDAS_ARQUIVO', 'categorias_aprendidas.jsonl')
+    
+    # Journal dos gastos ainda não gravados na planilha (exclusivo deste processo)
+    JOURNAL_ARQUIVO = os.getenv('JOURNAL_ARQUIVO', 'gastos_journal_webhook.jsonl')
+    
+    # Webhook: responde 200 na hora e processa o update em background
+    WEBHOOK_FAST_ACK = os.getenv('WEBHOOK_FAST_ACK', 'true').lower() == 'true'
+    WEBHOOK_WORKERS = int(os.getenv('WEBHOOK_WORKERS', 4))
+    WEBHOOK_TAMANHO_FILA = int(os.getenv('WEBHOOK_TAMANHO_FILA', 1000))
+    WEBHOOK_CAIXA_ARQUIVO = os.getenv('WEBHOOK_CAIXA_ARQUIVO', 'webhook_pendentes.jsonl')
+    WEBHOOK_MARGEM_UPDATES = int(os.getenv('WEBHOOK_MARGEM_UPDATES', 10000))  # fora de ordem aceitos no 1º início
+    
+    # Webhook: primeira resposta no corpo do HTTP 200 (economiza um sendMessage)
+    WEBHOOK_RESPOSTA_NO_CORPO = os.getenv('WEBHOOK_RESPOSTA_NO_CORPO', 'false').lower() == 'true'
+    WEBHOOK_ESPERA_RESPOSTA_MS = int(os.getenv('WEBHOOK_ESPERA_RESPOSTA_MS', 1500))
+    
     # Google Sheets Scopes
     GOOGLE_SHEETS_SCOPES = [
         "https://spreadsheets.google.com/feeds",
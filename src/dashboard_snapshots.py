@@ -0,0 +1,234 @@
+"""
+Materialização em background dos dashboards por usuário
+"""
+import gzip
+import hashlib
+import json
+import threading
+import time
+import logging
+from datetime import date
+from flask import current_app, request
+
+logger = logging.getLogger(__name__)
+
+class Snapshot:
+    """Dashboard de um usuário já serializado, pronto para servir"""
+
+    __slots__ = ('corpo', 'corpo_gzip', 'etag', 'dia')
+
+    def __init__(self, corpo, corpo_gzip, etag, dia):
+        self.corpo = corpo
+        self.corpo_gzip = corpo_gzip
+        self.etag = etag
+        self.dia = dia
+
+class MaterializadorPainel:
+    """
+    Mantém o JSON do dashboard de cada usuário ativo pronto em memória.
+
+    Uma thread em background recalcula o snapshot de um usuário quando seus
+    dados mudam (marcar, chamado por quem grava, ou atualizar detectando
+    mudança na planilha) e na virada do dia, já que os cálculos dependem da
+    data atual. Servir o dashboard é só uma busca no dicionário, com custo
+    independente da quantidade de gastos do usuário.
+
+    Com carregar, cada rodada de recálculo baixa os dados de todos os
+    usuários pendentes em uma única leitura e os repassa para calcular. Com
+    verificar, o intervalo só procura mudanças na fonte, que chegam por
+    marcar; sem verificar nem atualizar, todos os usuários ativos entram na
+    rodada de cada intervalo.
+
+    Usuários sem acesso há mais de inatividade segundos (e fora de em_uso)
+    saem da memória e deixam de ser atualizados.
+    """
+
+    def __init__(self, calcular, atualizar=None, intervalo=30, comprimir=True, inatividade=900,
+                 em_uso=None, ao_atualizar=None, carregar=None, verificar=None):
+        """
+        Args:
+            calcular (callable): Função (usuario) que retorna os dados do dashboard;
+                com carregar, (usuario, dados) recebendo os dados já baixados
+            atualizar (callable): Função (usuario) que sincroniza a fonte e retorna
+                True se os dados mudaram (opcional)
+            intervalo (int): Segundos entre as verificações (atualizar ou carregar)
+            comprimir (bool): Guarda também o corpo em gzip
+            inatividade (int): Segundos sem acesso até descartar o usuário
+            em_uso (callable): Função (usuario) que retorna True se o usuário deve
+                continuar ativo sem novos acessos (ex: conexão SSE aberta)
+            ao_atualizar (callable): Função (usuario, snapshot) chamada quando o
+                recálculo em background muda o dashboard
+            carregar (callable): Função (usuarios) que baixa os dados de vários
+                usuários de uma vez e retorna {usuario: dados} (opcional)
+            verificar (callable): Função (usuarios) que procura mudanças nos dados
+                de vários usuários de uma vez e as informa por marcar (opcional)
+        """
+        self.calcular = calcular
+        self.atualizar = atualizar
+        self.intervalo = intervalo
+        self.comprimir = comprimir
+        self.inatividade = inatividade
+        self.em_uso = em_uso
+        self.ao_atualizar = ao_atualizar
+        self.carregar = carregar
+        self.verificar = verificar
+
+        self._snapshots = {}   # usuario -> Snapshot
+        self._acessos = {}     # usuario -> time.monotonic() do último acesso
+        self._pendentes = set()
+        self._condicao = threading.Condition()
+        self._thread = None
+
+    def iniciar(self):
+        """Inicia a thread de materialização (idempotente)"""
+        with self._condicao:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._executar, daemon=True,
+                                                name="materializador-painel")
+                self._thread.start()
+
+    def marcar(self, usuario=None):
+        """
+        Agenda o recálculo do dashboard
+
+        Args:
+            usuario: Usuário cujos dados mudaram (None recalcula todos os ativos)
+        """
+        with self._condicao:
+            if usuario is None:
+                self._pendentes.update(self._acessos)
+            elif usuario in self._acessos:
+                self._pendentes.add(usuario)
+            self._condicao.notify()
+
+    def ao_mudar(self, usuario):
+        """Ouvinte para o SincronizadorIncremental do usuário"""
+        return lambda removidos, adicionados: self.marcar(usuario)
+
+    def obter(self, usuario):
+        """
+        Snapshot do usuário; só calcula na hora no primeiro acesso
+
+        Args:
+            usuario: ID do usuário (chat_id)
+
+        Returns:
+            Snapshot: Dashboard serializado
+        """
+        with self._condicao:
+            self._acessos[usuario] = time.monotonic()
+            snapshot = self._snapshots.get(usuario)
+        if snapshot is None:
+            if self.atualizar:
+                self.atualizar(usuario)
+            snapshot = self._materializar(usuario, self._calculadora([usuario]))
+        return snapshot
+
+    def responder(self, usuario):
+        """
+        Resposta Flask do snapshot, com ETag e gzip quando o cliente aceita
+
+        Args:
+            usuario: ID do usuário (chat_id)
+
+        Returns:
+            flask.Response: Resposta JSON ou 304 Not Modified
+        """
+        snapshot = self.obter(usuario)
+        if request.if_none_match.contains(snapshot.etag):
+            resposta = current_app.response_class(status=304)
+        elif snapshot.corpo_gzip is not None and 'gzip' in request.accept_encodings:
+            resposta = current_app.response_class(snapshot.corpo_gzip, mimetype='application/json')
+            resposta.headers['Content-Encoding'] = 'gzip'
+        else:
+            resposta = current_app.response_class(snapshot.corpo, mimetype='application/json')
+        resposta.set_etag(snapshot.etag)
+        resposta.headers['Cache-Control'] = 'no-cache'
+        resposta.vary.add('Accept-Encoding')
+        return resposta
+
+    def _calculadora(self, usuarios):
+        """Função (usuario) de cálculo; com carregar, baixa antes os dados de todos os usuários"""
+        if not self.carregar:
+            return self.calcular
+        dados = self.carregar(list(usuarios))
+        return lambda usuario: self.calcular(usuario, dados.get(usuario, []))
+
+    def _materializar(self, usuario, calcular):
+        """Calcula, serializa e guarda o snapshot do usuário"""
+        corpo = json.dumps(calcular(usuario), ensure_ascii=False,
+                           separators=(',', ':')).encode('utf-8')
+        snapshot = Snapshot(corpo,
+                            gzip.compress(corpo) if self.comprimir else None,
+                            hashlib.sha1(corpo).hexdigest(),
+                            date.today())
+        with self._condicao:
+            anterior = self._snapshots.get(usuario)
+            if usuario in self._acessos:
+                self._snapshots[usuario] = snapshot
+        if self.ao_atualizar and anterior is not None and anterior.etag != snapshot.etag:
+            self.ao_atualizar(usuario, snapshot)
+        return snapshot
+
+    def _executar(self):
+        """Loop da thread: verifica mudanças a cada intervalo e recalcula os pendentes"""
+        proxima_verificacao = time.monotonic() + self.intervalo
+        while True:
+            with self._condicao:
+                if not self._pendentes:
+                    self._condicao.wait(max(0, proxima_verificacao - time.monotonic()))
+                pendentes, self._pendentes = self._pendentes, set()
+
+            if time.monotonic() >= proxima_verificacao:
+                pendentes |= self._verificar()
+                proxima_verificacao = time.monotonic() + self.intervalo
+
+            if not pendentes:
+                continue
+            try:
+                calcular = self._calculadora(pendentes)
+            except Exception as e:
+                logger.error(f"Erro ao carregar dados dos dashboards: {e}")
+                continue
+
+            for usuario in pendentes:
+                try:
+                    self._materializar(usuario, calcular)
+                except Exception as e:
+                    logger.error(f"Erro ao materializar dashboard de {usuario}: {e}")
+
+    def _verificar(self):
+        """Descarta inativos e retorna os usuários que precisam de recálculo"""
+        agora = time.monotonic()
+        hoje = date.today()
+        with self._condicao:
+            inativos = [u for u, acesso in self._acessos.items() if agora - acesso > self.inatividade]
+        inativos = [u for u in inativos if not (self.em_uso and self.em_uso(u))]
+
+        with self._condicao:
+            for usuario in inativos:
+                # Pode ter sido acessado de novo entre as duas travas
+                if agora - self._acessos.get(usuario, agora) > self.inatividade:
+                    del self._acessos[usuario]
+                    self._snapshots.pop(usuario, None)
+            ativos = list(self._acessos)
+            # Virada do dia: "últimos 7 dias" e total do mês mudam sem novos gastos
+            mudaram = {u for u in ativos if u in self._snapshots and self._snapshots[u].dia != hoje}
+
+        if self.verificar:
+            # Os usuários que mudaram chegam por marcar e entram na próxima rodada
+            try:
+                self.verificar(ativos)
+            except Exception as e:
+                logger.error(f"Erro ao verificar mudanças nos dados: {e}")
+        elif self.carregar and not self.atualizar:
+            # Sem verificação por usuário: a rodada relê todos de uma vez
+            mudaram.update(ativos)
+        elif self.atualizar:
+            for usuario in ativos:
+                try:
+                    if self.atualizar(usuario):
+                        mudaram.add(usuario)
+                except Exception as e:
+                    logger.error(f"Erro ao verificar dados de {usuario}: {e}")
+        return mudaram
@@ -0,0 +1,187 @@
+"""
+Registro de update_ids já processados, para processar cada update uma única vez
+"""
+import os
+import struct
+import threading
+import logging
+
+logger = logging.getLogger(__name__)
+
+_CABECALHO = struct.Struct('<q')  # offset (int64)
+
+class RegistroUpdates:
+    """
+    Controla quais updates do Telegram já foram processados.
+
+    Os update_ids são sequenciais, então o estado cabe em:
+    - offset: o menor update_id ainda não concluído (tudo abaixo já foi feito)
+    - um bitmap circular com os updates concluídos acima do offset
+
+    Com caminho informado, o estado fica em um arquivo de tamanho fixo
+    (8 bytes + capacidade/8) e cada conclusão grava só o byte alterado. Ao
+    reiniciar, o polling continua do offset salvo, sem descartar mensagens
+    pendentes e sem repetir as que já foram processadas.
+    """
+
+    def __init__(self, capacidade=65536, caminho=None, margem_inicial=0):
+        """
+        Args:
+            capacidade (int): Tamanho da janela de update_ids acompanhados (múltiplo de 8)
+            caminho (str): Arquivo para persistir o estado (None mantém só em memória)
+            margem_inicial (int): Sem estado salvo, o offset começa essa quantidade
+                abaixo do primeiro update recebido. No long-poll o primeiro update
+                é o mais antigo pendente (0 basta); no webhook updates mais antigos
+                podem chegar depois e não devem ser descartados
+        """
+        self.capacidade = capacidade
+        self.caminho = caminho
+        self.margem_inicial = min(margem_inicial, capacidade // 2)
+        self._offset = None
+        self._bits = bytearray(capacidade // 8)
+        self._em_andamento = set()
+        self._arquivo = None
+        self._cond = threading.Condition()
+
+        if caminho:
+            self._carregar()
+
+    @property
+    def offset(self):
+        """Próximo update_id a pedir no getUpdates (None se ainda desconhecido)"""
+        with self._cond:
+            return self._offset
+
+    def registrar(self, update_id):
+        """
+        Marca o update como em processamento
+
+        Returns:
+            bool: True se o update ainda não foi processado nem está em andamento
+        """
+        with self._cond:
+            if self._offset is None:
+                self._offset = max(0, update_id - self.margem_inicial)
+                self._gravar_cabecalho()
+                self._sincronizar()
+            if (update_id < self._offset or update_id in self._em_andamento
+                    or self._concluido(update_id)):
+                return False
+            if update_id >= self._offset + self.capacidade:
+                # Fora da janela: avança descartando o acompanhamento mais antigo
+                logger.warning(f"Update {update_id} fora da janela de deduplicação")
+                self._avancar_para(update_id - self.capacidade + 1)
+                self._sincronizar()
+            self._em_andamento.add(update_id)
+            return True
+
+    def concluir(self, update_id):
+        """Marca o update como processado"""
+        with self._cond:
+            self._em_andamento.discard(update_id)
+            if self._offset is None or update_id < self._offset:
+                return
+            if update_id == self._offset:
+                self._offset += 1
+                self._avancar()
+                self._gravar_cabecalho()
+            else:
+                self._marcar(update_id, True)
+            self._sincronizar()
+            self._cond.notify_all()
+
+    def remover(self, update_id):
+        """Desiste de um update em andamento (ex: não pôde ser enfileirado)"""
+        with self._cond:
+            self._em_andamento.discard(update_id)
+            self._cond.notify_all()
+
+    def pular_ate(self, update_id):
+        """
+        Informa que não existem updates pendentes abaixo de update_id
+        (o getUpdates devolveu este como o primeiro disponível)
+        """
+        with self._cond:
+            if self._offset is None or update_id <= self._offset:
+                return
+            # Não pula updates que ainda estão sendo processados
+            limite = min([update_id] + [u for u in self._em_andamento if u >= self._offset])
+            self._avancar_para(limite)
+            self._sincronizar()
+            self._cond.notify_all()
+
+    def aguardar_progresso(self, timeout):
+        """Espera até algum update ser concluído (ou o timeout)"""
+        with self._cond:
+            self._cond.wait(timeout)
+
+    def __contains__(self, update_id):
+        with self._cond:
+            return (update_id in self._em_andamento or
+                    (self._offset is not None and
+                     (update_id < self._offset or self._concluido(update_id))))
+
+    def _concluido(self, update_id):
+        if update_id >= self._offset + self.capacidade:
+            return False
+        posicao = update_id % self.capacidade
+        return bool(self._bits[posicao >> 3] & (1 << (posicao & 7)))
+
+    def _marcar(self, update_id, valor):
+        posicao = update_id % self.capacidade
+        byte = posicao >> 3
+        if valor:
+            self._bits[byte] |= 1 << (posicao & 7)
+        else:
+            self._bits[byte] &= ~(1 << (posicao & 7))
+        self._gravar(_CABECALHO.size + byte, self._bits[byte:byte + 1])
+
+    def _avancar(self):
+        """Move o offset sobre os updates já concluídos em sequência"""
+        while self._concluido(self._offset):
+            self._marcar(self._offset, False)  # libera a posição para reuso
+            self._offset += 1
+
+    def _avancar_para(self, update_id):
+        """Move o offset até update_id, tratando os anteriores como concluídos"""
+        if update_id - self._offset >= self.capacidade:
+            # Salto maior que a janela: nenhum bit atual continua válido
+            self._bits[:] = bytes(len(self._bits))
+            self._gravar(_CABECALHO.size, self._bits)
+            self._offset = update_id
+        while self._offset < update_id:
+            if self._concluido(self._offset):
+                self._marcar(self._offset, False)
+            self._offset += 1
+        self._avancar()
+        self._gravar_cabecalho()
+
+    def _gravar_cabecalho(self):
+        self._gravar(0, _CABECALHO.pack(self._offset))
+
+    def _gravar(self, posicao, dados):
+        if self._arquivo:
+            self._arquivo.seek(posicao)
+            self._arquivo.write(dados)
+
+    def _sincronizar(self):
+        """Força as gravações pendentes para o disco"""
+        if self._arquivo:
+            self._arquivo.flush()
+            os.fsync(self._arquivo.fileno())
+
+    def _carregar(self):
+        """Abre (ou cria) o arquivo de estado"""
+        tamanho = _CABECALHO.size + len(self._bits)
+        existe = os.path.exists(self.caminho) and os.path.getsize(self.caminho) == tamanho
+
+        self._arquivo = open(self.caminho, 'r+b' if existe else 'w+b')
+        if existe:
+            conteudo = self._arquivo.read()
+            offset, = _CABECALHO.unpack_from(conteudo)
+            self._offset = offset if offset >= 0 else None
+            self._bits[:] = conteudo[_CABECALHO.size:]
+            logger.info(f"Continuando a partir do update {self._offset}")
+        else:
+            self._arquivo.write(_CABECALHO.pack(-1) + bytes(self._bits))
+            self._arquivo.flush()
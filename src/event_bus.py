@@ -0,0 +1,179 @@
+"""
+Barramento de eventos para atualização ao vivo dos dashboards (Server-Sent Events)
+"""
+import json
+import threading
+import time
+import logging
+from collections import deque
+from flask import Response, request, stream_with_context
+
+logger = logging.getLogger(__name__)
+
+class Evento:
+    """Evento publicado: id crescente, canal (usuário ou None), tipo e dados em JSON"""
+
+    __slots__ = ('id', 'canal', 'tipo', 'dados')
+
+    def __init__(self, id, canal, tipo, dados):
+        self.id = id
+        self.canal = canal
+        self.tipo = tipo
+        self.dados = dados
+
+    def formatar(self):
+        """Evento no formato text/event-stream"""
+        return f"id: {self.id}\nevent: {self.tipo}\ndata: {self.dados}\n\n"
+
+class BarramentoEventos:
+    """
+    Distribui as mudanças dos gastos para os navegadores conectados.
+
+    Os eventos ficam em um buffer circular com id crescente; um cliente que
+    reconecta com Last-Event-ID recebe o que perdeu, ou um evento
+    "recarregar" se o buffer já descartou esses eventos. Conexões ociosas
+    recebem um comentário a cada manter_vivo segundos.
+
+    Com vigiar, uma thread verifica a planilha enquanto houver clientes
+    conectados: uma verificação por intervalo para todos os navegadores,
+    em vez de cada aba baixar e recalcular tudo periodicamente.
+    """
+
+    def __init__(self, tamanho=1000, manter_vivo=15):
+        """
+        Args:
+            tamanho (int): Eventos guardados para reenvio após reconexão
+            manter_vivo (int): Segundos entre comentários em conexões ociosas
+        """
+        self.manter_vivo = manter_vivo
+        self._eventos = deque(maxlen=tamanho)
+        self._ultimo_id = 0
+        self._assinantes = {}  # canal -> quantidade de conexões
+        self._condicao = threading.Condition()
+        self._vigia = None
+
+    def publicar(self, tipo, dados, canal=None):
+        """
+        Envia um evento aos clientes conectados
+
+        Args:
+            tipo (str): Nome do evento (campo "event" do SSE)
+            dados: Dados serializáveis em JSON, ou bytes/str já serializados
+            canal: Usuário de destino (None envia a todos os clientes sem canal)
+        """
+        if isinstance(dados, bytes):
+            dados = dados.decode('utf-8')
+        elif not isinstance(dados, str):
+            dados = json.dumps(dados, ensure_ascii=False, separators=(',', ':'))
+
+        with self._condicao:
+            self._ultimo_id += 1
+            self._eventos.append(Evento(self._ultimo_id, canal, tipo, dados))
+            self._condicao.notify_all()
+
+    def ao_mudar(self, canal=None):
+        """
+        Ouvinte para o SincronizadorIncremental: publica os gastos adicionados
+        e removidos como evento "gastos"
+        """
+        def ouvinte(removidos, adicionados):
+            self.publicar('gastos', {
+                'adicionados': [gasto.como_registro() for gasto in adicionados],
+                'removidos': [gasto.como_registro() for gasto in removidos]
+            }, canal)
+        return ouvinte
+
+    def assinantes(self, canal=None):
+        """Quantidade de conexões abertas no canal"""
+        with self._condicao:
+            return self._assinantes.get(canal, 0)
+
+    def vigiar(self, verificar, intervalo=10):
+        """
+        Chama verificar a cada intervalo segundos enquanto houver clientes
+        conectados (idempotente)
+
+        Args:
+            verificar (callable): Função sem argumentos (ex: sincronizador.sincronizar);
+                mudanças chegam aos clientes pelos ouvintes
+            intervalo (int): Segundos entre verificações
+        """
+        def executar():
+            while True:
+                time.sleep(intervalo)
+                with self._condicao:
+                    conectados = any(self._assinantes.values())
+                if not conectados:
+                    continue
+                try:
+                    verificar()
+                except Exception as e:
+                    logger.error(f"Erro ao verificar mudanças: {e}")
+
+        with self._condicao:
+            if self._vigia is None:
+                self._vigia = threading.Thread(target=executar, daemon=True, name="vigia-eventos")
+                self._vigia.start()
+
+    def responder(self, canal=None):
+        """
+        Resposta Flask text/event-stream do canal
+
+        Args:
+            canal: Usuário (None para os dashboards de planilha única)
+
+        Returns:
+            flask.Response: Stream SSE
+        """
+        ultimo_id = request.headers.get('Last-Event-ID')
+        ultimo_id = int(ultimo_id) if ultimo_id and ultimo_id.isdigit() else None
+        resposta = Response(stream_with_context(self.assinar(canal, ultimo_id)),
+                            mimetype='text/event-stream')
+        resposta.headers['Cache-Control'] = 'no-cache'
+        # Desliga o buffer de proxies (nginx), senão os eventos chegam atrasados
+        resposta.headers['X-Accel-Buffering'] = 'no'
+        return resposta
+
+    def assinar(self, canal=None, ultimo_id=None):
+        """
+        Gerador dos eventos do canal no formato text/event-stream
+
+        Args:
+            canal: Usuário (None para eventos sem canal)
+            ultimo_id (int): Último evento recebido pelo cliente (reconexão)
+
+        Yields:
+            str: Eventos e comentários de manutenção da conexão
+        """
+        with self._condicao:
+            self._assinantes[canal] = self._assinantes.get(canal, 0) + 1
+            if ultimo_id is None or ultimo_id > self._ultimo_id:
+                ultimo_id = self._ultimo_id
+                perdeu = False
+            else:
+                perdeu = bool(self._eventos) and self._eventos[0].id > ultimo_id + 1
+                if perdeu:
+                    ultimo_id = self._ultimo_id
+
+        try:
+            yield "retry: 3000\n\n"
+            if perdeu:
+                yield Evento(ultimo_id, canal, 'recarregar', '{}').formatar()
+
+            while True:
+                with self._condicao:
+                    if self._ultimo_id == ultimo_id:
+                        self._condicao.wait(self.manter_vivo)
+                    eventos = [e for e in self._eventos if e.id > ultimo_id and e.canal == canal]
+                    ultimo_id = self._ultimo_id
+
+                if eventos:
+                    for evento in eventos:
+                        yield evento.formatar()
+                else:
+                    yield ": manter-vivo\n\n"
+        finally:
+            with self._condicao:
+                self._assinantes[canal] -= 1
+                if not self._assinantes[canal]:
+                    del self._assinantes[canal]
@@ -0,0 +1,67 @@
+"""
+Motor único de interpretação de gastos, compartilhado por todos os bots
+
+O tokenizador (src.utils) e o autômato de categorias (src.categories) são
+construídos uma vez na importação; cada bot só importa daqui.
+"""
+from .utils import analisar_mensagem
+from .categories import categorizar_gasto
+
+class GastoInterpretado:
+    """Resultado de interpretar_mensagem"""
+
+    __slots__ = ('valor', 'descricao', 'categoria', 'comando')
+
+    def __init__(self, valor, descricao, categoria, comando):
+        self.valor = valor
+        self.descricao = descricao
+        self.categoria = categoria
+        self.comando = comando
+
+    def __repr__(self):
+        return (f"GastoInterpretado(valor={self.valor!r}, descricao={self.descricao!r}, "
+                f"categoria={self.categoria!r}, comando={self.comando!r})")
+
+def interpretar_mensagem(texto, usuario=None, memoria=None):
+    """
+    Valor, descrição, categoria e comando de uma mensagem
+
+    A categoria só é calculada quando há valor (a mensagem é um gasto).
+
+    Args:
+        texto (str): Texto da mensagem
+        usuario: ID do usuário, para usar as categorias aprendidas (opcional)
+        memoria (MemoriaCategorias): Memória de categorias por usuário (opcional)
+
+    Returns:
+        GastoInterpretado: Campos None quando não identificados
+    """
+    analise = analisar_mensagem(texto)
+    categoria = None
+    if analise.valor:
+        categoria = categorizar(analise.descricao, usuario, memoria)
+    return GastoInterpretado(analise.valor, analise.descricao, categoria, analise.comando)
+
+def extrair_valor(texto):
+    """Valor do gasto (float) ou None"""
+    return analisar_mensagem(texto).valor
+
+def limpar_descricao(texto):
+    """Texto do gasto sem valor e símbolos monetários"""
+    return analisar_mensagem(texto).descricao
+
+def categorizar(descricao, usuario=None, memoria=None):
+    """
+    Categoria de uma descrição
+
+    Args:
+        descricao (str): Descrição do gasto
+        usuario: ID do usuário (opcional)
+        memoria (MemoriaCategorias): Usada quando informada junto com o usuário
+
+    Returns:
+        str: Categoria
+    """
+    if memoria is not None and usuario is not None:
+        return memoria.categorizar(usuario, descricao)
+    return categorizar_gasto(descricao)
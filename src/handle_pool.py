@@ -0,0 +1,100 @@
+"""
+Pool limitado de handles de planilha por usuário (LRU + TTL + carga única)
+"""
+import threading
+import time
+import logging
+from collections import OrderedDict
+from concurrent.futures import Future
+
+logger = logging.getLogger(__name__)
+
+class PoolPlanilhas:
+    """
+    Guarda o handle da planilha (ou aba) de cada usuário.
+
+    - No máximo capacidade usuários: o menos usado recentemente é descartado,
+      então a memória não cresce com o número de usuários.
+    - Depois de ttl segundos o handle é recarregado no próximo acesso
+      (a carga recebe o handle anterior para reaproveitar o que for válido).
+    - Carga única por usuário: acessos simultâneos ao mesmo usuário esperam
+      a mesma carga, em vez de abrir ou criar a planilha em dobro.
+    """
+
+    def __init__(self, carregar, capacidade=500, ttl=3600):
+        """
+        Args:
+            carregar (callable): Função (chave, anterior, *args) que retorna o handle
+                ou None em caso de erro; anterior é o handle expirado (ou None)
+            capacidade (int): Quantidade máxima de handles mantidos
+            ttl (int): Segundos até um handle ser recarregado
+        """
+        self.carregar = carregar
+        self.capacidade = capacidade
+        self.ttl = ttl
+        self._entradas = OrderedDict()  # chave -> (handle, expira_em)
+        self._carregando = {}           # chave -> Future da carga em andamento
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entradas)
+
+    def __contains__(self, chave):
+        with self._lock:
+            return chave in self._entradas
+
+    def obter(self, chave, *args):
+        """
+        Handle do usuário, carregando se necessário
+
+        Args:
+            chave: Identificador do usuário (chat_id)
+            *args: Repassados para carregar
+
+        Returns:
+            Handle carregado, ou None se a carga falhou
+        """
+        with self._lock:
+            entrada = self._entradas.get(chave)
+            if entrada and entrada[1] > time.monotonic():
+                self._entradas.move_to_end(chave)
+                return entrada[0]
+
+            future = self._carregando.get(chave)
+            if future is None:
+                future = self._carregando[chave] = Future()
+                responsavel = True
+            else:
+                responsavel = False
+            anterior = entrada[0] if entrada else None
+
+        if not responsavel:
+            return future.result()
+
+        handle = None
+        try:
+            handle = self.carregar(chave, anterior, *args)
+        except Exception as e:
+            logger.error(f"Erro ao carregar planilha de {chave}: {e}")
+
+        if handle is None and anterior is not None:
+            # Falha ao recarregar: continua com o handle anterior até o próximo ttl
+            logger.warning(f"Mantendo planilha anterior de {chave}")
+            handle = anterior
+
+        with self._lock:
+            del self._carregando[chave]
+            if handle is not None:
+                self._entradas[chave] = (handle, time.monotonic() + self.ttl)
+                self._entradas.move_to_end(chave)
+                while len(self._entradas) > self.capacidade:
+                    self._entradas.popitem(last=False)
+
+        future.set_result(handle)
+        return handle
+
+    def descartar(self, chave):
+        """Remove o handle de um usuário (ex: planilha apagada)"""
+        with self._lock:
+            self._entradas.pop(chave, None)
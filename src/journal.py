@@ -0,0 +1,179 @@
+"""
+Journal local (write-ahead log) de gastos ainda não gravados no Google Sheets
+"""
+import json
+import os
+import threading
+import time
+import logging
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+class JournalGastos:
+    """
+    Arquivo append-only com um gasto por linha, gravado com fsync antes da
+    resposta ao usuário. Cada gasto tem uma chave de idempotência (derivada do
+    update_id do Telegram) e é marcado como confirmado quando chega à planilha.
+    Gastos não confirmados são reenviados na inicialização e periodicamente.
+
+    A chave é gravada na planilha junto com a linha. Um reenvio pode ser de
+    um gasto que chegou à planilha sem que o 'ok' fosse registrado (queda
+    logo após o append), então todo reenvio pede a verificação da chave na
+    planilha antes de gravar.
+    """
+
+    def __init__(self, caminho, enviar, max_confirmados=10000):
+        """
+        Args:
+            caminho (str): Arquivo do journal
+            enviar (callable): Função (chave, linha, reenvio) que grava na planilha
+                e retorna um Future; com reenvio=True deve conferir antes se a
+                chave já está na planilha (ex: FilaEscrita.enfileirar com verificar)
+            max_confirmados (int): Chaves confirmadas mantidas para deduplicação
+        """
+        self.caminho = caminho
+        self._enviar = enviar
+        self.max_confirmados = max_confirmados
+
+        self._pendentes = OrderedDict()    # chave -> linha
+        self._confirmados = OrderedDict()  # chave -> None (ordem de confirmação)
+        self._em_andamento = set()
+        self._linhas_arquivo = 0
+        self._lock = threading.Lock()
+
+        self._carregar()
+        self._arquivo = open(self.caminho, 'a', encoding='utf-8')
+
+    def gravar(self, chave, linha):
+        """
+        Registra o gasto no journal (com fsync) e envia para a planilha
+
+        Args:
+            chave (str): Chave de idempotência (ex: update_id)
+            linha (list): Valores da linha
+
+        Returns:
+            Future: Gravação na planilha, ou None se a chave já foi registrada
+        """
+        chave = str(chave)
+        with self._lock:
+            if chave in self._pendentes or chave in self._confirmados:
+                logger.info(f"Gasto {chave} já registrado, ignorando duplicata")
+                return None
+            self._escrever({'op': 'add', 'id': chave, 'linha': linha, 'ts': time.time()})
+            self._pendentes[chave] = linha
+
+        return self._submeter(chave, linha, reenvio=False)
+
+    def pendentes(self):
+        """Quantidade de gastos ainda não confirmados na planilha"""
+        with self._lock:
+            return len(self._pendentes)
+
+    def reenviar_pendentes(self):
+        """Reenvia os gastos pendentes que não estão em andamento"""
+        with self._lock:
+            itens = [(c, l) for c, l in self._pendentes.items() if c not in self._em_andamento]
+
+        if itens:
+            logger.info(f"Reenviando {len(itens)} gastos pendentes do journal")
+        for chave, linha in itens:
+            self._submeter(chave, linha, reenvio=True)
+
+    def iniciar_reenvio(self, intervalo=60):
+        """Reenvia os pendentes agora e depois a cada intervalo (segundos)"""
+        def loop():
+            while True:
+                try:
+                    self.reenviar_pendentes()
+                except Exception as e:
+                    logger.error(f"Erro ao reenviar journal: {e}")
+                time.sleep(intervalo)
+
+        threading.Thread(target=loop, daemon=True).start()
+
+    def _submeter(self, chave, linha, reenvio):
+        with self._lock:
+            if chave in self._em_andamento:
+                return None
+            self._em_andamento.add(chave)
+
+        try:
+            future = self._enviar(chave, linha, reenvio)
+        except Exception:
+            with self._lock:
+                self._em_andamento.discard(chave)
+            raise
+
+        future.add_done_callback(lambda f: self._ao_concluir(chave, f))
+        return future
+
+    def _ao_concluir(self, chave, future):
+        with self._lock:
+            self._em_andamento.discard(chave)
+            if future.exception():
+                # Continua pendente; o próximo reenvio tenta de novo
+                return
+            self._escrever({'op': 'ok', 'id': chave})
+            self._pendentes.pop(chave, None)
+            self._marcar_confirmado(chave)
+            self._compactar_se_necessario()
+
+    def _marcar_confirmado(self, chave):
+        self._confirmados[chave] = None
+        while len(self._confirmados) > self.max_confirmados:
+            self._confirmados.popitem(last=False)
+
+    def _escrever(self, entrada):
+        """Acrescenta uma entrada ao arquivo e força a escrita em disco"""
+        self._arquivo.write(json.dumps(entrada, ensure_ascii=False) + '\n')
+        self._arquivo.flush()
+        os.fsync(self._arquivo.fileno())
+        self._linhas_arquivo += 1
+
+    def _carregar(self):
+        """Reconstrói o estado a partir do arquivo existente"""
+        if not os.path.exists(self.caminho):
+            return
+
+        with open(self.caminho, 'r', encoding='utf-8') as f:
+            for texto in f:
+                try:
+                    entrada = json.loads(texto)
+                except ValueError:
+                    # Última linha incompleta (queda durante a escrita)
+                    continue
+
+                self._linhas_arquivo += 1
+                if entrada['op'] == 'add':
+                    if entrada['id'] not in self._confirmados:
+                        self._pendentes[entrada['id']] = entrada['linha']
+                elif entrada['op'] == 'ok':
+                    self._pendentes.pop(entrada['id'], None)
+                    self._marcar_confirmado(entrada['id'])
+
+        if self._pendentes:
+            logger.info(f"Journal com {len(self._pendentes)} gastos pendentes")
+
+    def _compactar_se_necessario(self):
+        """Reescreve o arquivo só com o necessário quando ele cresce demais"""
+        necessarias = len(self._pendentes) + len(self._confirmados)
+        if self._linhas_arquivo < 2 * necessarias + 1000:
+            return
+
+        temporario = f"{self.caminho}.tmp"
+        with open(temporario, 'w', encoding='utf-8') as f:
+            for chave in self._confirmados:
+                f.write(json.dumps({'op': 'ok', 'id': chave}) + '\n')
+            for chave, linha in self._pendentes.items():
+                f.write(json.dumps({'op': 'add', 'id': chave, 'linha': linha},
+                                   ensure_ascii=False) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+
+        self._arquivo.close()
+        os.replace(temporario, self.caminho)
+        self._arquivo = open(self.caminho, 'a', encoding='utf-8')
+        self._linhas_arquivo = necessarias
+        logger.info(f"Journal compactado: {necessarias} entradas")
@@ -0,0 +1,147 @@
+"""
+Cache local dos gastos (write-through) na frente do Google Sheets
+"""
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+class LedgerCache:
+    """Cópia local dos gastos, ressincronizada com a planilha em segundo plano"""
+
+    def __init__(self, carregar, intervalo_sync=300, obter_versao=None, intervalo_versao=30):
+        """
+        Args:
+            carregar (callable): Função que retorna os registros atuais da planilha
+            intervalo_sync (int): Segundos até forçar uma ressincronização completa
+            obter_versao (callable): Função opcional que retorna a versão atual da planilha
+            intervalo_versao (int): Segundos entre verificações de versão
+        """
+        self._carregar = carregar
+        self._obter_versao = obter_versao
+        self.intervalo_sync = intervalo_sync
+        self.intervalo_versao = intervalo_versao
+
+        self._registros = []
+        self._lock = threading.Lock()
+        self._sync_lock = threading.RLock()
+        self._sincronizando = False
+        self._ultima_sync = 0
+        self._ultima_verificacao = 0
+        self._versao_remota = None
+
+        # Incrementa a cada alteração local ou ressincronização
+        self.versao = 0
+
+    def __len__(self):
+        with self._lock:
+            return len(self._registros)
+
+    def obter(self):
+        """
+        Retorna os registros em cache sem esperar pelo Google Sheets
+
+        Returns:
+            list: Cópia da lista de registros
+        """
+        self._agendar_sync_se_necessario()
+        with self._lock:
+            return list(self._registros)
+
+    def verificar(self):
+        """Agenda uma ressincronização em background se o cache expirou (não bloqueia)"""
+        self._agendar_sync_se_necessario()
+
+    def sincronizar(self):
+        """
+        Atualiza os registros a partir da planilha (bloqueante)
+
+        Returns:
+            bool: True se sincronizado com sucesso
+        """
+        with self._sync_lock:
+            self._sincronizando = True
+            try:
+                versao_remota = self._ler_versao_remota()
+                registros = self._carregar()
+            except Exception as e:
+                logger.error(f"Erro ao sincronizar cache de gastos: {e}")
+                return False
+            finally:
+                self._sincronizando = False
+
+            with self._lock:
+                self._registros = list(registros)
+                self._ultima_sync = self._ultima_verificacao = time.monotonic()
+                self._versao_remota = versao_remota
+                self.versao += 1
+
+            logger.info(f"Cache de gastos sincronizado: {len(registros)} registros")
+            return True
+
+    def escrita(self):
+        """
+        Trava usada durante uma escrita write-through, para que nenhuma
+        ressincronização aconteça entre a gravação na planilha e no cache
+
+        Returns:
+            threading.RLock: Trava a ser usada com "with"
+        """
+        return self._sync_lock
+
+    def adicionar(self, registro):
+        """Registra localmente um gasto já gravado na planilha"""
+        with self._lock:
+            self._registros.append(registro)
+            self.versao += 1
+
+    def remover_ultimo(self):
+        """Remove localmente o último gasto já removido da planilha"""
+        with self._lock:
+            if self._registros:
+                self._registros.pop()
+                self.versao += 1
+
+    def invalidar(self):
+        """Força uma ressincronização na próxima leitura"""
+        with self._lock:
+            self._ultima_sync = self._ultima_verificacao = 0
+
+    def _ler_versao_remota(self):
+        """Consulta a versão da planilha, se houver função para isso"""
+        if not self._obter_versao:
+            return None
+        return self._obter_versao()
+
+    def _agendar_sync_se_necessario(self):
+        """Dispara verificação/ressincronização em background quando expirado"""
+        agora = time.monotonic()
+        with self._lock:
+            expirado = agora - self._ultima_sync >= self.intervalo_sync
+            verificar = (self._obter_versao is not None and
+                         agora - self._ultima_verificacao >= self.intervalo_versao)
+            if not (expirado or verificar):
+                return
+            # Evita disparar várias threads enquanto uma está em andamento
+            self._ultima_verificacao = agora
+
+        if self._sincronizando:
+            return
+
+        threading.Thread(target=self._sync_background, args=(expirado,), daemon=True).start()
+
+    def _sync_background(self, forcar):
+        """Ressincroniza se o intervalo expirou ou a versão remota mudou"""
+        if not forcar:
+            try:
+                versao_remota = self._ler_versao_remota()
+            except Exception as e:
+                logger.error(f"Erro ao verificar versão da planilha: {e}")
+                return
+
+            with self._lock:
+                if versao_remota == self._versao_remota:
+                    return
+
+        self.sincronizar()
@@ -0,0 +1,112 @@
+"""
+Representação tipada dos gastos lidos da planilha
+"""
+import sys
+from datetime import date
+
+CABECALHO = ["Data", "Descrição", "Valor", "Categoria"]
+
+def converter_valor_centavos(valor):
+    """
+    Converte um valor da planilha em centavos
+
+    Aceita "50", "50.5", "50,50", "1.234,56", "R$ 10,00" e números.
+
+    Args:
+        valor: Valor como texto ou número
+
+    Returns:
+        int: Valor em centavos (0 se inválido)
+    """
+    if isinstance(valor, (int, float)):
+        return round(valor * 100)
+
+    texto = str(valor).replace('R$', '').strip()
+    if ',' in texto:
+        # Formato brasileiro: ponto é separador de milhar
+        texto = texto.replace('.', '').replace(',', '.')
+    try:
+        return round(float(texto) * 100)
+    except ValueError:
+        return 0
+
+def converter_data_ordinal(texto):
+    """
+    Converte 'DD/MM/YYYY' no ordinal do dia (date.toordinal)
+
+    Returns:
+        int: Ordinal do dia, ou 0 se a data for inválida
+    """
+    partes = str(texto).split('/')
+    if len(partes) != 3:
+        return 0
+    try:
+        return date(int(partes[2]), int(partes[1]), int(partes[0])).toordinal()
+    except ValueError:
+        return 0
+
+def chave_mes(ano, mes):
+    """Chave inteira de um mês (ano * 12 + mês - 1), crescente no tempo"""
+    return ano * 12 + mes - 1
+
+class Gasto:
+    """Gasto já convertido: dia como ordinal, valor em centavos e categoria internada"""
+
+    __slots__ = ('dia', 'mes', 'centavos', 'categoria', 'descricao')
+
+    def __init__(self, dia, centavos, categoria, descricao):
+        self.dia = dia
+        self.centavos = centavos
+        self.categoria = sys.intern(categoria or 'outros')
+        self.descricao = descricao
+        if dia:
+            d = date.fromordinal(dia)
+            self.mes = chave_mes(d.year, d.month)
+        else:
+            self.mes = 0
+
+    @classmethod
+    def de_registro(cls, registro):
+        """Cria um Gasto a partir de um dicionário no formato de get_all_records"""
+        return cls(
+            converter_data_ordinal(registro.get('Data', '')),
+            converter_valor_centavos(registro.get('Valor', '0')),
+            str(registro.get('Categoria', '')),
+            str(registro.get('Descrição', ''))
+        )
+
+    @classmethod
+    def de_linha(cls, linha):
+        """Cria um Gasto a partir de uma linha [Data, Descrição, Valor, Categoria]"""
+        return cls.de_registro(dict(zip(CABECALHO, linha)))
+
+    @property
+    def valor(self):
+        """Valor em reais"""
+        return self.centavos / 100
+
+    @property
+    def data(self):
+        """Data como datetime.date (None se inválida)"""
+        return date.fromordinal(self.dia) if self.dia else None
+
+    @property
+    def data_str(self):
+        """Data no formato DD/MM/YYYY"""
+        return self.data.strftime("%d/%m/%Y") if self.dia else ''
+
+    def como_registro(self):
+        """Dicionário no formato original da planilha"""
+        return {
+            'Data': self.data_str,
+            'Descrição': self.descricao,
+            'Valor': f"{self.valor:.2f}",
+            'Categoria': self.categoria
+        }
+
+    def get(self, campo, padrao=None):
+        """Acesso no estilo dos registros da planilha (usado pelos templates)"""
+        return self.como_registro().get(campo, padrao)
+
+    def __repr__(self):
+        return f"Gasto({self.data_str}, {self.descricao!r}, {self.valor:.2f}, {self.categoria!r})"
@@ -0,0 +1,245 @@
+"""
+Agendador de mensagens de saída respeitando os limites da API do Telegram
+"""
+import heapq
+import itertools
+import threading
+import time
+import logging
+from concurrent.futures import Future, ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+# Filas de prioridade: número menor sai primeiro
+PRIORIDADE_CONFIRMACAO = 0
+PRIORIDADE_NORMAL = 1
+PRIORIDADE_RELATORIO = 2
+
+class BaldeTokens:
+    """Token bucket: taxa tokens por segundo, acumulando até capacidade"""
+
+    __slots__ = ('taxa', 'capacidade', 'tokens', 'atualizado')
+
+    def __init__(self, taxa, capacidade):
+        self.taxa = taxa
+        self.capacidade = capacidade
+        self.tokens = capacidade
+        self.atualizado = time.monotonic()
+
+    def _reabastecer(self, agora):
+        self.tokens = min(self.capacidade, self.tokens + (agora - self.atualizado) * self.taxa)
+        self.atualizado = agora
+
+    def disponivel_em(self, agora):
+        """Instante (monotonic) em que haverá um token disponível"""
+        self._reabastecer(agora)
+        if self.tokens >= 1:
+            return agora
+        return agora + (1 - self.tokens) / self.taxa
+
+    def consumir(self, agora):
+        self._reabastecer(agora)
+        self.tokens -= 1
+
+    def cheio(self, agora):
+        self._reabastecer(agora)
+        return self.tokens >= self.capacidade
+
+class _EstadoChat:
+    __slots__ = ('fila', 'balde', 'em_envio', 'bloqueado_ate', 'agendado')
+
+    def __init__(self, balde):
+        self.fila = []              # heap (prioridade, seq, dados, future, tentativas)
+        self.balde = balde
+        self.em_envio = False
+        self.bloqueado_ate = 0.0
+        self.agendado = False       # já está no heap de prontos ou de espera
+
+class AgendadorEnvio:
+    """
+    Envia mensagens respeitando um token bucket global (~30 msg/s) e um por
+    chat (~1 msg/s). Cada chat tem no máximo uma mensagem em envio, o que
+    mantém a ordem; entre mensagens pendentes do mesmo chat e entre chats,
+    a prioridade menor sai primeiro (confirmações antes de relatórios).
+    Respostas 429 reagendam a mensagem após o retry_after informado.
+    """
+
+    def __init__(self, post, taxa_global=30, taxa_chat=1, rajada_chat=3,
+                 workers=8, max_pendentes=10000, max_tentativas=5):
+        """
+        Args:
+            post (callable): Função (dados) que chama sendMessage e retorna a resposta
+                HTTP, ou um Future dela (envio assíncrono, sem ocupar um worker)
+            taxa_global (float): Mensagens por segundo no total
+            taxa_chat (float): Mensagens por segundo para um mesmo chat
+            rajada_chat (int): Mensagens seguidas permitidas para um chat ocioso
+            workers (int): Requisições simultâneas
+            max_pendentes (int): Mensagens na fila antes de agendar passar a bloquear
+            max_tentativas (int): Tentativas após respostas 429
+        """
+        self.post = post
+        self.taxa_chat = taxa_chat
+        self.rajada_chat = rajada_chat
+        self.max_pendentes = max_pendentes
+        self.max_tentativas = max_tentativas
+
+        self._global = BaldeTokens(taxa_global, taxa_global)
+        self._chats = {}
+        self._prontos = []     # heap (prioridade, seq, chat_id)
+        self._espera = []      # heap (instante, chat_id)
+        self._pendentes = 0
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="envio")
+
+        threading.Thread(target=self._despachar, name="agendador-envio", daemon=True).start()
+
+    def agendar(self, chat_id, dados, prioridade=PRIORIDADE_NORMAL):
+        """
+        Coloca uma mensagem na fila
+
+        Args:
+            chat_id: ID do chat
+            dados (dict): Corpo do sendMessage
+            prioridade (int): PRIORIDADE_CONFIRMACAO, PRIORIDADE_NORMAL ou PRIORIDADE_RELATORIO
+
+        Returns:
+            Future: Resolvido com a resposta HTTP final
+        """
+        future = Future()
+        with self._cond:
+            while self._pendentes >= self.max_pendentes:
+                self._cond.wait()
+
+            estado = self._chats.get(chat_id)
+            if estado is None:
+                estado = self._chats[chat_id] = _EstadoChat(
+                    BaldeTokens(self.taxa_chat, self.rajada_chat))
+            heapq.heappush(estado.fila, (prioridade, next(self._seq), dados, future, 0))
+            self._pendentes += 1
+            self._agendar_chat(chat_id, estado, time.monotonic())
+            self._cond.notify_all()
+        return future
+
+    def pendentes(self):
+        """Mensagens aguardando envio"""
+        with self._cond:
+            return self._pendentes
+
+    def _agendar_chat(self, chat_id, estado, agora):
+        """Põe o chat no heap de prontos ou de espera (chamado com a trava)"""
+        if estado.agendado or estado.em_envio or not estado.fila:
+            return
+        liberado = max(estado.bloqueado_ate, estado.balde.disponivel_em(agora))
+        if liberado <= agora:
+            prioridade, seq = estado.fila[0][:2]
+            heapq.heappush(self._prontos, (prioridade, seq, chat_id))
+        else:
+            heapq.heappush(self._espera, (liberado, chat_id))
+        estado.agendado = True
+
+    def _despachar(self):
+        ultima_limpeza = time.monotonic()
+        with self._cond:
+            while True:
+                agora = time.monotonic()
+
+                # Chats cujo token ou retry_after já liberou
+                while self._espera and self._espera[0][0] <= agora:
+                    _, chat_id = heapq.heappop(self._espera)
+                    estado = self._chats[chat_id]
+                    estado.agendado = False
+                    self._agendar_chat(chat_id, estado, agora)
+
+                proximo = self._espera[0][0] if self._espera else None
+                if self._prontos:
+                    liberado = self._global.disponivel_em(agora)
+                    if liberado <= agora:
+                        _, _, chat_id = heapq.heappop(self._prontos)
+                        self._iniciar_envio(chat_id, agora)
+                        continue
+                    proximo = min(proximo or liberado, liberado)
+
+                if agora - ultima_limpeza > 60:
+                    self._limpar_ociosos(agora)
+                    ultima_limpeza = agora
+
+                self._cond.wait(None if proximo is None else max(0, proximo - agora))
+
+    def _iniciar_envio(self, chat_id, agora):
+        estado = self._chats[chat_id]
+        estado.agendado = False
+        item = heapq.heappop(estado.fila)
+        estado.em_envio = True
+        estado.balde.consumir(agora)
+        self._global.consumir(agora)
+        self._executor.submit(self._enviar, chat_id, item)
+
+    def _enviar(self, chat_id, item):
+        try:
+            resposta = self.post(item[2])
+        except Exception as e:
+            self._falhar(chat_id, item, e)
+            return
+
+        if isinstance(resposta, Future):
+            # post assíncrono: o worker fica livre até a resposta chegar
+            resposta.add_done_callback(lambda f: self._ao_responder(chat_id, item, f))
+        else:
+            self._tratar_resposta(chat_id, item, resposta)
+
+    def _ao_responder(self, chat_id, item, future_post):
+        """Conclusão de um post assíncrono"""
+        if future_post.cancelled():
+            self._falhar(chat_id, item, RuntimeError("Envio cancelado"))
+        elif future_post.exception() is not None:
+            self._falhar(chat_id, item, future_post.exception())
+        else:
+            self._tratar_resposta(chat_id, item, future_post.result())
+
+    def _falhar(self, chat_id, item, erro):
+        self._concluir(chat_id)
+        item[3].set_exception(erro)
+
+    def _tratar_resposta(self, chat_id, item, resposta):
+        """Conclui o envio ou o reagenda após um 429"""
+        prioridade, seq, dados, future, tentativas = item
+        retry_after = _retry_after(resposta)
+        if retry_after is not None and tentativas < self.max_tentativas:
+            logger.warning(f"Limite do Telegram para {chat_id}: aguardando {retry_after}s")
+            with self._cond:
+                estado = self._chats[chat_id]
+                heapq.heappush(estado.fila, (prioridade, seq, dados, future, tentativas + 1))
+                estado.bloqueado_ate = time.monotonic() + retry_after
+                estado.em_envio = False
+                self._agendar_chat(chat_id, estado, time.monotonic())
+                self._cond.notify_all()
+            return
+
+        self._concluir(chat_id)
+        future.set_result(resposta)
+
+    def _concluir(self, chat_id):
+        with self._cond:
+            estado = self._chats[chat_id]
+            estado.em_envio = False
+            self._pendentes -= 1
+            self._agendar_chat(chat_id, estado, time.monotonic())
+            self._cond.notify_all()
+
+    def _limpar_ociosos(self, agora):
+        """Descarta o estado de chats sem mensagens e com o bucket cheio"""
+        ociosos = [chat_id for chat_id, estado in self._chats.items()
+                   if not estado.fila and not estado.em_envio and not estado.agendado
+                   and estado.bloqueado_ate <= agora and estado.balde.cheio(agora)]
+        for chat_id in ociosos:
+            del self._chats[chat_id]
+
+def _retry_after(resposta):
+    """Segundos de espera pedidos por uma resposta 429 (None se não for 429)"""
+    if getattr(resposta, 'status_code', None) != 429:
+        return None
+    try:
+        return resposta.json().get('parameters', {}).get('retry_after', 1)
+    except ValueError:
+        return 1
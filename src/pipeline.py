@@ -0,0 +1,210 @@
+"""
+Pipeline de updates do Telegram: leitor long-poll, fila limitada e pool de workers
+"""
+import queue
+import threading
+import time
+import logging
+from .outbound import AgendadorEnvio, PRIORIDADE_NORMAL
+
+logger = logging.getLogger(__name__)
+
+class FilaParticionada:
+    """
+    Pool fixo de threads, cada uma com sua própria fila limitada. Tarefas com a
+    mesma chave (ex: chat_id) vão sempre para o mesmo worker, o que mantém a
+    ordem por chat. Quando a fila do worker enche, submeter bloqueia
+    (backpressure) em vez de criar mais threads.
+    """
+
+    def __init__(self, workers=4, tamanho_fila=1000, nome="worker"):
+        """
+        Args:
+            workers (int): Quantidade de threads
+            tamanho_fila (int): Capacidade total das filas (dividida entre os workers)
+            nome (str): Prefixo do nome das threads
+        """
+        capacidade = max(1, tamanho_fila // workers)
+        self._filas = [queue.Queue(maxsize=capacidade) for _ in range(workers)]
+        for i, fila in enumerate(self._filas):
+            threading.Thread(target=self._executar, args=(fila,),
+                             name=f"{nome}-{i}", daemon=True).start()
+
+    def submeter(self, chave, tarefa, *args):
+        """
+        Agenda tarefa(*args) no worker responsável pela chave
+
+        Bloqueia enquanto a fila desse worker estiver cheia.
+        """
+        self._filas[hash(chave) % len(self._filas)].put((tarefa, args))
+
+    def tentar_submeter(self, chave, tarefa, *args):
+        """
+        Como submeter, mas sem bloquear
+
+        Returns:
+            bool: False se a fila do worker estiver cheia
+        """
+        try:
+            self._filas[hash(chave) % len(self._filas)].put_nowait((tarefa, args))
+            return True
+        except queue.Full:
+            return False
+
+    def pendentes(self):
+        """Quantidade de tarefas aguardando nas filas"""
+        return sum(fila.qsize() for fila in self._filas)
+
+    def _executar(self, fila):
+        while True:
+            tarefa, args = fila.get()
+            try:
+                tarefa(*args)
+            except Exception as e:
+                logger.error(f"Erro ao executar tarefa: {e}")
+            finally:
+                fila.task_done()
+
+class PipelineUpdates:
+    """
+    Um único leitor faz long-poll no getUpdates e distribui os updates para um
+    pool fixo de workers, preservando a ordem das mensagens de cada chat.
+
+    Com um RegistroUpdates, cada update é processado uma única vez e o offset
+    confirmado ao Telegram nunca passa de um update ainda não concluído, então
+    nada se perde se o processo cair com updates na fila.
+    """
+
+    def __init__(self, processar, workers=4, tamanho_fila=1000, registro=None):
+        """
+        Args:
+            processar (callable): Função (update) chamada nos workers
+            workers (int): Quantidade de workers
+            tamanho_fila (int): Updates aguardando processamento antes de pausar a leitura
+            registro (RegistroUpdates): Deduplicação e offset persistidos (opcional)
+        """
+        self.processar = processar
+        self.registro = registro
+        self._workers = FilaParticionada(workers, tamanho_fila, nome="update")
+
+    def enviar(self, update, *args):
+        """
+        Enfileira um update (bloqueia se os workers estiverem sobrecarregados)
+
+        Argumentos extras são repassados para processar junto com o update.
+        """
+        self._workers.submeter(chave_chat(update), self._processar, update, *args)
+
+    def tentar_enviar(self, update, *args):
+        """
+        Enfileira um update sem bloquear (usado pelo webhook)
+
+        Returns:
+            bool: False se os workers estiverem sobrecarregados
+        """
+        return self._workers.tentar_submeter(chave_chat(update), self._processar, update, *args)
+
+    def _processar(self, update, *args):
+        try:
+            self.processar(update, *args)
+        finally:
+            if self.registro:
+                self.registro.concluir(update["update_id"])
+
+    def executar_long_poll(self, base_url, sessao, offset=None, timeout=25):
+        """
+        Lê updates continuamente e os enfileira
+
+        Args:
+            base_url (str): https://api.telegram.org/bot<TOKEN>
+            sessao (requests.Session): Sessão HTTP reutilizada
+            offset (int): Primeiro update_id a ler (com registro, usa o offset salvo)
+            timeout (int): Tempo de long-poll em segundos
+        """
+        while True:
+            try:
+                if self.registro and self.registro.offset is not None:
+                    offset = self.registro.offset
+
+                r = sessao.get(f"{base_url}/getUpdates",
+                               params={"timeout": timeout, "offset": offset},
+                               timeout=timeout + 10)
+                data = r.json()
+                updates = data.get("result", []) if data.get("ok") else []
+
+                if not self.registro:
+                    for update in updates:
+                        self.enviar(update)
+                        offset = update["update_id"] + 1
+                    continue
+
+                if updates:
+                    self.registro.pular_ate(updates[0]["update_id"])
+                novos = [u for u in updates if self.registro.registrar(u["update_id"])]
+                for update in novos:
+                    self.enviar(update)
+
+                if updates and not novos:
+                    # Só vieram updates ainda em processamento: espera algum terminar
+                    self.registro.aguardar_progresso(1)
+
+            except KeyboardInterrupt:
+                raise
+            except Exception as e:
+                logger.error(f"Erro ao obter updates: {e}")
+                time.sleep(2)
+
+class EnviadorMensagens:
+    """
+    Envia mensagens pelo AgendadorEnvio, no lugar de uma thread nova por
+    mensagem: respeita os limites do Telegram (global e por chat), trata
+    respostas 429 e mantém a ordem das mensagens de um mesmo chat.
+    """
+
+    def __init__(self, base_url, sessao, workers=4, tamanho_fila=1000, timeout=10):
+        """
+        Args:
+            base_url (str): https://api.telegram.org/bot<TOKEN>
+            sessao (requests.Session): Sessão HTTP reutilizada
+            workers (int): Requisições simultâneas
+            tamanho_fila (int): Mensagens aguardando envio antes de bloquear
+            timeout (int): Timeout de cada requisição em segundos
+        """
+        self.base_url = base_url
+        self.sessao = sessao
+        self.timeout = timeout
+        self.agendador = AgendadorEnvio(self._post, workers=workers, max_pendentes=tamanho_fila)
+
+    def enviar(self, chat_id, texto, prioridade=PRIORIDADE_NORMAL, **campos):
+        """
+        Agenda o envio de uma mensagem sem esperar a resposta
+
+        Args:
+            chat_id (int): ID do chat
+            texto (str): Texto da mensagem
+            prioridade (int): Fila de prioridade (ver src.outbound)
+            **campos: Campos extras do sendMessage (ex: parse_mode)
+
+        Returns:
+            Future: Resolvido com a resposta HTTP
+        """
+        future = self.agendador.agendar(chat_id, {"chat_id": chat_id, "text": texto, **campos}, prioridade)
+        future.add_done_callback(_registrar_falha)
+        return future
+
+    def _post(self, dados):
+        return self.sessao.post(f"{self.base_url}/sendMessage", json=dados, timeout=self.timeout)
+
+def _registrar_falha(future):
+    if future.exception():
+        logger.error(f"Erro ao enviar mensagem: {future.exception()}")
+
+def chave_chat(update):
+    """Chat de um update (usado para manter a ordem por chat)"""
+    for campo in ("message", "edited_message", "callback_query"):
+        conteudo = update.get(campo)
+        if conteudo:
+            chat = conteudo.get("chat") or conteudo.get("message", {}).get("chat") or {}
+            if "id" in chat:
+                return chat["id"]
+    return update.get("update_id")
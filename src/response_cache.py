@@ -0,0 +1,92 @@
+"""
+Cache em memória das respostas JSON dos dashboards, com suporte a ETag
+"""
+import hashlib
+import threading
+import time
+from flask import current_app, request
+
+class CacheRespostas:
+    """
+    Guarda o corpo JSON já serializado de cada resposta, indexado por
+    (endpoint, período, usuário). As entradas são descartadas quando um gasto
+    é gravado ou a sincronização detecta mudança na planilha (invalidar), ou
+    depois de ttl segundos, já que os cálculos dependem da data atual.
+    """
+
+    def __init__(self, ttl=300):
+        """
+        Args:
+            ttl (int): Validade máxima de uma entrada em segundos
+        """
+        self.ttl = ttl
+        self._entradas = {}  # chave -> (corpo, etag, expira_em)
+        self._versao = 0
+        self._lock = threading.Lock()
+
+    def obter(self, chave, gerar):
+        """
+        Retorna a resposta em cache ou gera uma nova
+
+        Args:
+            chave (tuple): (endpoint, periodo, usuario)
+            gerar (callable): Função sem argumentos que retorna os dados da resposta
+
+        Returns:
+            tuple: (corpo JSON em bytes, etag)
+        """
+        agora = time.monotonic()
+        with self._lock:
+            entrada = self._entradas.get(chave)
+            if entrada and entrada[2] > agora:
+                return entrada[0], entrada[1]
+            versao = self._versao
+
+        corpo = current_app.json.dumps(gerar()).encode('utf-8')
+        etag = hashlib.sha1(corpo).hexdigest()
+
+        with self._lock:
+            # Se houve invalidação durante o cálculo, a resposta pode estar desatualizada
+            if versao == self._versao:
+                self._entradas[chave] = (corpo, etag, agora + self.ttl)
+        return corpo, etag
+
+    def invalidar(self, usuario=None):
+        """
+        Descarta respostas em cache
+
+        Args:
+            usuario: Descarta só as entradas deste usuário (None descarta todas)
+        """
+        with self._lock:
+            self._versao += 1
+            if usuario is None:
+                self._entradas.clear()
+            else:
+                for chave in [c for c in self._entradas if c[2] == usuario]:
+                    del self._entradas[chave]
+
+    def ao_mudar(self, removidos, adicionados):
+        """Ouvinte para o SincronizadorIncremental: invalida tudo a cada mudança"""
+        self.invalidar()
+
+    def responder(self, chave, gerar):
+        """
+        Resposta Flask com ETag; devolve 304 se o cliente já tem a versão atual
+
+        Args:
+            chave (tuple): (endpoint, periodo, usuario)
+            gerar (callable): Função sem argumentos que retorna os dados da resposta
+
+        Returns:
+            flask.Response: Resposta JSON ou 304 Not Modified
+        """
+        corpo, etag = self.obter(chave, gerar)
+        if request.if_none_match.contains(etag):
+            resposta = current_app.response_class(status=304)
+        else:
+            resposta = current_app.response_class(corpo, mimetype='application/json')
+        resposta.set_etag(etag)
+        # Permite que o navegador guarde a resposta, mas revalide a cada consulta
+        resposta.headers['Cache-Control'] = 'no-cache'
+        return resposta
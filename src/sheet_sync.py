@@ -0,0 +1,235 @@
+"""
+Sincronização incremental de planilhas do Google Sheets
+"""
+import threading
+import logging
+from .models import Gasto
+
+logger = logging.getLogger(__name__)
+
+class SincronizadorIncremental:
+    """
+    Mantém uma cópia local das linhas de uma aba baixando apenas o que mudou.
+
+    A cada sincronização é feita uma única chamada batch_get com:
+    - a primeira e a última linha de cada bloco já sincronizado (assinatura do bloco)
+    - o intervalo a partir da última linha conhecida (linhas novas)
+
+    Se alguma assinatura não confere (edição ou exclusão), somente os blocos a partir
+    do primeiro divergente são baixados de novo.
+
+    As bordas não cobrem o meio do bloco: a API não oferece um hash do conteúdo de
+    um intervalo. Por isso cada sincronização também baixa um bloco inteiro, em
+    rodízio, e o compara com a cópia local; uma edição no meio de um bloco aparece
+    em até (número de blocos) sincronizações, e a verificação completa periódica
+    continua como garantia.
+
+    Cada linha é convertida em Gasto uma única vez, ao chegar. Ouvintes
+    registrados com adicionar_ouvinte recebem cada mudança como
+    (removidos, adicionados), listas de Gasto.
+    """
+
+    def __init__(self, sheet, ultima_coluna="D", tamanho_bloco=500, verificacao_completa=50):
+        """
+        Args:
+            sheet (gspread.Worksheet): Aba a ser sincronizada
+            ultima_coluna (str): Última coluna com dados (ex: "D")
+            tamanho_bloco (int): Quantidade de linhas por bloco de verificação
+            verificacao_completa (int): A cada N sincronizações baixa tudo novamente
+        """
+        self.sheet = sheet
+        self.ultima_coluna = ultima_coluna
+        self.tamanho_bloco = tamanho_bloco
+        self.verificacao_completa = verificacao_completa
+
+        self.cabecalho = None
+        self._linhas = []
+        self._gastos = []
+        self._syncs = 0
+        self._rodizio = 0
+        self._ouvintes = []
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._linhas)
+
+    def sincronizar(self):
+        """
+        Atualiza a cópia local com as mudanças da planilha
+
+        Returns:
+            bool: True se houve alguma alteração
+        """
+        with self._lock:
+            self._syncs += 1
+            if (self.cabecalho is None or
+                    self._syncs % self.verificacao_completa == 0):
+                return self._sincronizar_completo()
+            return self._sincronizar_incremental()
+
+    def registros(self):
+        """
+        Retorna as linhas sincronizadas como dicionários (mesmo formato de get_all_records)
+
+        Returns:
+            list: Lista de registros
+        """
+        with self._lock:
+            return self._como_registros(self._linhas)
+
+    def gastos(self):
+        """
+        Retorna as linhas sincronizadas já convertidas
+
+        Returns:
+            list: Lista de Gasto
+        """
+        with self._lock:
+            return list(self._gastos)
+
+    def adicionar_ouvinte(self, ouvinte):
+        """
+        Registra uma função chamada a cada mudança nas linhas
+
+        Args:
+            ouvinte (callable): Função (removidos, adicionados)
+        """
+        with self._lock:
+            self._ouvintes.append(ouvinte)
+            if self._gastos:
+                ouvinte([], list(self._gastos))
+
+    def escrita(self):
+        """
+        Trava usada para gravar na planilha e registrar a gravação sem que
+        uma sincronização aconteça no meio
+
+        Returns:
+            threading.RLock: Trava a ser usada com "with"
+        """
+        return self._lock
+
+    def registrar_append(self, linha):
+        """Registra uma linha já gravada na planilha por este processo"""
+        with self._lock:
+            linha = self._normalizar(linha)
+            gasto = self._converter([linha])
+            self._linhas.append(linha)
+            self._gastos.extend(gasto)
+            self._notificar([], gasto)
+
+    def registrar_remocao_ultima(self):
+        """Registra a remoção da última linha feita por este processo"""
+        with self._lock:
+            if self._linhas:
+                self._linhas.pop()
+                self._notificar([self._gastos.pop()], [])
+
+    def _sincronizar_completo(self):
+        """Baixa a aba inteira"""
+        valores = self.sheet.get(f"A1:{self.ultima_coluna}")
+        cabecalho = list(valores[0]) if valores else []
+        linhas = [self._normalizar(v, len(cabecalho)) for v in valores[1:]]
+
+        alterado = cabecalho != self.cabecalho or linhas != self._linhas
+        if alterado:
+            antigos = self._gastos
+            self.cabecalho = cabecalho
+            self._linhas = linhas
+            self._gastos = self._converter(linhas)
+            self._notificar(antigos, self._gastos)
+        logger.info(f"Sincronização completa: {len(linhas)} linhas")
+        return alterado
+
+    def _sincronizar_incremental(self):
+        """Verifica assinaturas dos blocos e baixa só as linhas novas ou alteradas"""
+        total = len(self._linhas)
+        indices = self._indices_assinatura(total)
+
+        # Linha 1 é o cabeçalho: a linha de dados i fica na linha i + 2 da planilha
+        intervalos = [self._intervalo(i + 2, i + 2) for i in indices]
+
+        # Um bloco inteiro por sincronização, em rodízio
+        bloco = None
+        if total:
+            blocos = (total + self.tamanho_bloco - 1) // self.tamanho_bloco
+            bloco = (self._rodizio % blocos) * self.tamanho_bloco
+            self._rodizio += 1
+            fim_bloco = min(bloco + self.tamanho_bloco, total)
+            intervalos.append(self._intervalo(bloco + 2, fim_bloco + 1))
+
+        intervalos.append(f"A{total + 2}:{self.ultima_coluna}")
+
+        resultados = self.sheet.batch_get(intervalos)
+        novas = [self._normalizar(v) for v in resultados[-1]]
+
+        for i, valores in zip(indices, resultados):
+            remoto = self._normalizar(valores[0]) if valores else None
+            if remoto != self._linhas[i]:
+                inicio = (i // self.tamanho_bloco) * self.tamanho_bloco
+                self._rebaixar_a_partir_de(inicio)
+                return True
+
+        if bloco is not None:
+            remoto = [self._normalizar(v) for v in resultados[-2]]
+            if remoto != self._linhas[bloco:fim_bloco]:
+                self._rebaixar_a_partir_de(bloco)
+                return True
+
+        if novas:
+            gastos = self._converter(novas)
+            self._linhas.extend(novas)
+            self._gastos.extend(gastos)
+            self._notificar([], gastos)
+            logger.info(f"Sincronização incremental: {len(novas)} linhas novas")
+            return True
+
+        return False
+
+    def _indices_assinatura(self, total):
+        """Índices (0-based) da primeira e última linha de cada bloco"""
+        indices = []
+        for inicio in range(0, total, self.tamanho_bloco):
+            fim = min(inicio + self.tamanho_bloco, total) - 1
+            indices.append(inicio)
+            if fim != inicio:
+                indices.append(fim)
+        return indices
+
+    def _rebaixar_a_partir_de(self, inicio):
+        """Baixa novamente as linhas a partir do índice informado"""
+        valores = self.sheet.get(f"A{inicio + 2}:{self.ultima_coluna}")
+        novas = [self._normalizar(v) for v in valores]
+        antigos = self._gastos[inicio:]
+        gastos = self._converter(novas)
+        self._linhas[inicio:] = novas
+        self._gastos[inicio:] = gastos
+        self._notificar(antigos, gastos)
+        logger.info(f"Blocos alterados a partir da linha {inicio + 2}: "
+                    f"{len(valores)} linhas baixadas novamente")
+
+    def _notificar(self, removidos, adicionados):
+        for ouvinte in self._ouvintes:
+            try:
+                ouvinte(removidos, adicionados)
+            except Exception as e:
+                logger.error(f"Erro em ouvinte da sincronização: {e}")
+
+    def _converter(self, linhas):
+        """Converte linhas em Gasto (única conversão de cada linha)"""
+        return [Gasto.de_registro(registro) for registro in self._como_registros(linhas)]
+
+    def _como_registros(self, linhas):
+        cabecalho = self.cabecalho or []
+        return [dict(zip(cabecalho, linha)) for linha in linhas]
+
+    def _intervalo(self, linha_inicio, linha_fim):
+        return f"A{linha_inicio}:{self.ultima_coluna}{linha_fim}"
+
+    def _normalizar(self, valores, tamanho=None):
+        """Completa linhas cortadas pela API (células vazias no final)"""
+        tamanho = tamanho or len(self.cabecalho or valores)
+        linha = [str(v) for v in valores[:tamanho]]
+        linha.extend([""] * (tamanho - len(linha)))
+        return linha
@@ -2,22 +2,57 @@
 Serviço para integração com Google Sheets
 """
 import gspread
+from gspread.urls import DRIVE_FILES_API_V3_URL
 from google.oauth2.service_account import Credentials
 from datetime import datetime
 import logging
 import json
 import tempfile
 import os
+import uuid
 from .config import Config
+from .ledger_cache import LedgerCache
+from .sheet_sync import SincronizadorIncremental
+from .write_queue import FilaEscrita
+from .journal import JournalGastos
+from .aggregates import IndiceAgregado
+from .models import Gasto, CABECALHO
 
 logger = logging.getLogger(__name__)
 
+# Tempo máximo (segundos) esperando a confirmação do lote de um gasto
+TIMEOUT_GRAVACAO = 60
+
 class SheetsService:
     """Classe para gerenciar operações com Google Sheets"""
     
-    def __init__(self):
+    def __init__(self, journal_arquivo=None):
+        """
+        Args:
+            journal_arquivo (str): Journal dos gastos ainda não gravados (um
+                arquivo por processo que grava; None para quem só lê)
+        """
         self.client = None
         self.sheet = None
+        self.sincronizador = None
+        self.indice = IndiceAgregado()
+        self.cache = LedgerCache(
+            self._baixar_registros,
+            intervalo_sync=Config.LEDGER_SYNC_INTERVAL,
+            obter_versao=self._obter_versao_planilha,
+            intervalo_versao=Config.LEDGER_VERSION_CHECK_INTERVAL
+        )
+        self.fila = FilaEscrita(
+            intervalo_ms=Config.WRITE_BATCH_INTERVAL_MS,
+            max_linhas=Config.WRITE_BATCH_MAX_ROWS,
+            gravar=self._gravar_lote
+        )
+        self.journal = None
+        if journal_arquivo:
+            self.journal = JournalGastos(
+                journal_arquivo,
+                lambda chave, linha, reenvio: self.fila.enfileirar(self.sheet, linha, chave, reenvio)
+            )
         self._initialize_connection()
     
     def _initialize_connection(self):
@@ -44,6 +79,16 @@ class SheetsService:
             # Configurar cabeçalho se necessário
             self._setup_headers()
             
+            self.sincronizador = SincronizadorIncremental(self.sheet)
+            self.sincronizador.adicionar_ouvinte(self.indice.aplicar_mudancas)
+            
+            # Carga inicial do cache local
+            self.cache.sincronizar()
+            
+            # Reenvia o que ficou no journal (ex: queda antes da confirmação)
+            if self.journal:
+                self.journal.iniciar_reenvio(intervalo=60)
+            
             logger.info("Google Sheets conectado com sucesso")
             
         except Exception as e:
@@ -54,7 +99,7 @@ class SheetsService:
         """Configura cabeçalho da planilha"""
         try:
             headers = self.sheet.row_values(1)
-            expected_headers = ["Data", "Descrição", "Valor", "Categoria"]
+            expected_headers = CABECALHO
             
             if not headers or headers != expected_headers:
                 self.sheet.clear()
@@ -68,17 +113,46 @@ class SheetsService:
         """Verifica se a conexão está ativa"""
         return self.sheet is not None
     
-    def adicionar_gasto(self, descricao, valor, categoria):
+    def _baixar_registros(self):
+        """Baixa as mudanças da planilha (usado pelo cache)"""
+        self.sincronizador.sincronizar()
+        return self.sincronizador.gastos()
+    
+    def _gravar_lote(self, sheet, linhas):
+        """Grava um lote da fila e o registra no cache local (write-through)"""
+        with self.cache.escrita():
+            sheet.append_rows(linhas)
+            for linha in linhas:
+                self.sincronizador.registrar_append(linha)
+                self.cache.adicionar(Gasto.de_linha(linha))
+    
+    def _obter_versao_planilha(self):
+        """Obtém o número de versão da planilha no Google Drive"""
+        response = self.client.request(
+            "get",
+            f"{DRIVE_FILES_API_V3_URL}/{Config.SHEET_ID}",
+            params={"fields": "version", "supportsAllDrives": True}
+        )
+        return response.json().get("version")
+    
+    def adicionar_gasto(self, descricao, valor, categoria, chave=None):
         """
         Adiciona um novo gasto à planilha
         
+        O gasto entra na fila de gravação em lote. Sem journal, a função
+        retorna quando o lote correspondente for confirmado pelo Google
+        Sheets. Com journal, retorna assim que o gasto estiver em disco; o
+        resultado do Sheets só é registrado no log e, se falhar, o gasto
+        continua pendente e o reenvio periódico do journal tenta de novo.
+        
         Args:
             descricao (str): Descrição do gasto
             valor (float): Valor do gasto
             categoria (str): Categoria do gasto
+            chave (str): Chave de idempotência (ex: update_id; padrão: aleatória)
             
         Returns:
-            bool: True se adicionado com sucesso
+            bool: True se adicionado (ou guardado no journal) com sucesso
         """
         if not self.is_connected():
             logger.error("Google Sheets não conectado")
@@ -86,8 +160,19 @@ class SheetsService:
         
         try:
             hoje = datetime.now().strftime("%d/%m/%Y")
-            self.sheet.append_row([hoje, descricao, f"{valor:.2f}", categoria])
-            logger.info(f"Gasto adicionado: {descricao} - R$ {valor:.2f} ({categoria})")
+            linha = [hoje, descricao, f"{valor:.2f}", categoria]
+            chave = str(chave) if chave is not None else uuid.uuid4().hex
+            
+            if not self.journal:
+                self.fila.enfileirar(self.sheet, linha, chave).result(TIMEOUT_GRAVACAO)
+                logger.info(f"Gasto adicionado: {descricao} - R$ {valor:.2f} ({categoria})")
+                return True
+            
+            future = self.journal.gravar(chave, linha)
+            if future is not None:
+                future.add_done_callback(
+                    lambda f: _registrar_gravacao(f, f"{descricao} - R$ {valor:.2f} ({categoria})"))
+            # future None: mesmo update entregue de novo, o gasto já está registrado
             return True
             
         except Exception as e:
@@ -96,20 +181,15 @@ class SheetsService:
     
     def obter_todos_gastos(self):
         """
-        Obtém todos os gastos da planilha
+        Obtém todos os gastos a partir do cache local
         
         Returns:
-            list: Lista de gastos
+            list: Lista de Gasto
         """
         if not self.is_connected():
             return []
         
-        try:
-            records = self.sheet.get_all_records()
-            return records
-        except Exception as e:
-            logger.error(f"Erro ao obter gastos: {e}")
-            return []
+        return self.cache.obter()
     
     def calcular_saldo_mes(self, mes=None, ano=None):
         """
@@ -127,20 +207,11 @@ class SheetsService:
         if ano is None:
             ano = datetime.now().year
         
-        gastos = self.obter_todos_gastos()
-        mes_ano = f"{mes:02d}/{ano}"
-        total = 0
+        if not self.is_connected():
+            return 0
         
-        for gasto in gastos:
-            data_gasto = str(gasto.get('Data', ''))
-            if mes_ano in data_gasto:
-                valor = str(gasto.get('Valor', '0')).replace(',', '.')
-                try:
-                    total += float(valor)
-                except ValueError:
-                    continue
-        
-        return total
+        self.cache.verificar()
+        return self.indice.total_mes(ano, mes)
     
     def obter_gastos_hoje(self):
         """
@@ -150,18 +221,9 @@ class SheetsService:
             tuple: (lista_gastos, total)
         """
         gastos = self.obter_todos_gastos()
-        hoje = datetime.now().strftime("%d/%m/%Y")
-        gastos_hoje = []
-        total = 0
-        
-        for gasto in gastos:
-            if str(gasto.get('Data', '')) == hoje:
-                gastos_hoje.append(gasto)
-                valor = str(gasto.get('Valor', '0')).replace(',', '.')
-                try:
-                    total += float(valor)
-                except ValueError:
-                    continue
+        hoje = datetime.now().toordinal()
+        gastos_hoje = [gasto for gasto in gastos if gasto.dia == hoje]
+        total = sum(gasto.centavos for gasto in gastos_hoje) / 100
         
         return gastos_hoje, total
     
@@ -176,18 +238,60 @@ class SheetsService:
             return False
         
         try:
-            records = self.sheet.get_all_records()
-            if records:
-                # +1 porque a primeira linha é cabeçalho
-                ultima_linha = len(records) + 1
-                self.sheet.delete_rows(ultima_linha)
-                logger.info("Último gasto deletado com sucesso")
-                return True
+            with self.cache.escrita():
+                # Garantir que o cache reflete a planilha antes de apagar
+                if not self.cache.sincronizar():
+                    return False
+                total = len(self.cache)
+                if total:
+                    # +1 porque a primeira linha é cabeçalho
+                    ultima_linha = total + 1
+                    self.sheet.delete_rows(ultima_linha)
+                    self.sincronizador.registrar_remocao_ultima()
+                    self.cache.remover_ultimo()
+                    logger.info("Último gasto deletado com sucesso")
+                    return True
         except Exception as e:
             logger.error(f"Erro ao deletar gasto: {e}")
         
         return False
     
+    def corrigir_categoria_ultimo(self, categoria):
+        """
+        Altera a categoria do último gasto registrado
+        
+        Args:
+            categoria (str): Nova categoria
+            
+        Returns:
+            Gasto: Gasto corrigido, ou None se não houve alteração
+        """
+        if not self.is_connected():
+            return None
+        
+        try:
+            with self.cache.escrita():
+                # Garantir que o cache reflete a planilha antes de alterar
+                if not self.cache.sincronizar():
+                    return None
+                total = len(self.cache)
+                if total:
+                    ultimo = self.cache.obter()[-1]
+                    linha = [ultimo.data_str, ultimo.descricao, f"{ultimo.valor:.2f}", categoria]
+                    # +1 porque a primeira linha é cabeçalho; categoria é a coluna 4
+                    self.sheet.update_cell(total + 1, 4, categoria)
+                    self.sincronizador.registrar_remocao_ultima()
+                    self.sincronizador.registrar_append(linha)
+                    corrigido = Gasto.de_linha(linha)
+                    self.cache.remover_ultimo()
+                    self.cache.adicionar(corrigido)
+                    logger.info(f"Categoria do último gasto corrigida para {categoria}")
+                    return corrigido
+        except Exception as e:
+            logger.error(f"Erro ao corrigir categoria: {e}")
+        
+        return None
+    
     def obter_gastos_por_categoria(self):
         """
         Agrupa gastos por categoria
@@ -195,23 +299,11 @@ class SheetsService:
         Returns:
             dict: Gastos agrupados por categoria
         """
-        gastos = self.obter_todos_gastos()
-        gastos_por_categoria = {}
-        
-        for gasto in gastos:
-            categoria = gasto.get('Categoria', 'outros')
-            valor_str = str(gasto.get('Valor', '0')).replace(',', '.')
-            
-            try:
-                valor = float(valor_str)
-                if categoria in gastos_por_categoria:
-                    gastos_por_categoria[categoria] += valor
-                else:
-                    gastos_por_categoria[categoria] = valor
-            except ValueError:
-                continue
+        if not self.is_connected():
+            return {}
         
-        return gastos_por_categoria
+        self.cache.verificar()
+        return self.indice.por_categoria()
     
     def obter_produtos_mais_gastos(self, limite=10):
         """
@@ -224,24 +316,21 @@ class SheetsService:
             dict: Produtos ordenados por valor gasto
         """
         gastos = self.obter_todos_gastos()
-        produtos_gastos = {}
+        produtos_centavos = {}
         
         for gasto in gastos:
-            descricao = gasto.get('Descrição', '').lower().strip()
+            descricao = gasto.descricao.lower().strip()
             if not descricao:
                 continue
-                
-            valor_str = str(gasto.get('Valor', '0')).replace(',', '.')
-            
-            try:
-                valor = float(valor_str)
-                if descricao in produtos_gastos:
-                    produtos_gastos[descricao] += valor
-                else:
-                    produtos_gastos[descricao] = valor
-            except ValueError:
-                continue
+            produtos_centavos[descricao] = produtos_centavos.get(descricao, 0) + gasto.centavos
         
         # Ordenar por valor e retornar os top N
-        produtos_ordenados = dict(sorted(produtos_gastos.items(), key=lambda x: x[1], reverse=True)[:limite])
-        return produtos_ordenados
\ No newline at end of file
+        produtos_ordenados = sorted(produtos_centavos.items(), key=lambda x: x[1], reverse=True)[:limite]
+        return {descricao: centavos / 100 for descricao, centavos in produtos_ordenados}
+
+def _registrar_gravacao(future, resumo):
+    """Log do resultado da gravação em background de um gasto do journal"""
+    if future.exception():
+        logger.warning(f"Gasto pendente no journal, será reenviado: {resumo} ({future.exception()})")
+    else:
+        logger.info(f"Gasto adicionado: {resumo}")
@@ -0,0 +1,151 @@
+"""
+Cliente assíncrono (asyncio + httpx) para a Telegram Bot API
+"""
+import asyncio
+import threading
+import logging
+import httpx
+from .config import Config
+from .outbound import AgendadorEnvio, PRIORIDADE_NORMAL, PRIORIDADE_RELATORIO
+from .telegram_service import MensagensTelegram
+
+logger = logging.getLogger(__name__)
+
+class TelegramServiceAsync(MensagensTelegram):
+    """
+    Versão assíncrona do TelegramService, com os mesmos métodos de alto nível.
+
+    As requisições saem de um único httpx.AsyncClient (pool de conexões
+    keep-alive) rodando em um event loop próprio, em uma thread de fundo.
+    Toda mensagem passa pelo AgendadorEnvio, então os limites do Telegram,
+    as prioridades e os reenvios após 429 valem como no cliente síncrono;
+    como o post é assíncrono, as mensagens em voo não ocupam threads.
+
+    Uso em código asyncio:
+        async with TelegramServiceAsync() as telegram:
+            await telegram.enviar_saldo_mensal(chat_id, 150.0, "10/2026")
+
+    Uso em bots com threads (sem esperar a resposta):
+        telegram.enviar(chat_id, "✅ Salvo", PRIORIDADE_CONFIRMACAO)
+    """
+
+    def __init__(self, token=None, max_conexoes=None, transporte=None):
+        """
+        Args:
+            token (str): Token do bot (padrão: Config.TELEGRAM_TOKEN)
+            max_conexoes (int): Tamanho do pool de conexões (padrão: Config.TELEGRAM_POOL_SIZE)
+            transporte (httpx.AsyncBaseTransport): Transporte HTTP (ex: MockTransport em testes)
+        """
+        self.token = token or Config.TELEGRAM_TOKEN
+        self.base_url = f"https://api.telegram.org/bot{self.token}"
+        max_conexoes = max_conexoes or Config.TELEGRAM_POOL_SIZE
+
+        self.client = httpx.AsyncClient(
+            base_url=self.base_url,
+            timeout=Config.TELEGRAM_TIMEOUT,
+            limits=httpx.Limits(max_connections=max_conexoes,
+                                max_keepalive_connections=max_conexoes),
+            transport=transporte
+        )
+
+        self._loop = asyncio.new_event_loop()
+        threading.Thread(target=self._loop.run_forever, name="telegram-async", daemon=True).start()
+
+        # Limites do Telegram: ~30 msg/s no total e ~1 msg/s por chat
+        self.agendador = AgendadorEnvio(self._post, workers=max_conexoes)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.fechar()
+
+    async def fechar(self):
+        """Fecha as conexões do pool e encerra o event loop de envio"""
+        await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(self.client.aclose(), self._loop))
+        self._loop.call_soon_threadsafe(self._loop.stop)
+
+    def enviar(self, chat_id, texto, prioridade=PRIORIDADE_NORMAL, **campos):
+        """
+        Agenda o envio de uma mensagem sem esperar a resposta (para código síncrono)
+
+        Args:
+            chat_id (int): ID do chat
+            texto (str): Texto da mensagem
+            prioridade (int): Fila de prioridade (ver src.outbound)
+            **campos: Campos extras do sendMessage (ex: parse_mode)
+
+        Returns:
+            Future: Resolvido com a resposta HTTP
+        """
+        future = self.agendador.agendar(chat_id, {"chat_id": chat_id, "text": texto, **campos}, prioridade)
+        future.add_done_callback(_registrar_falha)
+        return future
+
+    async def enviar_mensagem(self, chat_id, message, prioridade=PRIORIDADE_NORMAL):
+        """
+        Envia mensagem via Telegram Bot API
+
+        Args:
+            chat_id (str): ID do chat
+            message (str): Mensagem a ser enviada
+            prioridade (int): Fila de prioridade (confirmações saem antes de relatórios)
+
+        Returns:
+            bool: True se enviada com sucesso
+        """
+        try:
+            future = self.enviar(chat_id, message, prioridade, parse_mode="Markdown")
+            response = await asyncio.wrap_future(future)
+
+            if response.status_code == 200:
+                return True
+
+            logger.error(f"❌ Erro ao enviar mensagem: {response.status_code} - {response.text}")
+            return False
+
+        except Exception as e:
+            logger.error(f"Erro ao enviar mensagem Telegram: {e}")
+            return False
+
+    async def enviar_varios(self, mensagens, prioridade=PRIORIDADE_NORMAL):
+        """
+        Envia várias mensagens em paralelo (no ritmo permitido pelo agendador)
+
+        Args:
+            mensagens (list): Pares (chat_id, mensagem)
+            prioridade (int): Fila de prioridade
+
+        Returns:
+            list: Resultado (bool) de cada envio, na mesma ordem
+        """
+        return await asyncio.gather(*(self.enviar_mensagem(c, m, prioridade) for c, m in mensagens))
+
+    async def enviar_mensagem_formatada(self, chat_id, titulo, conteudo, rodape=None,
+                                        prioridade=PRIORIDADE_NORMAL):
+        """Envia mensagem formatada com título e conteúdo"""
+        return await self.enviar_mensagem(chat_id, self.texto_formatado(titulo, conteudo, rodape), prioridade)
+
+    async def enviar_lista_gastos(self, chat_id, gastos, titulo="📋 Lista de Gastos"):
+        """Envia lista formatada de gastos"""
+        return await self.enviar_mensagem(chat_id, self.texto_lista_gastos(gastos, titulo), PRIORIDADE_RELATORIO)
+
+    async def enviar_saldo_mensal(self, chat_id, total, mes_ano):
+        """Envia saldo mensal formatado"""
+        return await self.enviar_mensagem(chat_id, self.texto_saldo_mensal(total, mes_ano), PRIORIDADE_RELATORIO)
+
+    async def enviar_ajuda(self, chat_id):
+        """Envia mensagem de ajuda com todos os comandos"""
+        return await self.enviar_mensagem(chat_id, self.texto_ajuda())
+
+    async def enviar_erro_valor(self, chat_id):
+        """Envia mensagem de erro quando não consegue identificar o valor"""
+        return await self.enviar_mensagem(chat_id, self.texto_erro_valor())
+
+    def _post(self, dados):
+        """Chamada HTTP feita pelo agendador: devolve um Future, sem bloquear o worker"""
+        return asyncio.run_coroutine_threadsafe(self.client.post("/sendMessage", json=dados), self._loop)
+
+def _registrar_falha(future):
+    if future.exception():
+        logger.error(f"Erro ao enviar mensagem: {future.exception()}")
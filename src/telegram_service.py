@@ -3,39 +3,230 @@ Serviço para integração com Telegram Bot API
 """
 import requests
 import logging
+import threading
+from contextlib import contextmanager
+from requests.adapters import HTTPAdapter
 from .config import Config
+from .outbound import AgendadorEnvio, PRIORIDADE_NORMAL, PRIORIDADE_RELATORIO
 
 logger = logging.getLogger(__name__)
 
-class TelegramService:
+class RespostaWebhook:
+    """
+    Primeira resposta a um update, devolvida no corpo da resposta do webhook
+    (o Telegram executa o método informado sem uma chamada extra à API).
+    Se o webhook já respondeu quando a mensagem fica pronta, ela segue pela API.
+    """
+    
+    def __init__(self, chat_id):
+        self.chat_id = chat_id
+        self.dados = None
+        self._aguardando = True
+        self._pronta = threading.Event()
+        self._lock = threading.Lock()
+    
+    def entregar(self, dados):
+        """
+        Tenta entregar a mensagem ao webhook
+        
+        Returns:
+            bool: True se a mensagem irá no corpo da resposta
+        """
+        with self._lock:
+            if not self._aguardando or dados["chat_id"] != self.chat_id:
+                return False
+            self._aguardando = False
+            self.dados = {"method": "sendMessage", **dados}
+        self._pronta.set()
+        return True
+    
+    def aguardar(self, timeout=None):
+        """
+        Espera a primeira mensagem e encerra a captura
+        
+        Returns:
+            dict: Corpo para a resposta do webhook, ou None
+        """
+        self._pronta.wait(timeout)
+        with self._lock:
+            self._aguardando = False
+            return self.dados
+
+class MensagensTelegram:
+    """
+    Montagem dos textos enviados pelo bot, compartilhada pelo cliente
+    síncrono (TelegramService) e pelo assíncrono (TelegramServiceAsync)
+    """
+    
+    def texto_formatado(self, titulo, conteudo, rodape=None):
+        """
+        Monta mensagem com título, conteúdo e rodapé opcional
+        
+        Returns:
+            str: Mensagem em Markdown
+        """
+        message = f"*{titulo}*\n\n{conteudo}"
+        
+        if rodape:
+            message += f"\n\n_{rodape}_"
+        
+        return message
+    
+    def texto_lista_gastos(self, gastos, titulo="📋 Lista de Gastos"):
+        """
+        Monta lista formatada de gastos
+        
+        Returns:
+            str: Mensagem em Markdown
+        """
+        if not gastos:
+            return "✅ Nenhum gasto encontrado!"
+        
+        conteudo = ""
+        total = 0
+        
+        for gasto in gastos:
+            descricao = gasto.get('Descrição', 'N/A')
+            valor_str = str(gasto.get('Valor', '0'))
+            
+            conteudo += f"• {descricao} - R$ {valor_str}\n"
+            
+            # Calcular total
+            try:
+                valor = float(valor_str.replace(',', '.'))
+                total += valor
+            except ValueError:
+                pass
+        
+        conteudo += f"\n💰 *Total: R$ {total:.2f}*"
+        
+        return self.texto_formatado(titulo, conteudo)
+    
+    def texto_saldo_mensal(self, total, mes_ano):
+        """
+        Monta saldo mensal formatado
+        
+        Returns:
+            str: Mensagem em Markdown
+        """
+        titulo = f"💰 Saldo do mês {mes_ano}"
+        conteudo = f"Total gasto: R$ {total:.2f}"
+        
+        # Adicionar contexto baseado no valor
+        if total == 0:
+            rodape = "Parabéns! Nenhum gasto registrado este mês! 🎉"
+        elif total < 500:
+            rodape = "Gastos controlados! Continue assim! 👍"
+        elif total < 1000:
+            rodape = "Atenção aos gastos! 📊"
+        else:
+            rodape = "Gastos elevados! Considere revisar seu orçamento. 📈"
+        
+        return self.texto_formatado(titulo, conteudo, rodape)
+    
+    def texto_ajuda(self):
+        """
+        Monta mensagem de ajuda com todos os comandos
+        
+        Returns:
+            str: Mensagem em Markdown
+        """
+        titulo = "🤖 Comandos Disponíveis"
+        
+        conteudo = """💰 *Para registrar gastos:*
+• mercado 50
+• uber 25.50
+• R$ 100 farmácia
+
+📊 *Consultas:*
+• /saldo - Total do mês
+• /hoje - Gastos de hoje
+• /exportar - Link da planilha
+
+🗑️ *Outros:*
+• /deletar - Remove último gasto
+• /corrigir lazer - Muda a categoria do último gasto
+• /ajuda - Esta mensagem"""
+        
+        rodape = "Digite qualquer gasto para começar!"
+        
+        return self.texto_formatado(titulo, conteudo, rodape)
+    
+    def texto_erro_valor(self):
+        """
+        Monta mensagem de erro quando não consegue identificar o valor
+        
+        Returns:
+            str: Mensagem em Markdown
+        """
+        titulo = "❌ Valor não identificado"
+        
+        conteudo = """*Exemplos válidos:*
+• mercado 50
+• R$ 25.50 uber
+• cinquenta reais farmácia
+• 100 gasolina"""
+        
+        rodape = "Digite /ajuda para ver todos os comandos"
+        
+        return self.texto_formatado(titulo, conteudo, rodape)
+
+class TelegramService(MensagensTelegram):
     """Classe para gerenciar operações com Telegram Bot API"""
     
     def __init__(self):
         self.token = Config.TELEGRAM_TOKEN
         self.base_url = f"https://api.telegram.org/bot{self.token}"
+        
+        # Sessão com conexões keep-alive reaproveitadas entre as mensagens
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=Config.TELEGRAM_POOL_SIZE)
+        self.session.mount("https://", adapter)
+        
+        # Limites do Telegram: ~30 msg/s no total e ~1 msg/s por chat
+        self.agendador = AgendadorEnvio(self._post, workers=Config.TELEGRAM_POOL_SIZE)
+        self._local = threading.local()
     
-    def enviar_mensagem(self, chat_id, message):
+    @contextmanager
+    def capturar_resposta(self, resposta):
+        """
+        Durante o bloco, a primeira mensagem enviada nesta thread é entregue
+        à RespostaWebhook em vez de ir pela API
+        """
+        self._local.resposta = resposta
+        try:
+            yield resposta
+        finally:
+            self._local.resposta = None
+    
+    def enviar_mensagem(self, chat_id, message, prioridade=PRIORIDADE_NORMAL):
         """
         Envia mensagem via Telegram Bot API
         
         Args:
             chat_id (str): ID do chat
             message (str): Mensagem a ser enviada
+            prioridade (int): Fila de prioridade (confirmações saem antes de relatórios)
             
         Returns:
             bool: True se enviada com sucesso
         """
         try:
-            url = f"{self.base_url}/sendMessage"
             data = {
                 "chat_id": chat_id,
                 "text": message,
                 "parse_mode": "Markdown"
             }
             
+            resposta = getattr(self._local, 'resposta', None)
+            if resposta is not None and resposta.entregar(data):
+                logger.info(f"✅ Mensagem para {chat_id} enviada na resposta do webhook")
+                return True
+            
             logger.info(f"Enviando mensagem para {chat_id}: '{message[:50]}...'")
             
-            response = requests.post(url, json=data)
+            future = self.agendador.agendar(chat_id, data, prioridade)
+            response = future.result(timeout=Config.TELEGRAM_SEND_WAIT)
             
             if response.status_code == 200:
                 logger.info(f"✅ Mensagem enviada com sucesso para {chat_id}")
@@ -49,7 +240,8 @@ class TelegramService:
             logger.error(f"Erro ao enviar mensagem Telegram: {e}")
             return False
     
-    def enviar_mensagem_formatada(self, chat_id, titulo, conteudo, rodape=None):
+    def enviar_mensagem_formatada(self, chat_id, titulo, conteudo, rodape=None,
+                                  prioridade=PRIORIDADE_NORMAL):
         """
         Envia mensagem formatada com título e conteúdo
         
@@ -58,16 +250,12 @@ class TelegramService:
             titulo (str): Título da mensagem
             conteudo (str): Conteúdo principal
             rodape (str): Rodapé opcional
+            prioridade (int): Fila de prioridade
             
         Returns:
             bool: True se enviada com sucesso
         """
-        message = f"*{titulo}*\n\n{conteudo}"
-        
-        if rodape:
-            message += f"\n\n_{rodape}_"
-        
-        return self.enviar_mensagem(chat_id, message)
+        return self.enviar_mensagem(chat_id, self.texto_formatado(titulo, conteudo, rodape), prioridade)
     
     def enviar_lista_gastos(self, chat_id, gastos, titulo="📋 Lista de Gastos"):
         """
@@ -81,28 +269,7 @@ class TelegramService:
         Returns:
             bool: True se enviada com sucesso
         """
-        if not gastos:
-            return self.enviar_mensagem(chat_id, "✅ Nenhum gasto encontrado!")
-        
-        conteudo = ""
-        total = 0
-        
-        for gasto in gastos:
-            descricao = gasto.get('Descrição', 'N/A')
-            valor_str = str(gasto.get('Valor', '0'))
-            
-            conteudo += f"• {descricao} - R$ {valor_str}\n"
-            
-            # Calcular total
-            try:
-                valor = float(valor_str.replace(',', '.'))
-                total += valor
-            except ValueError:
-                pass
-        
-        conteudo += f"\n💰 *Total: R$ {total:.2f}*"
-        
-        return self.enviar_mensagem_formatada(chat_id, titulo, conteudo)
+        return self.enviar_mensagem(chat_id, self.texto_lista_gastos(gastos, titulo), PRIORIDADE_RELATORIO)
     
     def enviar_saldo_mensal(self, chat_id, total, mes_ano):
         """
@@ -116,20 +283,7 @@ class TelegramService:
         Returns:
             bool: True se enviada com sucesso
         """
-        titulo = f"💰 Saldo do mês {mes_ano}"
-        conteudo = f"Total gasto: R$ {total:.2f}"
-        
-        # Adicionar contexto baseado no valor
-        if total == 0:
-            rodape = "Parabéns! Nenhum gasto registrado este mês! 🎉"
-        elif total < 500:
-            rodape = "Gastos controlados! Continue assim! 👍"
-        elif total < 1000:
-            rodape = "Atenção aos gastos! 📊"
-        else:
-            rodape = "Gastos elevados! Considere revisar seu orçamento. 📈"
-        
-        return self.enviar_mensagem_formatada(chat_id, titulo, conteudo, rodape)
+        return self.enviar_mensagem(chat_id, self.texto_saldo_mensal(total, mes_ano), PRIORIDADE_RELATORIO)
     
     def enviar_ajuda(self, chat_id):
         """
@@ -141,25 +295,7 @@ class TelegramService:
         Returns:
             bool: True se enviada com sucesso
         """
-        titulo = "🤖 Comandos Disponíveis"
-        
-        conteudo = """💰 *Para registrar gastos:*
-• mercado 50
-• uber 25.50
-• R$ 100 farmácia
-
-📊 *Consultas:*
-• /saldo - Total do mês
-• /hoje - Gastos de hoje
-• /exportar - Link da planilha
-
-🗑️ *Outros:*
-• /deletar - Remove último gasto
-• /ajuda - Esta mensagem"""
-        
-        rodape = "Digite qualquer gasto para começar!"
-        
-        return self.enviar_mensagem_formatada(chat_id, titulo, conteudo, rodape)
+        return self.enviar_mensagem(chat_id, self.texto_ajuda())
     
     def enviar_erro_valor(self, chat_id):
         """
@@ -171,14 +307,9 @@ class TelegramService:
         Returns:
             bool: True se enviada com sucesso
         """
-        titulo = "❌ Valor não identificado"
-        
-        conteudo = """*Exemplos válidos:*
-• mercado 50
-• R$ 25.50 uber
-• cinquenta reais farmácia
-• 100 gasolina"""
-        
-        rodape = "Digite /ajuda para ver todos os comandos"
-        
-        return self.enviar_mensagem_formatada(chat_id, titulo, conteudo, rodape)
\ No newline at end of file
+        return self.enviar_mensagem(chat_id, self.texto_erro_valor())
+    
+    def _post(self, data):
+        """Chamada HTTP feita pelo agendador"""
+        return self.session.post(f"{self.base_url}/sendMessage", json=data,
+                                 timeout=Config.TELEGRAM_TIMEOUT)
@@ -0,0 +1,98 @@
+"""
+Caixa de entrada persistente dos updates recebidos pelo webhook
+"""
+import json
+import os
+import threading
+import logging
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+class CaixaEntradaUpdates:
+    """
+    Arquivo append-only com o payload de cada update aceito pelo webhook,
+    gravado com fsync antes do 200 ao Telegram. O update é marcado como
+    concluído quando o worker termina; os que ficaram sem conclusão (queda
+    do processo com o update ainda na fila) são devolvidos por pendentes()
+    na inicialização para serem processados de novo.
+    """
+
+    def __init__(self, caminho):
+        """
+        Args:
+            caminho (str): Arquivo da caixa de entrada
+        """
+        self.caminho = caminho
+        self._pendentes = OrderedDict()  # update_id -> payload
+        self._linhas_arquivo = 0
+        self._lock = threading.Lock()
+
+        self._carregar()
+        self._arquivo = open(self.caminho, 'a', encoding='utf-8')
+
+    def gravar(self, update):
+        """Persiste o payload do update (com fsync)"""
+        with self._lock:
+            self._escrever({'op': 'add', 'id': update['update_id'], 'update': update})
+            self._pendentes[update['update_id']] = update
+
+    def concluir(self, update_id):
+        """Marca o update como processado (ou devolvido ao Telegram)"""
+        with self._lock:
+            if self._pendentes.pop(update_id, None) is None:
+                return
+            self._escrever({'op': 'ok', 'id': update_id})
+            self._compactar_se_necessario()
+
+    def pendentes(self):
+        """Updates gravados e ainda não concluídos, em ordem de chegada"""
+        with self._lock:
+            return list(self._pendentes.values())
+
+    def _escrever(self, entrada):
+        """Acrescenta uma entrada ao arquivo e força a escrita em disco"""
+        self._arquivo.write(json.dumps(entrada, ensure_ascii=False) + '\n')
+        self._arquivo.flush()
+        os.fsync(self._arquivo.fileno())
+        self._linhas_arquivo += 1
+
+    def _carregar(self):
+        """Reconstrói os pendentes a partir do arquivo existente"""
+        if not os.path.exists(self.caminho):
+            return
+
+        with open(self.caminho, 'r', encoding='utf-8') as f:
+            for texto in f:
+                try:
+                    entrada = json.loads(texto)
+                except ValueError:
+                    # Última linha incompleta (queda antes do 200)
+                    continue
+
+                self._linhas_arquivo += 1
+                if entrada['op'] == 'add':
+                    self._pendentes[entrada['id']] = entrada['update']
+                elif entrada['op'] == 'ok':
+                    self._pendentes.pop(entrada['id'], None)
+
+        if self._pendentes:
+            logger.info(f"Caixa de entrada com {len(self._pendentes)} updates pendentes")
+
+    def _compactar_se_necessario(self):
+        """Reescreve o arquivo só com os pendentes quando ele cresce demais"""
+        if self._linhas_arquivo < 2 * len(self._pendentes) + 1000:
+            return
+
+        temporario = f"{self.caminho}.tmp"
+        with open(temporario, 'w', encoding='utf-8') as f:
+            for update_id, update in self._pendentes.items():
+                f.write(json.dumps({'op': 'add', 'id': update_id, 'update': update},
+                                   ensure_ascii=False) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+
+        self._arquivo.close()
+        os.replace(temporario, self.caminho)
+        self._arquivo = open(self.caminho, 'a', encoding='utf-8')
+        self._linhas_arquivo = len(self._pendentes)
@@ -4,6 +4,151 @@ Utilitários e funções auxiliares
 import re
 from datetime import datetime
 
+# Tokens de uma mensagem, reconhecidos em uma única passada:
+# símbolo de moeda, número (com ou sem separador de milhar) e palavra
+_TOKEN = re.compile(r"""
+    (?P<moeda>r\$)
+  | (?P<numero>
+        \d{1,3}(?:\.\d{3})+(?:,\d{1,2})?(?!\d)   # 1.234 / 1.234,56
+      | \d{1,3}(?:,\d{3})+\.\d{1,2}(?!\d)        # 1,234.56
+      | \d+(?:[.,]\d{1,2})?                       # 50 / 50,5 / 12.90
+    )
+  | (?P<palavra>[^\W\d_]+)
+""", re.IGNORECASE | re.VERBOSE)
+
+_PALAVRAS_MOEDA = frozenset(['real', 'reais'])
+
+_NUMEROS_EXTENSO = {
+    'um': 1, 'uma': 1, 'dois': 2, 'duas': 2, 'três': 3, 'tres': 3,
+    'quatro': 4, 'cinco': 5, 'seis': 6, 'sete': 7, 'oito': 8, 'nove': 9,
+    'dez': 10, 'onze': 11, 'doze': 12, 'treze': 13, 'quatorze': 14,
+    'catorze': 14, 'quinze': 15, 'dezesseis': 16, 'dezessete': 17,
+    'dezoito': 18, 'dezenove': 19, 'vinte': 20, 'trinta': 30,
+    'quarenta': 40, 'cinquenta': 50, 'sessenta': 60, 'setenta': 70,
+    'oitenta': 80, 'noventa': 90, 'cem': 100, 'cento': 100,
+    'duzentos': 200, 'trezentos': 300, 'quatrocentos': 400,
+    'quinhentos': 500, 'seiscentos': 600, 'setecentos': 700,
+    'oitocentos': 800, 'novecentos': 900, 'mil': 1000
+}
+
+_COMANDOS = frozenset([
+    'saldo', 'hoje', 'exportar', 'deletar', 'apagar',
+    'ajuda', 'help', 'comandos'
+])
+
+class MensagemAnalisada:
+    """Resultado de analisar_mensagem"""
+
+    __slots__ = ('valor', 'descricao', 'comando')
+
+    def __init__(self, valor, descricao, comando):
+        self.valor = valor
+        self.descricao = descricao
+        self.comando = comando
+
+    def __repr__(self):
+        return f"MensagemAnalisada(valor={self.valor!r}, descricao={self.descricao!r}, comando={self.comando!r})"
+
+def _converter_numero(texto):
+    """Converte '1.234,56', '1,234.56', '50,5' ou '12.90' em float"""
+    if ',' in texto and '.' in texto:
+        if texto.rfind(',') > texto.rfind('.'):
+            texto = texto.replace('.', '').replace(',', '.')
+        else:
+            texto = texto.replace(',', '')
+    elif ',' in texto:
+        texto = texto.replace(',', '.')
+    elif texto.count('.') > 1 or (len(texto) - texto.rfind('.') == 4 and '.' in texto):
+        # Só pontos de milhar (1.500 / 1.000.000)
+        texto = texto.replace('.', '')
+    return float(texto)
+
+def analisar_mensagem(text):
+    """
+    Extrai valor, descrição e comando de uma mensagem em uma única passada
+
+    Reconhece números com separador de milhar ("1.234,56") e valores por
+    extenso compostos ("cento e vinte", "dois mil e quinhentos"). Números por
+    extenso só são usados como valor quando a mensagem não tem dígitos.
+
+    Args:
+        text (str): Texto da mensagem
+
+    Returns:
+        MensagemAnalisada: valor (float ou None), descricao (str) e comando (str ou None)
+    """
+    if not text:
+        return MensagemAnalisada(None, "", None)
+
+    valor = None
+    comando = None
+    removidos = []          # trechos (inicio, fim) fora da descrição
+    ultimo_numero = None    # token numérico anterior, para "2 mil"
+
+    # Primeiro valor por extenso: [inicio, fim, total, atual, aguardando_e, aberto]
+    extenso = None
+
+    for m in _TOKEN.finditer(text):
+        tipo = m.lastgroup
+        if tipo == 'palavra':
+            palavra = m.group().lower()
+            numero = _NUMEROS_EXTENSO.get(palavra)
+
+            if palavra == 'mil' and ultimo_numero == m.start() and valor is not None:
+                # "2 mil": multiplica o número logo antes
+                valor *= 1000
+                removidos.append(m.span())
+                ultimo_numero = None
+                continue
+            ultimo_numero = None
+
+            if numero is not None and (extenso is None or extenso[5]):
+                if extenso is None:
+                    extenso = [m.start(), m.end(), 0, 0, False, True]
+                if palavra == 'mil':
+                    extenso[2] += (extenso[3] or 1) * 1000
+                    extenso[3] = 0
+                else:
+                    extenso[3] += numero
+                extenso[1] = m.end()
+                extenso[4] = False
+            elif palavra == 'e' and extenso is not None and extenso[5] and not extenso[4]:
+                extenso[4] = True
+            else:
+                if extenso is not None:
+                    extenso[5] = False
+                if palavra in _PALAVRAS_MOEDA:
+                    removidos.append(m.span())
+                elif comando is None and palavra in _COMANDOS:
+                    comando = palavra
+        else:
+            if extenso is not None:
+                extenso[5] = False
+            removidos.append(m.span())
+            if tipo == 'numero':
+                if valor is None:
+                    valor = _converter_numero(m.group())
+                    # Permite "2 mil" (com um espaço entre o número e a palavra)
+                    ultimo_numero = m.end() + 1
+                    continue
+            ultimo_numero = None
+
+    if valor is None and extenso is not None:
+        valor = float(extenso[2] + extenso[3])
+        removidos.append((extenso[0], extenso[1]))
+        removidos.sort()
+
+    # Monta a descrição com os trechos que sobraram
+    partes = []
+    posicao = 0
+    for inicio, fim in removidos:
+        partes.append(text[posicao:inicio])
+        posicao = fim
+    partes.append(text[posicao:])
+    descricao = ' '.join(''.join(partes).split())
+
+    return MensagemAnalisada(valor, descricao, comando)
+
 def extrair_valor_melhorado(text):
     """
     Extrai valor monetário de um texto com múltiplos formatos
@@ -14,40 +159,7 @@ def extrair_valor_melhorado(text):
     Returns:
         float: Valor extraído ou None se não encontrado
     """
-    if not text:
-        return None
-    
-    # Remove R$, reais, etc.
-    text_clean = re.sub(r'(r\$|reais?|real)', '', text, flags=re.IGNORECASE)
-    
-    # Procura por números com vírgula ou ponto
-    valor_match = re.search(r'\d+(?:[.,]\d{1,2})?', text_clean)
-    if valor_match:
-        valor = valor_match.group().replace(',', '.')
-        try:
-            return float(valor)
-        except ValueError:
-            pass
-    
-    # Números por extenso básicos
-    numeros_extenso = {
-        'um': 1, 'dois': 2, 'três': 3, 'quatro': 4, 'cinco': 5,
-        'seis': 6, 'sete': 7, 'oito': 8, 'nove': 9, 'dez': 10,
-        'onze': 11, 'doze': 12, 'treze': 13, 'quatorze': 14, 'quinze': 15,
-        'dezesseis': 16, 'dezessete': 17, 'dezoito': 18, 'dezenove': 19,
-        'vinte': 20, 'trinta': 30, 'quarenta': 40, 'cinquenta': 50,
-        'sessenta': 60, 'setenta': 70, 'oitenta': 80, 'noventa': 90,
-        'cem': 100, 'duzentos': 200, 'trezentos': 300, 'quatrocentos': 400,
-        'quinhentos': 500, 'seiscentos': 600, 'setecentos': 700,
-        'oitocentos': 800, 'novecentos': 900, 'mil': 1000
-    }
-    
-    text_lower = text.lower()
-    for palavra, valor in numeros_extenso.items():
-        if palavra in text_lower:
-            return float(valor)
-    
-    return None
+    return analisar_mensagem(text).valor
 
 def limpar_descricao(text, valor_str=None):
     """
@@ -60,21 +172,7 @@ def limpar_descricao(text, valor_str=None):
     Returns:
         str: Descrição limpa
     """
-    if not text:
-        return ""
-    
-    # Remove números, símbolos monetários e palavras relacionadas a dinheiro
-    descricao = re.sub(
-        r'\d+(?:[.,]\d{1,2})?|r\$|reais?|real', 
-        '', 
-        text, 
-        flags=re.IGNORECASE
-    )
-    
-    # Remove espaços extras e caracteres especiais desnecessários
-    descricao = re.sub(r'\s+', ' ', descricao).strip()
-    
-    return descricao
+    return analisar_mensagem(text).descricao
 
 def formatar_data_brasileira(data=None):
     """
@@ -135,18 +233,4 @@ def extrair_comando(text):
     Returns:
         str: Comando identificado ou None
     """
-    if not text:
-        return None
-    
-    text_lower = text.lower().strip()
-    
-    comandos = [
-        'saldo', 'hoje', 'exportar', 'deletar', 'apagar', 
-        'ajuda', 'help', 'comandos'
-    ]
-    
-    for comando in comandos:
-        if comando in text_lower:
-            return comando
-    
-    return None
\ No newline at end of file
+    return analisar_mensagem(text).comando
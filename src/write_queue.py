@@ -0,0 +1,177 @@
+"""
+Fila de gravação em lote para o Google Sheets
+"""
+import threading
+import random
+import time
+import logging
+from concurrent.futures import Future
+
+logger = logging.getLogger(__name__)
+
+# Cota excedida: a API recusou o pedido, então repetir não duplica linhas
+STATUS_COTA = {429}
+
+# Falha no servidor: o append pode ter sido aplicado ou não (resultado ambíguo)
+STATUS_AMBIGUOS = {500, 502, 503, 504}
+
+# Coluna com a chave de idempotência de cada linha (fora do intervalo A:D lido
+# pelos sincronizadores e sem cabeçalho, para não alterar a linha 1)
+COLUNA_CHAVE = 5
+
+def _gravar_padrao(sheet, linhas):
+    """Grava as linhas com uma única chamada à API"""
+    sheet.append_rows(linhas)
+
+class FilaEscrita:
+    """
+    Agrupa gastos pendentes por aba e grava com um único append_rows
+    a cada intervalo_ms ou quando uma aba acumula max_linhas.
+
+    Linhas com chave levam a chave na coluna COLUNA_CHAVE. Depois de uma
+    falha ambígua (5xx) e nos reenvios (verificar=True), as chaves já
+    presentes na planilha são descartadas antes de gravar, então a mesma
+    linha não entra duas vezes. Sem chave, uma falha ambígua não é repetida.
+    A fila fica em memória; a durabilidade vem do JournalGastos que a alimenta.
+    """
+
+    def __init__(self, intervalo_ms=500, max_linhas=50, max_tentativas=6, gravar=None):
+        """
+        Args:
+            intervalo_ms (int): Tempo máximo que uma linha espera na fila
+            max_linhas (int): Quantidade de linhas que dispara a gravação imediata
+            max_tentativas (int): Tentativas por lote antes de desistir
+            gravar (callable): Função (sheet, linhas) que grava o lote
+        """
+        self.intervalo = intervalo_ms / 1000
+        self.max_linhas = max_linhas
+        self.max_tentativas = max_tentativas
+        self._gravar = gravar or _gravar_padrao
+
+        # id(sheet) -> {'sheet': sheet, 'itens': [(linha, chave, verificar, future)], 'desde': timestamp}
+        self._pendentes = {}
+        self._cond = threading.Condition()
+        self._ativa = True
+
+        self._thread = threading.Thread(target=self._loop, daemon=True)
+        self._thread.start()
+
+    def enfileirar(self, sheet, linha, chave=None, verificar=False):
+        """
+        Adiciona uma linha à fila da aba
+
+        Args:
+            sheet (gspread.Worksheet): Aba de destino
+            linha (list): Valores da linha
+            chave (str): Chave de idempotência gravada junto com a linha (opcional)
+            verificar (bool): Confere na planilha se a chave já foi gravada
+                antes de gravar (reenvio após queda)
+
+        Returns:
+            Future: Resolvido com True quando a linha estiver na planilha
+        """
+        future = Future()
+        with self._cond:
+            grupo = self._pendentes.setdefault(id(sheet), {
+                'sheet': sheet,
+                'itens': [],
+                'desde': time.monotonic()
+            })
+            grupo['itens'].append((linha, chave, verificar and chave is not None, future))
+            self._cond.notify()
+        return future
+
+    def pendentes(self):
+        """Quantidade de linhas aguardando gravação"""
+        with self._cond:
+            return sum(len(g['itens']) for g in self._pendentes.values())
+
+    def fechar(self, timeout=10):
+        """Grava o que estiver pendente e encerra a thread da fila"""
+        with self._cond:
+            self._ativa = False
+            self._cond.notify()
+        self._thread.join(timeout)
+
+    def _loop(self):
+        while True:
+            with self._cond:
+                lotes = self._aguardar_lotes()
+                if lotes is None:
+                    return
+
+            for grupo in lotes:
+                self._gravar_lote(grupo['sheet'], grupo['itens'])
+
+    def _aguardar_lotes(self):
+        """Espera até algum grupo estar pronto e retira os grupos prontos da fila"""
+        while True:
+            agora = time.monotonic()
+            prontos = [
+                chave for chave, grupo in self._pendentes.items()
+                if not self._ativa
+                or len(grupo['itens']) >= self.max_linhas
+                or agora - grupo['desde'] >= self.intervalo
+            ]
+            if prontos:
+                return [self._pendentes.pop(chave) for chave in prontos]
+
+            if not self._ativa:
+                return None
+
+            if self._pendentes:
+                mais_antigo = min(g['desde'] for g in self._pendentes.values())
+                self._cond.wait(max(0, mais_antigo + self.intervalo - agora))
+            else:
+                self._cond.wait()
+
+    def _gravar_lote(self, sheet, itens):
+        """
+        Grava o lote com backoff exponencial em erros de cota; após falha
+        ambígua só repete as linhas com chave que não estão na planilha
+        """
+        verificar = any(item[2] for item in itens)
+
+        for tentativa in range(self.max_tentativas):
+            try:
+                if verificar:
+                    itens = self._descartar_gravadas(sheet, itens)
+                    verificar = False
+                    if not itens:
+                        return
+
+                linhas = [linha + [chave] if chave is not None else linha
+                          for linha, chave, _, _ in itens]
+                self._gravar(sheet, linhas)
+                logger.info(f"Lote gravado: {len(linhas)} linhas")
+                for item in itens:
+                    item[3].set_result(True)
+                return
+            except Exception as e:
+                status = getattr(getattr(e, 'response', None), 'status_code', None)
+                ambiguo = status in STATUS_AMBIGUOS
+                # Sem chave não há como saber se o append foi aplicado: não repete
+                retentavel = status in STATUS_COTA or (ambiguo and all(item[1] is not None for item in itens))
+                if not retentavel or tentativa == self.max_tentativas - 1:
+                    logger.error(f"Erro ao gravar lote de {len(itens)} linhas: {e}")
+                    for item in itens:
+                        item[3].set_exception(e)
+                    return
+
+                verificar = verificar or ambiguo
+                espera = min(60, 2 ** tentativa) + random.random()
+                logger.warning(f"Falha temporária do Google Sheets ({status}), "
+                               f"nova tentativa em {espera:.1f}s")
+                time.sleep(espera)
+
+    def _descartar_gravadas(self, sheet, itens):
+        """Resolve os itens cuja chave já está na planilha e retorna os demais"""
+        gravadas = set(sheet.col_values(COLUNA_CHAVE))
+        restantes = []
+        for item in itens:
+            if item[1] is not None and str(item[1]) in gravadas:
+                logger.info(f"Linha {item[1]} já estava na planilha, não será gravada de novo")
+                item[3].set_result(True)
+            else:
+                restantes.append(item)
+        return restantes
@@ -15,8 +15,7 @@ load_dotenv()
 
 # Imports locais
 from src.sheets_service import SheetsService
-from src.categories import categorizar_gasto
-from src.utils import extrair_valor_melhorado, limpar_descricao
+from src.expense_engine import interpretar_mensagem
 
 # Configurar logging
 logging.basicConfig(
@@ -38,7 +37,7 @@ if not SHEET_ID:
     exit(1)
 
 # Inicializar serviços
-sheets_service = SheetsService()
+sheets_service = SheetsService(journal_arquivo='gastos_journal_telegram_bot.jsonl')
 
 def enviar_mensagem(chat_id, texto):
     """Envia mensagem para o Telegram"""
@@ -108,11 +107,11 @@ def processar_gasto(texto, chat_id):
     """Processa registro de gasto"""
     logger.info(f"Processando gasto: '{texto}'")
     
-    valor = extrair_valor_melhorado(texto)
+    gasto = interpretar_mensagem(texto)
+    valor = gasto.valor
     
     if valor:
-        descricao = limpar_descricao(texto)
-        categoria = categorizar_gasto(descricao)
+        descricao, categoria = gasto.descricao, gasto.categoria
         
         logger.info(f"Valor: {valor}, Descrição: '{descricao}', Categoria: {categoria}")
         
@@ -4,12 +4,14 @@ Bot Telegram - Controle de Gastos
 Versão Final Limpa - APENAS Telegram
 """
 import requests
-import time
 import logging
-import re
 from datetime import datetime
 from config_telegram import TelegramConfig
 from sheets_telegram import SheetsService
+from src.pipeline import PipelineUpdates, EnviadorMensagens
+from src.outbound import PRIORIDADE_CONFIRMACAO, PRIORIDADE_NORMAL, PRIORIDADE_RELATORIO
+from src.dedup import RegistroUpdates
+from src.expense_engine import interpretar_mensagem
 
 # Configurar logging
 logging.basicConfig(
@@ -30,57 +32,14 @@ class TelegramBot:
         
         # Inicializar serviços
         self.sheets = SheetsService()
+        self.session = requests.Session()
         
-        # Categorias
-        self.categorias = {
-            'alimentação': ['mercado', 'supermercado', 'restaurante', 'lanche', 'pizza', 'comida'],
-            'transporte': ['uber', 'taxi', 'gasolina', 'combustível', 'ônibus'],
-            'saúde': ['farmácia', 'médico', 'hospital', 'remédio'],
-            'lazer': ['cinema', 'bar', 'show', 'viagem'],
-            'casa': ['luz', 'água', 'internet', 'aluguel'],
-            'outros': []
-        }
+        # Envio pelo agendador compartilhado (limites do Telegram e prioridades)
+        self.enviador = EnviadorMensagens(self.base_url, self.session)
     
-    def extrair_valor(self, texto):
-        """Extrai valor monetário do texto"""
-        # Remove R$, reais, etc.
-        texto_limpo = re.sub(r'(r\$|reais?|real)', '', texto, flags=re.IGNORECASE)
-        
-        # Procura números
-        match = re.search(r'\d+(?:[.,]\d{1,2})?', texto_limpo)
-        if match:
-            valor = match.group().replace(',', '.')
-            try:
-                return float(valor)
-            except ValueError:
-                pass
-        return None
-    
-    def limpar_descricao(self, texto):
-        """Remove valores da descrição"""
-        descricao = re.sub(r'\d+(?:[.,]\d{1,2})?|r\$|reais?|real', '', texto, flags=re.IGNORECASE)
-        return re.sub(r'\s+', ' ', descricao).strip()
-    
-    def categorizar(self, descricao):
-        """Categoriza o gasto"""
-        descricao_lower = descricao.lower()
-        
-        for categoria, palavras in self.categorias.items():
-            if any(palavra in descricao_lower for palavra in palavras):
-                return categoria
-        
-        return 'outros'
-    
-    def enviar_mensagem(self, chat_id, texto):
-        """Envia mensagem para o Telegram"""
-        try:
-            url = f"{self.base_url}/sendMessage"
-            data = {"chat_id": chat_id, "text": texto}
-            response = requests.post(url, json=data, timeout=10)
-            return response.status_code == 200
-        except Exception as e:
-            logger.error(f"❌ Erro ao enviar mensagem: {e}")
-            return False
+    def enviar_mensagem(self, chat_id, texto, prioridade=PRIORIDADE_NORMAL):
+        """Agenda o envio de uma mensagem para o Telegram"""
+        self.enviador.enviar(chat_id, texto, prioridade)
     
     def processar_comando(self, comando, chat_id):
         """Processa comandos do bot"""
@@ -103,7 +62,7 @@ class TelegramBot:
         elif comando == "saldo":
             total = self.sheets.calcular_saldo_mes()
             mes = datetime.now().strftime("%m/%Y")
-            self.enviar_mensagem(chat_id, f"💰 Saldo {mes}: R$ {total:.2f}")
+            self.enviar_mensagem(chat_id, f"💰 Saldo {mes}: R$ {total:.2f}", PRIORIDADE_RELATORIO)
         
         elif comando == "ajuda":
             texto = """🤖 *Comandos*
@@ -121,17 +80,17 @@ class TelegramBot:
     
     def processar_gasto(self, texto, chat_id):
         """Processa registro de gasto"""
-        valor = self.extrair_valor(texto)
+        gasto = interpretar_mensagem(texto)
+        valor = gasto.valor
         
         if valor:
-            descricao = self.limpar_descricao(texto)
-            categoria = self.categorizar(descricao)
+            descricao, categoria = gasto.descricao, gasto.categoria
             
             logger.info(f"💰 Processando: {descricao} - R$ {valor:.2f} ({categoria})")
             
             if self.sheets.adicionar_gasto(descricao, valor, categoria):
                 resposta = f"✅ {descricao} - R$ {valor:.2f}\n📂 {categoria.title()}"
-                self.enviar_mensagem(chat_id, resposta)
+                self.enviar_mensagem(chat_id, resposta, PRIORIDADE_CONFIRMACAO)
                 logger.info(f"✅ Gasto salvo: {descricao} - R$ {valor:.2f}")
             else:
                 self.enviar_mensagem(chat_id, "❌ Erro ao salvar gasto")
@@ -160,38 +119,6 @@ class TelegramBot:
         except Exception as e:
             logger.error(f"❌ Erro ao processar mensagem: {e}")
     
-    def obter_updates(self, offset=None):
-        """Obtém atualizações do Telegram"""
-        try:
-            url = f"{self.base_url}/getUpdates"
-            params = {"timeout": 10}
-            if offset:
-                params["offset"] = offset
-            
-            response = requests.get(url, params=params, timeout=15)
-            return response.json() if response.status_code == 200 else None
-            
-        except Exception as e:
-            logger.error(f"❌ Erro ao obter updates: {e}")
-            return None
-    
-    def limpar_mensagens_antigas(self):
-        """Limpa mensagens antigas para evitar loop"""
-        try:
-            response = requests.get(f"{self.base_url}/getUpdates", timeout=10)
-            data = response.json()
-            
-            if data.get("ok") and data["result"]:
-                last_id = data["result"][-1]["update_id"]
-                requests.get(f"{self.base_url}/getUpdates?offset={last_id + 1}", timeout=10)
-                logger.info(f"🧹 Ignoradas {len(data['result'])} mensagens antigas")
-                return last_id + 1
-            
-            return None
-        except Exception as e:
-            logger.error(f"❌ Erro ao limpar mensagens: {e}")
-            return None
-    
     def executar(self):
         """Executa o bot"""
         logger.info("🚀 Iniciando Bot Telegram - Controle de Gastos")
@@ -201,30 +128,20 @@ class TelegramBot:
             logger.error("❌ Google Sheets não conectado. Parando bot.")
             return
         
-        # Limpar mensagens antigas
-        offset = self.limpar_mensagens_antigas()
+        logger.info("✅ Bot aguardando mensagens...")
         
-        logger.info("✅ Bot aguardando mensagens NOVAS...")
-        
-        while True:
-            try:
-                updates = self.obter_updates(offset)
-                
-                if updates and updates.get("ok") and updates["result"]:
-                    for update in updates["result"]:
-                        if "message" in update:
-                            self.processar_mensagem(update["message"])
-                        
-                        offset = update["update_id"] + 1
-                
-                time.sleep(1)
-                
-            except KeyboardInterrupt:
-                logger.info("🛑 Bot interrompido pelo usuário")
-                break
-            except Exception as e:
-                logger.error(f"❌ Erro no loop principal: {e}")
-                time.sleep(5)
+        registro = RegistroUpdates(caminho=TelegramConfig.arquivo_updates('telegram_bot_final'))
+        pipeline = PipelineUpdates(self.processar_update, workers=TelegramConfig.WORKERS,
+                                   tamanho_fila=TelegramConfig.TAMANHO_FILA, registro=registro)
+        try:
+            pipeline.executar_long_poll(self.base_url, self.session)
+        except KeyboardInterrupt:
+            logger.info("🛑 Bot interrompido pelo usuário")
+    
+    def processar_update(self, update):
+        """Processa um update (executado nos workers do pipeline)"""
+        if "message" in update:
+            self.processar_mensagem(update["message"])
 
 def main():
     """Função principal"""
@@ -0,0 +1,105 @@
+"""
+Testes do cliente assíncrono do Telegram (TelegramServiceAsync)
+"""
+import asyncio
+import json
+import threading
+import httpx
+from src.outbound import PRIORIDADE_CONFIRMACAO, PRIORIDADE_RELATORIO
+from src.telegram_async import TelegramServiceAsync
+
+class ApiFalsa:
+    """Transporte httpx que registra os sendMessage recebidos"""
+
+    def __init__(self, respostas=None):
+        self.respostas = list(respostas or [])
+        self.recebidas = []
+        self.lock = threading.Lock()
+
+    def __call__(self, request):
+        with self.lock:
+            self.recebidas.append((request.url.path, json.loads(request.content)))
+            if self.respostas:
+                return self.respostas.pop(0)
+        return httpx.Response(200, json={"ok": True})
+
+def criar_servico(api):
+    return TelegramServiceAsync(token="TESTE", transporte=httpx.MockTransport(api))
+
+class TestTelegramServiceAsync:
+    """Envio assíncrono passando pelo agendador"""
+
+    def test_mensagem_formatada_vai_pelo_agendador_com_markdown(self):
+        api = ApiFalsa()
+
+        async def cenario():
+            async with criar_servico(api) as telegram:
+                return await telegram.enviar_mensagem_formatada(10, "Título", "Conteúdo", "Rodapé")
+
+        assert asyncio.run(cenario()) is True
+        caminho, dados = api.recebidas[0]
+        assert caminho == "/botTESTE/sendMessage"
+        assert dados["chat_id"] == 10
+        assert dados["parse_mode"] == "Markdown"
+        assert "Título" in dados["text"] and "Rodapé" in dados["text"]
+
+    def test_saldo_e_lista_de_gastos(self):
+        api = ApiFalsa()
+
+        async def cenario():
+            async with criar_servico(api) as telegram:
+                return (await telegram.enviar_saldo_mensal(1, 150.0, "10/2026"),
+                        await telegram.enviar_lista_gastos(1, []))
+
+        assert asyncio.run(cenario()) == (True, True)
+        assert len(api.recebidas) == 2
+
+    def test_429_e_reenviado_apos_retry_after(self):
+        api = ApiFalsa([httpx.Response(429, json={"ok": False, "parameters": {"retry_after": 0}})])
+
+        async def cenario():
+            async with criar_servico(api) as telegram:
+                return await telegram.enviar_mensagem(5, "oi")
+
+        assert asyncio.run(cenario()) is True
+        assert len(api.recebidas) == 2
+
+    def test_erro_http_retorna_false(self):
+        api = ApiFalsa([httpx.Response(400, json={"ok": False})])
+
+        async def cenario():
+            async with criar_servico(api) as telegram:
+                return await telegram.enviar_mensagem(5, "oi")
+
+        assert asyncio.run(cenario()) is False
+
+    def test_enviar_varios_em_paralelo_mantem_a_ordem_dos_resultados(self):
+        api = ApiFalsa([httpx.Response(200, json={"ok": True}), httpx.Response(500)])
+
+        async def cenario():
+            async with criar_servico(api) as telegram:
+                return await telegram.enviar_varios([(chat_id, f"msg {chat_id}") for chat_id in range(8)])
+
+        resultados = asyncio.run(cenario())
+        assert len(resultados) == 8
+        assert resultados.count(False) == 1
+        assert sorted(d["chat_id"] for _, d in api.recebidas) == list(range(8))
+
+    def test_enviar_sincrono_respeita_a_prioridade_no_mesmo_chat(self):
+        api = ApiFalsa()
+        telegram = criar_servico(api)
+        try:
+            # Esgota a rajada do chat para as próximas mensagens ficarem na fila
+            iniciais = [telegram.enviar(7, f"rajada {i}") for i in range(3)]
+            for future in iniciais:
+                future.result(timeout=5)
+
+            relatorio = telegram.enviar(7, "relatório", PRIORIDADE_RELATORIO)
+            confirmacao = telegram.enviar(7, "confirmação", PRIORIDADE_CONFIRMACAO)
+            assert confirmacao.result(timeout=5).status_code == 200
+            assert relatorio.result(timeout=5).status_code == 200
+        finally:
+            asyncio.run(telegram.fechar())
+
+        textos = [d["text"] for _, d in api.recebidas]
+        assert textos.index("confirmação") < textos.index("relatório")